@@ -0,0 +1,19 @@
+from flask import Blueprint, jsonify
+from core.warmup import get_warmup_status, WARMUP_READY
+
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('/healthz', methods=['GET'])
+def healthz():
+    """
+    Liveness probe: the process is up and serving requests.
+    """
+    return jsonify({"status": "ok"}), 200
+
+@health_bp.route('/readyz', methods=['GET'])
+def readyz():
+    """
+    Readiness probe: the start-up warm-up has finished.
+    """
+    status = get_warmup_status()
+    return jsonify(status), 200 if status["state"] == WARMUP_READY else 503
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify, Response
 import json
 from core.rag_engine import rag_query
+from core.retrieval_policy import policy_stats
+from utils.embedding_provider import EmbeddingMismatchError
 
 query_bp = Blueprint('query', __name__)
 
@@ -12,18 +14,33 @@ def process_query():
     
     session_id = request.form.get('session_id')
     stream = request.form.get('stream', 'false').lower() == 'true'
+    create_new = request.form.get('create_new', 'false').lower() == 'true'
     
     print(f"Query for user: {user_id}, project: {project}, session: {session_id}")
     
-    if stream:
-        def generate():
+    try:
+        if stream:
             response_generator = rag_query(
                 user_id, 
                 project, 
                 query_text, 
                 stream=True, 
-                session_id=session_id
+                session_id=session_id,
+                create_new=create_new
+            )
+        else:
+            result = rag_query(
+                user_id, 
+                project, 
+                query_text, 
+                session_id=session_id, 
+                create_new=create_new
             )
+    except EmbeddingMismatchError as e:
+        return jsonify({"error": str(e)}), 409
+    
+    if stream:
+        def generate():
             session_identifier = None
             for chunk in response_generator:
                 if isinstance(chunk, str) and chunk.startswith('session_id:'):
@@ -33,12 +50,11 @@ def process_query():
                     yield f"data: {json.dumps({'chunk': chunk})}\n\n"
                 
         return Response(generate(), mimetype='text/event-stream')
-    else:
-        result = rag_query(
-            user_id, 
-            project, 
-            query_text, 
-            session_id=session_id, 
-            create_new=create_new
-        )
-        return jsonify(result), 200
+    return jsonify(result), 200
+
+@query_bp.route('/api/query/stats', methods=['GET'])
+def get_query_stats():
+    """
+    Report per-intent averages of retrieved, kept and packed chunks.
+    """
+    return jsonify(policy_stats.stats()), 200
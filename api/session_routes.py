@@ -4,7 +4,8 @@ from core.session_manager import (
     rename_session,
     delete_session,
     clear_session_history, 
-    get_or_create_session
+    get_or_create_session,
+    get_session_index_stats
 )
 from langchain_core.messages import HumanMessage, AIMessage
 from core.rag_engine import rag_query
@@ -22,6 +23,13 @@ def get_sessions():
     sessions = list_user_sessions(user_id, project)
     return jsonify({"sessions": sessions}), 200
 
+@session_bp.route('/api/sessions/stats', methods=['GET'])
+def get_session_stats():
+    """
+    Report the in-process session index size and eviction counters.
+    """
+    return jsonify(get_session_index_stats()), 200
+
 @session_bp.route('/api/sessions/create', methods=['POST'])
 def create_session():
     user_id = request.form['user_id']
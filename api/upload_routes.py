@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 import os
-from utils.transcript_processing import process_transcript
+from core.ingestion_jobs import ingestion_queue, job_upload_path, QueueFullError
 import config
 
 upload_bp = Blueprint('upload', __name__)
@@ -13,9 +13,33 @@ def upload_file():
     file = request.files['transcript']
     
     if file:
-        filepath = os.path.join(config.UPLOAD_FOLDER, f"{user_id}_{file.filename}")
+        # Reject before saving, so a full queue leaves nothing on disk
+        if ingestion_queue.is_full():
+            return jsonify({"error": "Ingestion queue is full"}), 429
+        os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
+        job_id = ingestion_queue.new_job_id()
+        filepath = job_upload_path(job_id, f"{user_id}_{os.path.basename(file.filename)}")
         file.save(filepath)
-        process_transcript(user_id, project, filepath, meeting_type)
-        return jsonify({"message": "Upload successful"}), 200
+        try:
+            ingestion_queue.submit(user_id, project, filepath, meeting_type, job_id=job_id)
+        except QueueFullError as e:
+            os.remove(filepath)
+            return jsonify({"error": str(e)}), 429
+        return jsonify({"message": "Upload accepted", "job_id": job_id, "status": "queued"}), 202
     
     return jsonify({"error": "No file"}), 400
+
+@upload_bp.route('/api/upload/<job_id>', methods=['GET'])
+def get_upload_status(job_id):
+    """
+    Report the status and progress of an ingestion job to the user who submitted it.
+    """
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({"error": "User ID is required"}), 400
+
+    job = ingestion_queue.get(job_id)
+    # Other users' jobs are reported as missing
+    if job is None or job["user_id"] != user_id:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
@@ -5,16 +5,24 @@ This file initializes the Flask application and registers all routes.
 from flask import Flask
 from flask_cors import CORS
 import config
+from core.ingestion_jobs import start_ingestion_workers
+from core.warmup import start_warmup
 
 # Import route blueprints
 from api.query_routes import query_bp
 from api.session_routes import session_bp
 from api.upload_routes import upload_bp
+from api.health_routes import health_bp
 
-def create_app():
+def create_app(start_background_workers=True):
     """
     Create and configure the Flask application.
     
+    Args:
+        start_background_workers (bool): Start the ingestion workers and the
+            warm-up in this process (the production server starts them after
+            forking instead)
+    
     Returns:
         Flask: Configured Flask application
     """
@@ -32,6 +40,13 @@ def create_app():
     app.register_blueprint(query_bp)
     app.register_blueprint(session_bp)
     app.register_blueprint(upload_bp)
+    app.register_blueprint(health_bp)
+    
+    # Start background ingestion workers for queued uploads
+    if start_background_workers:
+        start_ingestion_workers()
+        # Warm up in the background; /readyz reports ready once it is done
+        start_warmup()
     
     return app
 
@@ -0,0 +1,89 @@
+"""
+ASGI entry point with an async query endpoint.
+
+POST /api/query is served natively on the event loop by
+core.rag_engine.arag_query, so a streamed answer costs a coroutine rather
+than an OS thread and one process can hold many concurrent streams. Every
+other route is served by the regular Flask app, mounted behind it.
+
+Run with uvicorn (a single process; the ingestion workers run in it):
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+"""
+import json
+
+from starlette.applications import Starlette
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import config
+from app import create_app
+from core.ingestion_jobs import ingestion_queue, start_ingestion_workers
+from core.rag_engine import arag_query
+from core.session_manager import session_store
+from core.warmup import start_warmup
+from utils.embedding_provider import EmbeddingMismatchError
+
+async def process_query(request):
+    form = await request.form()
+    missing = [field for field in ("user_id", "project", "query_text") if not form.get(field)]
+    if missing:
+        return JSONResponse({"error": f"Missing form fields: {', '.join(missing)}"}, status_code=400)
+
+    user_id = form["user_id"]
+    project = form["project"]
+    query_text = form["query_text"]
+
+    session_id = form.get("session_id")
+    stream = form.get("stream", "false").lower() == "true"
+    create_new = form.get("create_new", "false").lower() == "true"
+
+    print(f"Async query for user: {user_id}, project: {project}, session: {session_id}")
+
+    try:
+        result = await arag_query(
+            user_id,
+            project,
+            query_text,
+            stream=stream,
+            session_id=session_id,
+            create_new=create_new
+        )
+    except EmbeddingMismatchError as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+
+    if stream:
+        async def generate():
+            async for chunk in result:
+                if isinstance(chunk, str) and chunk.startswith('session_id:'):
+                    session_identifier = chunk.replace('session_id:', '')
+                    yield f"data: {json.dumps({'session_id': session_identifier})}\n\n"
+                else:
+                    yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+
+        return StreamingResponse(generate(), media_type="text/event-stream")
+    return JSONResponse(result)
+
+def on_startup():
+    start_ingestion_workers()
+    start_warmup()
+
+def on_shutdown():
+    ingestion_queue.stop(timeout=config.SERVER_GRACEFUL_TIMEOUT)
+    session_store.close()
+
+app = Starlette(
+    routes=[
+        Route("/api/query", process_query, methods=["POST"]),
+        # Sessions, uploads and everything else keep using the Flask blueprints
+        Mount("/", app=WSGIMiddleware(create_app(start_background_workers=False)))
+    ],
+    on_startup=[on_startup],
+    on_shutdown=[on_shutdown]
+)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=config.HOST, port=config.PORT)
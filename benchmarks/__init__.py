@@ -0,0 +1,6 @@
+"""
+Offline benchmarks.
+
+Stage-level latency, throughput and memory measurements that run without
+Ollama, an embedding model or Azure DevOps (see benchmarks.run).
+"""
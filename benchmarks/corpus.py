@@ -0,0 +1,182 @@
+"""
+Synthetic, seeded corpora for the benchmarks.
+
+Everything is generated from a fixed seed, so two runs at the same size
+process exactly the same work items, transcripts, queries and histories.
+"""
+import random
+
+from langchain_core.documents import Document
+
+# Parameters of each benchmark size
+SIZES = {
+    "small": {
+        "intent_queries": 2000, "intent_extra_keywords": 0,
+        "context_docs": 4,
+        "history_turns": 4, "sessions": 20,
+        "transcript_lines": 400, "work_items": 100,
+        "rag_work_items": 100, "rag_queries": 20, "rag_turns_per_session": 5
+    },
+    "medium": {
+        "intent_queries": 10000, "intent_extra_keywords": 1000,
+        "context_docs": 10,
+        "history_turns": 16, "sessions": 50,
+        "transcript_lines": 4000, "work_items": 1000,
+        "rag_work_items": 1000, "rag_queries": 50, "rag_turns_per_session": 10
+    },
+    "large": {
+        "intent_queries": 50000, "intent_extra_keywords": 10000,
+        "context_docs": 40,
+        "history_turns": 64, "sessions": 100,
+        "transcript_lines": 20000, "work_items": 5000,
+        "rag_work_items": 5000, "rag_queries": 100, "rag_turns_per_session": 20
+    }
+}
+
+TOPICS = [
+    "login flow", "payment gateway", "deployment pipeline", "notification service", "search index",
+    "user profile page", "billing report", "audit log", "mobile app", "JWT authentication",
+    "orders API", "data export", "onboarding checklist", "feature flags", "cache layer"
+]
+WORK_ITEM_TYPES = ["Bug", "Product Backlog Item", "Feature", "Epic", "User Story"]
+STATES = ["New", "Active", "Resolved", "Committed", "Done"]
+SPEAKERS = ["Alice", "Bob", "Chen", "Dana", "Eli", "Farah"]
+SENTENCE_TEMPLATES = [
+    "The {topic} fails when the session token expires during checkout.",
+    "We agreed to move the {topic} work into the next sprint.",
+    "The {topic} needs a database migration before it can be released.",
+    "QA found two regressions in the {topic} on the staging environment.",
+    "The team will add monitoring and alerts for the {topic}.",
+    "Acceptance criteria for the {topic} were updated after the review.",
+    "The {topic} depends on the new endpoint in the orders service.",
+    "Performance of the {topic} degrades with more than a thousand users.",
+    "Documentation for the {topic} is still missing setup steps.",
+    "The owner of the {topic} will share a design proposal on Friday."
+]
+QUERY_TEMPLATES = [
+    "Summarize the status of the {topic}",
+    "Give me a brief overview of the {topic} progress",
+    "Explain how the {topic} works",
+    "Why does the {topic} fail after deploy?",
+    "List the open tasks for the {topic}",
+    "What are the steps to set up the {topic}?",
+    "Show all bugs in the {topic}",
+    "What is work item {work_item_id} about?",
+    "Who owns the {topic}?",
+    "hello"
+]
+
+def make_sentence(rng):
+    return rng.choice(SENTENCE_TEMPLATES).format(topic=rng.choice(TOPICS))
+
+def make_work_items(count, project="BENCH", seed=0):
+    """
+    Generate work items in the shape the Azure DevOps seeder produces.
+
+    Args:
+        count (int): Number of work items
+        project (str): Project name
+        seed (int): Random seed
+
+    Returns:
+        list: Work item dicts (id, title, description, type, project, state, changed_date)
+    """
+    rng = random.Random(seed)
+    work_items = []
+    for index in range(count):
+        topic = rng.choice(TOPICS)
+        sentences = rng.randint(0, 24)
+        work_items.append({
+            "id": 40000 + index,
+            "title": f"{rng.choice(['Fix', 'Improve', 'Add', 'Investigate'])} {topic} #{index}",
+            "description": " ".join(make_sentence(rng) for _ in range(sentences)),
+            "type": rng.choice(WORK_ITEM_TYPES),
+            "project": project,
+            "state": rng.choice(STATES),
+            "changed_date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00Z"
+        })
+    return work_items
+
+def make_transcript(lines, seed=0):
+    """
+    Generate a meeting transcript.
+
+    Args:
+        lines (int): Number of speaker lines
+        seed (int): Random seed
+
+    Returns:
+        str: Transcript text
+    """
+    rng = random.Random(seed)
+    return "\n".join(
+        f"{rng.choice(SPEAKERS)}: {' '.join(make_sentence(rng) for _ in range(rng.randint(1, 3)))}"
+        for _ in range(lines)
+    )
+
+def make_queries(count, seed=0, work_item_ids=None):
+    """
+    Generate user queries across all intents.
+
+    Args:
+        count (int): Number of queries
+        seed (int): Random seed
+        work_item_ids (list, optional): Ids used for work item questions
+
+    Returns:
+        list: Query strings
+    """
+    rng = random.Random(seed)
+    work_item_ids = work_item_ids or [40000]
+    return [
+        rng.choice(QUERY_TEMPLATES).format(topic=rng.choice(TOPICS), work_item_id=rng.choice(work_item_ids))
+        for _ in range(count)
+    ]
+
+def make_history(turns, seed=0):
+    """
+    Generate the exchanges of a session.
+
+    Args:
+        turns (int): Number of exchanges
+        seed (int): Random seed
+
+    Returns:
+        list: (query, answer) tuples, oldest first
+    """
+    rng = random.Random(seed)
+    queries = make_queries(turns, seed)
+    return [(query, " ".join(make_sentence(rng) for _ in range(rng.randint(2, 6)))) for query in queries]
+
+def make_documents(count, seed=0):
+    """
+    Generate retrieved chunks shaped like seeded work item chunks.
+
+    Consecutive chunks often belong to the same work item, so packing has
+    groups and overlaps to merge.
+
+    Args:
+        count (int): Number of documents
+        seed (int): Random seed
+
+    Returns:
+        list: Documents, best first
+    """
+    rng = random.Random(seed)
+    work_items = make_work_items(max(1, count // 2), seed=seed)
+    docs = []
+    for index in range(count):
+        work_item = work_items[index // 2]
+        header = f"Work Item: {work_item['id']} ({work_item['type']}) in {work_item['project']}\nTitle: {work_item['title']}"
+        body = " ".join(make_sentence(rng) for _ in range(rng.randint(3, 6)))
+        docs.append(Document(
+            page_content=f"{header}\nDescription Part {index % 2 + 1}: {body}",
+            metadata={
+                "work_item_id": str(work_item["id"]),
+                "type": work_item["type"],
+                "chunk_index": index % 2,
+                "retrieval_source": "shared",
+                "relevance_score": round(1 - index / (count + 1), 3)
+            }
+        ))
+    return docs
@@ -0,0 +1,214 @@
+"""
+Run the offline benchmarks.
+
+    python -m benchmarks.run --sizes small,medium --output results.json
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.2
+
+All state (Chroma, BM25 indexes, caches, sessions) lives in a temporary
+directory, and the LLM, embedding model and Azure DevOps client are
+replaced with the local stubs, so no service or model is needed. Exits with
+status 1 when --baseline is given and a metric regressed by more than the
+tolerance.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import config
+
+def configure_paths(workdir):
+    """Point every persistent path in config at the benchmark directory."""
+    config.PERSIST_DIRECTORY = os.path.join(workdir, "chroma_db")
+    config.BM25_INDEX_DIRECTORY = f"{config.PERSIST_DIRECTORY}_bm25"
+    config.CACHE_DIRECTORY = os.path.join(workdir, "cache")
+    config.QUERY_EMBEDDING_CACHE_PATH = os.path.join(config.CACHE_DIRECTORY, "query_embeddings.sqlite")
+    config.CHUNK_EMBEDDING_CACHE_PATH = os.path.join(config.CACHE_DIRECTORY, "chunk_embeddings.sqlite")
+    config.STATE_DIRECTORY = os.path.join(workdir, "state")
+    config.SESSION_DB_PATH = os.path.join(config.STATE_DIRECTORY, "sessions.sqlite")
+    config.INGESTION_DB_PATH = os.path.join(config.STATE_DIRECTORY, "ingestion_jobs.sqlite")
+    config.UPLOAD_FOLDER = os.path.join(workdir, "uploads")
+    for directory in (config.CACHE_DIRECTORY, config.STATE_DIRECTORY, config.UPLOAD_FOLDER):
+        os.makedirs(directory, exist_ok=True)
+
+def max_rss_mb():
+    """Peak resident set size of the process in MB, or None where unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def flatten_metrics(results):
+    """
+    Flatten results into comparable metrics.
+
+    Returns:
+        dict: "stage.size.metric" -> number, for metrics with a unit suffix
+    """
+    flat = {}
+    for stage, sizes in results.items():
+        for size, metrics in sizes.items():
+            for name, value in metrics.items():
+                if isinstance(value, (int, float)) and name.endswith(("_ms", "_us", "_mb", "_per_sec")):
+                    flat[f"{stage}.{size}.{name}"] = value
+    return flat
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline.
+
+    Latencies and memory (_ms, _us, _mb) regress when they grow, throughput
+    (_per_sec) when it drops, by more than the tolerance. Metrics missing
+    from either side are ignored.
+
+    Args:
+        results (dict): Current results
+        baseline (dict): Baseline results
+        tolerance (float): Allowed relative change, e.g. 0.2 for 20%
+
+    Returns:
+        list: Regressions as dicts with metric, baseline, current and change
+    """
+    current = flatten_metrics(results)
+    regressions = []
+    for metric, base in flatten_metrics(baseline).items():
+        value = current.get(metric)
+        if value is None or not base:
+            continue
+        change = (value - base) / base
+        regressed = change < -tolerance if metric.endswith("_per_sec") else change > tolerance
+        if regressed:
+            regressions.append({
+                "metric": metric, "baseline": base, "current": value, "change": round(change, 3)
+            })
+    return regressions
+
+def parse_args(argv=None):
+    from benchmarks.corpus import SIZES
+    from benchmarks.stages import STAGES
+
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks.")
+    parser.add_argument("--sizes", default="small", help=f"Comma-separated sizes ({', '.join(SIZES)})")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated stages ({', '.join(STAGES)})")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Stub LLM latency before the first token")
+    parser.add_argument("--llm-prefill-tokens-per-second", type=float, default=0.0,
+                        help="Stub LLM prefill rate (0: prefill is free)")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0,
+                        help="Stub LLM generation rate (0: no delay between tokens)")
+    parser.add_argument("--llm-response-tokens", type=int, default=64, help="Tokens per stub answer")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0, help="Stub embedding latency per call")
+    parser.add_argument("--embedding-per-text-ms", type=float, default=0.0, help="Stub embedding latency per text")
+    parser.add_argument("--work-item-latency-ms", type=float, default=0.0,
+                        help="Stub Azure DevOps latency per work item batch")
+    parser.add_argument("--workdir", help="Directory for benchmark state (default: a temporary directory, removed afterwards)")
+    parser.add_argument("--output", help="Write the results as JSON to this file (default: stdout)")
+    parser.add_argument("--baseline", help="Compare with the results in this file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (default: 0.2)")
+    parser.add_argument("--save-baseline", help="Also write the results to this file as the new baseline")
+    parser.add_argument("--verbose", action="store_true", help="Show the application's own output")
+    args = parser.parse_args(argv)
+
+    args.sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    args.stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    for size in args.sizes:
+        if size not in SIZES:
+            parser.error(f"unknown size: {size}")
+    for stage in args.stages:
+        if stage not in STAGES:
+            parser.error(f"unknown stage: {stage}")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="luminai-bench-")
+    # Must happen before core and utils modules read their paths
+    configure_paths(workdir)
+
+    from benchmarks.corpus import SIZES
+    from benchmarks.stages import STAGES
+    from benchmarks.stubs import StubEmbeddings, install_stub_backends
+
+    llm_settings = {
+        "first_token_latency_ms": args.llm_latency_ms,
+        "prefill_tokens_per_second": args.llm_prefill_tokens_per_second,
+        "tokens_per_second": args.llm_tokens_per_second,
+        "response_tokens": args.llm_response_tokens
+    }
+    recorder, embeddings = install_stub_backends(
+        llm_settings,
+        StubEmbeddings(batch_latency_ms=args.embedding_latency_ms, per_text_ms=args.embedding_per_text_ms)
+    )
+    env = {
+        "workdir": workdir,
+        "recorder": recorder,
+        "embeddings": embeddings,
+        "work_item_latency_ms": args.work_item_latency_ms
+    }
+
+    results = {}
+    started = time.perf_counter()
+    try:
+        for stage in args.stages:
+            for size in args.sizes:
+                params = dict(SIZES[size], name=size)
+                print(f"Running {stage} ({size})...", file=sys.stderr)
+                with open(os.devnull, "w") as devnull:
+                    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)
+                    with output:
+                        results.setdefault(stage, {})[size] = STAGES[stage](params, env)
+    finally:
+        from core.session_manager import session_store
+        session_store.flush()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+            "stages": args.stages,
+            "llm": llm_settings,
+            "embedding": {"latency_ms": args.embedding_latency_ms, "per_text_ms": args.embedding_per_text_ms},
+            "work_item_latency_ms": args.work_item_latency_ms,
+            "duration_s": round(time.perf_counter() - started, 2),
+            "max_rss_mb": max_rss_mb()
+        },
+        "results": results
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        report["regressions"] = regressions
+        for regression in regressions:
+            print(f"REGRESSION {regression['metric']}: {regression['baseline']} -> {regression['current']} "
+                  f"({regression['change']:+.1%})", file=sys.stderr)
+        if regressions:
+            exit_code = 1
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""
+Benchmark stages.
+
+Each stage takes the parameters of one size (see benchmarks.corpus.SIZES)
+and the run environment, and returns a dict of metrics. Metric names end in
+their unit: _ms and _us are latencies, _mb is memory and _per_sec is
+throughput; other values (counts, token numbers) are reported for context
+and not compared against the baseline.
+"""
+import os
+import time
+import tracemalloc
+
+import config
+from benchmarks.corpus import (
+    make_documents, make_history, make_queries, make_transcript, make_work_items
+)
+from benchmarks.stubs import StubWorkItemClient, render_messages
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+def summarize(samples, name, unit="ms"):
+    """
+    Mean, p50 and p95 of timing samples.
+
+    Args:
+        samples (list): Durations in seconds
+        name (str): Metric name prefix
+        unit (str): "ms" or "us"
+
+    Returns:
+        dict: {name}_mean_{unit}, {name}_p50_{unit}, {name}_p95_{unit}
+    """
+    scale = 1e6 if unit == "us" else 1e3
+    ordered = sorted(samples)
+    mean = sum(ordered) / len(ordered) if ordered else 0.0
+    return {
+        f"{name}_mean_{unit}": round(mean * scale, 3),
+        f"{name}_p50_{unit}": round(percentile(ordered, 0.5) * scale, 3),
+        f"{name}_p95_{unit}": round(percentile(ordered, 0.95) * scale, 3)
+    }
+
+def timed(function, *args, **kwargs):
+    """
+    Call a function and time it.
+
+    Returns:
+        tuple: (result, elapsed seconds)
+    """
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+def peak_memory_mb(function, *args, **kwargs):
+    """
+    Peak Python heap growth while a function runs, in MB (tracemalloc).
+
+    Native allocations (Chroma, numpy buffers) are not included.
+    """
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1024 * 1024), 2)
+
+def import_seeder():
+    """
+    Import the Azure DevOps seeder.
+
+    Returns:
+        tuple: (module or None, error message or None)
+    """
+    try:
+        from seeders import ad_data_seeder
+    except ImportError as e:
+        return None, f"seeders.ad_data_seeder unavailable: {e}"
+    return ad_data_seeder, None
+
+def seed_work_items(seeder, project, work_items, latency_ms=0.0):
+    """
+    Seed a project's shared collection through the seeder pipeline.
+
+    Returns:
+        dict: Pipeline stats
+    """
+    from utils.bm25_index import ensure_bm25_index
+    from utils.embedding_provider import record_collection_embedding
+    from utils.vectorstore_registry import get_chroma_client, get_collection_name, invalidate_collection
+
+    collection = get_chroma_client().get_or_create_collection(get_collection_name(project))
+    record_collection_embedding(collection, seeder.embedder)
+    stats = seeder.run_seed_pipeline(
+        project,
+        collection,
+        [work_item["id"] for work_item in work_items],
+        wi_client=StubWorkItemClient(work_items, latency_ms)
+    )
+    ensure_bm25_index(collection).save()
+    invalidate_collection(project)
+    return stats
+
+def bench_intent(params, env):
+    """Intent matcher compile time and detection throughput."""
+    from core.intent_detection import IntentMatcher, detect_intents
+
+    queries = make_queries(params["intent_queries"], seed=1)
+    detect_intents(queries[:100])
+
+    _, elapsed = timed(detect_intents, queries)
+    metrics = {
+        "queries": len(queries),
+        "detect_us_per_query": round(elapsed / len(queries) * 1e6, 3),
+        "detect_queries_per_sec": round(len(queries) / elapsed, 1)
+    }
+
+    # A larger keyword table, to see how matching scales with the configured keywords
+    keyword_table = {intent: dict(keywords) for intent, keywords in config.INTENT_KEYWORDS.items()}
+    intents = list(keyword_table)
+    for index in range(params["intent_extra_keywords"]):
+        phrase = f"term{index}" if index % 2 else f"term{index} topic{index % 97}"
+        keyword_table[intents[index % len(intents)]][phrase] = 1 + index % 3
+    matcher, compile_elapsed = timed(IntentMatcher, keyword_table, config.INTENT_MIN_SCORE)
+    started = time.perf_counter()
+    for query in queries:
+        matcher.detect(query)
+    elapsed = time.perf_counter() - started
+    metrics.update({
+        "keywords": sum(len(keywords) for keywords in keyword_table.values()),
+        "matcher_compile_ms": round(compile_elapsed * 1e3, 3),
+        "matcher_us_per_query": round(elapsed / len(queries) * 1e6, 3)
+    })
+    return metrics
+
+def bench_context(params, env):
+    """format_docs and pack_context latency for k retrieved chunks."""
+    from utils.context_packing import pack_context
+    from utils.embedding_utils import format_docs
+
+    docs = make_documents(params["context_docs"], seed=2)
+    repeat = max(50, 2000 // len(docs))
+
+    format_samples = [timed(format_docs, docs)[1] for _ in range(repeat)]
+    pack_samples = []
+    for _ in range(repeat):
+        (_, stats), elapsed = timed(pack_context, docs)
+        pack_samples.append(elapsed)
+
+    metrics = {"k": len(docs), "raw_tokens": stats["raw_tokens"], "packed_tokens": stats["packed_tokens"]}
+    metrics.update(summarize(format_samples, "format_docs", unit="us"))
+    metrics.update(summarize(pack_samples, "pack_context", unit="us"))
+    return metrics
+
+def bench_sessions(params, env):
+    """Session create, record_exchange and warm vs cold get_or_create_session."""
+    from core.session_manager import get_or_create_session, record_exchange, session_store
+
+    project = f"bench-sessions-{params['name']}"
+    users = [f"user-{index}" for index in range(params["sessions"])]
+    history = make_history(params["history_turns"], seed=3)
+
+    create_samples = []
+    session_ids = []
+    for user_id in users:
+        (_, session_id), elapsed = timed(get_or_create_session, user_id, project, None, True)
+        create_samples.append(elapsed)
+        session_ids.append(session_id)
+
+    record_samples = []
+    for query, answer in history:
+        for user_id, session_id in zip(users, session_ids):
+            record_samples.append(timed(record_exchange, user_id, project, session_id, query, answer)[1])
+    session_store.flush()
+
+    warm_samples = [
+        timed(get_or_create_session, user_id, project, session_id)[1]
+        for user_id, session_id in zip(users, session_ids)
+    ]
+
+    metrics = {"sessions": len(users), "history_turns": len(history)}
+    metrics.update(summarize(create_samples, "create"))
+    metrics.update(summarize(record_samples, "record_exchange", unit="us"))
+    metrics.update(summarize(warm_samples, "warm_get", unit="us"))
+
+    if config.SESSION_STORE_BACKEND == "sqlite":
+        # Drop the loaded sessions so the next lookup reloads them from SQLite
+        session_store.flush()
+        for user_id, session_id in zip(users, session_ids):
+            session_store.index.remove(user_id, project, session_id)
+        cold_samples = [
+            timed(get_or_create_session, user_id, project, session_id)[1]
+            for user_id, session_id in zip(users, session_ids)
+        ]
+        metrics.update(summarize(cold_samples, "cold_get"))
+    return metrics
+
+def bench_ingestion(params, env):
+    """Transcript and work item ingestion throughput and peak memory."""
+    from utils.transcript_processing import process_transcript
+
+    metrics = {}
+    paths = []
+    for index in range(2):
+        path = os.path.join(env["workdir"], f"transcript_{params['name']}_{index}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(make_transcript(params["transcript_lines"], seed=40 + index))
+        paths.append(path)
+
+    # Separate projects and transcripts, so the traced run embeds and writes as much as the timed one
+    project = f"bench-transcript-{params['name']}"
+    chunks, elapsed = timed(process_transcript, "bench-user", project, paths[0], "standup")
+    metrics.update({
+        "transcript_chunks": chunks,
+        "transcript_chunks_per_sec": round(chunks / elapsed, 1),
+        "transcript_total_ms": round(elapsed * 1e3, 3),
+        "transcript_peak_mb": peak_memory_mb(
+            process_transcript, "bench-user", f"{project}-traced", paths[1], "standup"
+        )
+    })
+
+    seeder, error = import_seeder()
+    if seeder is None:
+        metrics["work_items_skipped"] = error
+        return metrics
+
+    project = f"bench-seed-{params['name']}"
+    latency_ms = env["work_item_latency_ms"]
+    stats, elapsed = timed(
+        seed_work_items, seeder, project, make_work_items(params["work_items"], project, seed=5), latency_ms
+    )
+    metrics.update({
+        "work_items": stats["work_items"],
+        "work_item_chunks": stats["chunks_written"],
+        "work_item_errors": stats["errors"],
+        "work_items_per_sec": round(stats["work_items"] / elapsed, 1),
+        "work_item_chunks_per_sec": round(stats["chunks_written"] / elapsed, 1),
+        "work_items_total_ms": round(elapsed * 1e3, 3),
+        "work_items_peak_mb": peak_memory_mb(
+            seed_work_items, seeder, f"{project}-traced",
+            make_work_items(params["work_items"], f"{project}-traced", seed=6), latency_ms
+        )
+    })
+    return metrics
+
+def bench_rag_query(params, env):
+    """End-to-end streamed rag_query over a seeded project, with per-stage timings."""
+    from langchain_core.messages import SystemMessage
+    from core import rag_engine
+
+    seeder, error = import_seeder()
+    if seeder is None:
+        return {"skipped": error}
+
+    project = f"bench-rag-{params['name']}"
+    work_items = make_work_items(params["rag_work_items"], project, seed=7)
+    seed_work_items(seeder, project, work_items, env["work_item_latency_ms"])
+    queries = make_queries(
+        params["rag_queries"], seed=8, work_item_ids=[work_item["id"] for work_item in work_items]
+    )
+
+    # rag_query looks its steps up as module globals, so they can be timed by wrapping them
+    stage_samples = {"start_query": [], "retrieve": [], "prepare_inputs": []}
+    originals = {name: getattr(rag_engine, f"_{name}") for name in stage_samples}
+
+    def timing(name, function):
+        def wrapper(*args, **kwargs):
+            result, elapsed = timed(function, *args, **kwargs)
+            stage_samples[name].append(elapsed)
+            return result
+        return wrapper
+
+    recorder, embeddings = env["recorder"], env["embeddings"]
+    recorder.reset()
+    embedding_calls = embeddings.calls
+    ttft_samples, total_samples, turns = [], [], []
+    session_id = None
+    for name, function in originals.items():
+        setattr(rag_engine, f"_{name}", timing(name, function))
+    try:
+        for index, query in enumerate(queries):
+            turn = index % params["rag_turns_per_session"]
+            if turn == 0:
+                session_id = None
+            started = time.perf_counter()
+            first_chunk = None
+            for chunk in rag_engine.rag_query(
+                "bench-user", project, query, stream=True, session_id=session_id, create_new=turn == 0
+            ):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - started
+                if chunk.startswith("session_id:"):
+                    session_id = chunk[len("session_id:"):]
+            total_samples.append(time.perf_counter() - started)
+            ttft_samples.append(first_chunk)
+            turns.append(turn)
+    finally:
+        for name, function in originals.items():
+            setattr(rag_engine, f"_{name}", function)
+
+    # Answer calls only; history summaries go through the same model
+    answer_prefix = render_messages([SystemMessage(content=rag_engine.system_prompt_str)])
+    calls = [
+        (prompt_tokens, prefill_tokens)
+        for prompt, prompt_tokens, prefill_tokens
+        in zip(recorder.prompts, recorder.prompt_tokens, recorder.prefill_tokens)
+        if prompt.startswith(answer_prefix)
+    ]
+    prefill_by_turn = {}
+    for turn, (_, prefill_tokens) in zip(turns, calls):
+        prefill_by_turn.setdefault(turn, []).append(prefill_tokens)
+
+    metrics = {
+        "queries": len(queries),
+        "work_items": len(work_items),
+        "embedding_calls_per_query": round((embeddings.calls - embedding_calls) / len(queries), 2),
+        "prompt_tokens_mean": round(sum(tokens for tokens, _ in calls) / len(calls)) if calls else 0,
+        "prefill_tokens_mean": round(sum(tokens for _, tokens in calls) / len(calls)) if calls else 0,
+        "prefill_tokens_by_turn": {
+            str(turn): round(sum(values) / len(values)) for turn, values in sorted(prefill_by_turn.items())
+        }
+    }
+    for name, samples in stage_samples.items():
+        metrics.update(summarize(samples, name))
+    metrics.update(summarize(ttft_samples, "ttft"))
+    metrics.update(summarize(total_samples, "total"))
+    return metrics
+
+# Stage name -> benchmark, in run order
+STAGES = {
+    "intent": bench_intent,
+    "context": bench_context,
+    "sessions": bench_sessions,
+    "ingestion": bench_ingestion,
+    "rag_query": bench_rag_query
+}
@@ -0,0 +1,250 @@
+"""
+Deterministic local stand-ins for Ollama and Azure DevOps.
+
+StubChatModel replaces ChatOllama: it answers with words derived from the
+prompt, sleeps for a configurable first-token latency, prefill time and
+token rate, and records every prompt. Like Ollama it keeps the last
+prompt's prefix "cached" and reports only the tokens after the common prefix
+as prefilled (prompt_eval_count), so prompt-prefix reuse can be measured.
+
+StubEmbeddings replaces the embedding provider (local model, sidecar or
+Ollama embeddings) with hashed bag-of-words vectors, so lexically similar
+texts still land close together. StubWorkItemClient serves synthetic work
+items to the Azure DevOps seeder.
+"""
+import math
+import random
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+from typing import Any, Iterator, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from utils.text_processing import tokenize
+
+RESPONSE_VOCABULARY = (
+    "the work item covers login payment deployment pipeline review team sprint status "
+    "service endpoint database token release backlog meeting decision owner risk next "
+    "step update feature bug fix test environment api schema integration"
+).split()
+
+def render_messages(messages):
+    """Flatten chat messages into one prompt string, like a chat template."""
+    return "".join(f"<|{message.type}|>\n{message.content}<|end|>\n" for message in messages)
+
+def common_prefix_length(a, b):
+    """Length of the common prefix of two strings."""
+    limit = min(len(a), len(b))
+    low, high = 0, limit
+    # Binary search on slice equality is much faster than a character loop in Python
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+class PromptRecorder:
+    """
+    Prompts seen by the stub LLM, with Ollama-like prefix caching per model.
+    """
+
+    def __init__(self):
+        self.prompts = []
+        self.prompt_tokens = []
+        self.prefill_tokens = []
+        self._last_prompt = ""
+        self._lock = threading.Lock()
+
+    def record(self, prompt, chars_per_token):
+        """
+        Record a prompt.
+
+        Returns:
+            tuple: (prompt tokens, tokens that had to be prefilled)
+        """
+        with self._lock:
+            cached = common_prefix_length(self._last_prompt, prompt)
+            self._last_prompt = prompt
+            prompt_tokens = math.ceil(len(prompt) / chars_per_token)
+            prefill_tokens = math.ceil((len(prompt) - cached) / chars_per_token)
+            self.prompts.append(prompt)
+            self.prompt_tokens.append(prompt_tokens)
+            self.prefill_tokens.append(prefill_tokens)
+        return prompt_tokens, prefill_tokens
+
+    def reset(self):
+        with self._lock:
+            self.prompts = []
+            self.prompt_tokens = []
+            self.prefill_tokens = []
+            self._last_prompt = ""
+
+class StubChatModel(BaseChatModel):
+    """
+    Chat model with deterministic answers and configurable timing.
+
+    A latency or rate of 0 means no sleeping, so stage timings measure the
+    application code only.
+    """
+
+    recorder: Any = None
+    first_token_latency_ms: float = 0.0
+    prefill_tokens_per_second: float = 0.0
+    tokens_per_second: float = 0.0
+    response_tokens: int = 64
+    num_predict: Optional[int] = None
+    chars_per_token: int = 4
+
+    @property
+    def _llm_type(self):
+        return "stub-chat"
+
+    def _answer_words(self, prompt):
+        count = min(self.response_tokens, self.num_predict or self.response_tokens)
+        rng = random.Random(zlib.crc32(prompt.encode("utf-8")))
+        return [rng.choice(RESPONSE_VOCABULARY) for _ in range(count)]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        prompt = render_messages(messages)
+        recorder = self.recorder or PromptRecorder()
+        prompt_tokens, prefill_tokens = recorder.record(prompt, self.chars_per_token)
+
+        started = time.perf_counter()
+        delay = self.first_token_latency_ms / 1000
+        if self.prefill_tokens_per_second:
+            delay += prefill_tokens / self.prefill_tokens_per_second
+        if delay:
+            time.sleep(delay)
+        prompt_eval_ns = int((time.perf_counter() - started) * 1e9)
+
+        started = time.perf_counter()
+        words = self._answer_words(prompt)
+        for position, word in enumerate(words):
+            if position and self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            text = word if position == 0 else f" {word}"
+            if run_manager:
+                run_manager.on_llm_new_token(text)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(content=""),
+            generation_info={
+                "done": True,
+                "prompt_tokens": prompt_tokens,
+                "prompt_eval_count": prefill_tokens,
+                "prompt_eval_duration": prompt_eval_ns,
+                "eval_count": len(words),
+                "eval_duration": int((time.perf_counter() - started) * 1e9)
+            }
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = ""
+        generation_info = {}
+        for chunk in self._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            text += chunk.message.content
+            generation_info.update(chunk.generation_info or {})
+        return ChatResult(generations=[
+            ChatGeneration(message=AIMessage(content=text), generation_info=generation_info)
+        ])
+
+class StubEmbeddings(Embeddings):
+    """
+    Embedding provider with hashed bag-of-words vectors.
+
+    Exposes the provider interface (model_name, dimension, embed_documents,
+    embed_query) used by utils.embedding_provider.
+    """
+
+    def __init__(self, dimension=384, batch_latency_ms=0.0, per_text_ms=0.0, model_name="stub-embedding"):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.batch_latency_ms = batch_latency_ms
+        self.per_text_ms = per_text_ms
+        self.calls = 0
+        self.texts = 0
+
+    def _vector(self, text):
+        vector = [0.0] * self.dimension
+        for token in tokenize(text):
+            digest = zlib.crc32(token.encode("utf-8"))
+            vector[digest % self.dimension] += 1.0 if digest & 0x10000 else -1.0
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def _sleep(self, count):
+        delay = (self.batch_latency_ms + self.per_text_ms * count) / 1000
+        if delay:
+            time.sleep(delay)
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        self.texts += len(texts)
+        self._sleep(len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        self.texts += 1
+        self._sleep(1)
+        return self._vector(text)
+
+class StubWorkItemClient:
+    """
+    Work item tracking client serving synthetic work items by id.
+    """
+
+    def __init__(self, work_items, latency_ms=0.0):
+        self.work_items = {work_item["id"]: work_item for work_item in work_items}
+        self.latency_ms = latency_ms
+
+    def get_work_items(self, ids, fields=None, error_policy=None):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        details = []
+        for work_item_id in ids:
+            work_item = self.work_items.get(work_item_id)
+            if work_item is None:
+                details.append(None)
+                continue
+            details.append(SimpleNamespace(id=work_item_id, fields={
+                "System.Title": work_item["title"],
+                "System.Description": work_item["description"],
+                "System.WorkItemType": work_item["type"],
+                "System.TeamProject": work_item["project"],
+                "System.State": work_item["state"],
+                "System.ChangedDate": work_item["changed_date"]
+            }))
+        return details
+
+def install_stub_backends(llm_settings=None, embeddings=None):
+    """
+    Route the application's LLM and embedding calls to the stubs.
+
+    Args:
+        llm_settings (dict, optional): StubChatModel fields (latencies, rates, response length)
+        embeddings (StubEmbeddings, optional): Embedding stub (default: 384-d, no latency)
+
+    Returns:
+        tuple: (PromptRecorder, StubEmbeddings)
+    """
+    import utils.embedding_provider as embedding_provider
+    from core import rag_engine
+
+    embeddings = embeddings or StubEmbeddings()
+    embedding_provider._provider = embeddings
+
+    recorder = PromptRecorder()
+    settings = dict(llm_settings or {})
+    rag_engine.set_llm_factory(
+        lambda num_predict=None: StubChatModel(recorder=recorder, num_predict=num_predict, **settings)
+    )
+    return recorder, embeddings
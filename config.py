@@ -9,13 +9,199 @@ PERSIST_DIRECTORY = os.path.join(BASE_DIR, "chroma_db")
 UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
 DATA_FOLDER = os.path.join(BASE_DIR, "data")
 MODELS_DIRECTORY = os.path.join(BASE_DIR, "models")
+CACHE_DIRECTORY = os.path.join(BASE_DIR, "cache")
+STATE_DIRECTORY = os.path.join(BASE_DIR, "state")
 
 # LLM settings
 OLLAMA_BASE_URL = "http://localhost:11434"
 LLM_MODEL = "llama3:8b"
-EMBEDDING_MODEL = "nomic-embed-text"
+LLM_KEEP_ALIVE = "30m"  # How long Ollama keeps the model loaded after a request
+# Fixed context window for every request: a different num_ctx makes Ollama reload the model,
+# and prompts past the window are cut from the front, which defeats prompt-prefix caching
+LLM_NUM_CTX = 8192
+LLM_PREFILL_METRICS = False  # Log prefill tokens and time to first token per turn (see core.prompt_cache)
+EMBEDDING_MODEL = "nomic-embed-text"  # Used when EMBEDDING_BACKEND is "ollama"
+
+# Embedding provider shared by seeders, uploads and queries ("local", "sidecar" or "ollama").
+# "sidecar" embeds with the local model through the embedding service (python -m utils.embedding_service)
+EMBEDDING_BACKEND = "local"
+LOCAL_EMBEDDING_MODEL = "all-mpnet-base-v2"
+LOCAL_EMBEDDING_MODEL_PATH = os.path.join(MODELS_DIRECTORY, LOCAL_EMBEDDING_MODEL)
+EMBEDDING_BATCH_SIZE = 64
+EMBEDDING_NORMALIZE = True
+
+# Embedding sidecar: one model copy per host, concurrent requests micro-batched
+EMBEDDING_SERVICE_HOST = "127.0.0.1"
+EMBEDDING_SERVICE_PORT = 5002
+EMBEDDING_SERVICE_TIMEOUT = 30  # Seconds
+EMBEDDING_SERVICE_MAX_BATCH_SIZE = 64  # Texts per batched forward pass
+EMBEDDING_SERVICE_MAX_WAIT_MS = 5  # How long the first request of a batch waits for others
+
+# Retrieval settings
+RETRIEVER_K = 10
+VECTORSTORE_CACHE_SIZE = 32  # Max collections kept open in the registry
+
+# Fan-out retrieval over the shared and the caller's personal collection
+# Documents taken from each source without a policy k; with one, the shared source is
+# searched for k documents and the personal source for 3/5 of k
+RETRIEVAL_SOURCE_K = {"shared": 5, "personal": 3}
+RETRIEVAL_SOURCE_WEIGHTS = {"shared": 1.0, "personal": 1.0}  # RRF weights when merging the sources' rankings
+RETRIEVAL_DEADLINE_SECONDS = 2.0
+RETRIEVAL_MAX_WORKERS = 16
+
+# Query understanding: work item ids mentioned in a query are looked up directly (no
+# vector search); work item and meeting types become metadata filters on the search.
+# Bare numbers count as work item ids from WORK_ITEM_ID_MIN_DIGITS digits on.
+QUERY_FILTERS_ENABLED = True
+WORK_ITEM_ID_MIN_DIGITS = 5
+WORK_ITEM_TYPE_ALIASES = {  # Stored "type" value -> words that name it in a query
+    "Bug": ["bug", "bugs", "defect", "defects"],
+    "Product Backlog Item": ["pbi", "pbis", "product backlog item", "product backlog items", "backlog item", "backlog items"],
+    "User Story": ["user story", "user stories"],
+    "Feature": ["feature", "features"],
+    "Epic": ["epic", "epics"],
+}
+MEETING_TYPE_ALIASES = {  # Stored "meeting_type" value (as entered on upload) -> words that name it
+    "standup": ["standup", "stand-up", "daily"],
+    "refinement": ["refinement", "grooming"],
+    "planning": ["planning", "sprint planning"],
+    "retrospective": ["retrospective", "retro"],
+    "review": ["sprint review", "demo"],
+}
+
+# Retrieval and generation per detected intent: k chunks (each source searched in
+# proportion to RETRIEVAL_SOURCE_K), chunks below min_score dense relevance (0-1, the vector
+# search relevance, also with hybrid retrieval) dropped unless BM25 ranked them, the
+# context packed into context_tokens and the answer limited to num_predict tokens.
+# Intent entries override the default.
+RETRIEVAL_POLICY = {
+    "default": {"k": 6, "min_score": 0.35, "context_tokens": 1500, "num_predict": 512},
+    "general": {"k": 3, "min_score": 0.45, "context_tokens": 800, "num_predict": 256},
+    "explanation": {"k": 5},
+    "list": {"k": 6, "num_predict": 768},
+    "summarization": {"k": 8, "min_score": 0.3, "context_tokens": 2000, "num_predict": 768},
+}
+
+# Hybrid retrieval (BM25 fused with vector search via reciprocal-rank fusion)
+HYBRID_RETRIEVAL_ENABLED = True
+HYBRID_K = 5  # Documents returned after fusion
+HYBRID_FETCH_K = 20  # Candidates taken from each ranking
+RRF_K = 60
+BM25_INDEX_DIRECTORY = f"{PERSIST_DIRECTORY}_bm25"
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Cross-encoder rerank stage (opt-in); falls back to retrieval order past the budget
+RERANK_ENABLED = False
+RERANK_MODEL = "ms-marco-MiniLM-L-6-v2"
+RERANK_MODEL_PATH = os.path.join(MODELS_DIRECTORY, RERANK_MODEL)
+RERANK_TOP_N = 20  # Candidates scored; retrieval fetches at least this many when reranking
+RERANK_TOP_M = 4  # Documents kept
+RERANK_BUDGET_MS = 300
+
+# Context packing (token estimates use CHARS_PER_TOKEN)
+CONTEXT_TOKEN_BUDGET = 1500
+CHARS_PER_TOKEN = 4
+CONTEXT_MIN_OVERLAP_CHARS = 20  # Shortest chunk overlap that is stitched together
+CONTEXT_MAX_OVERLAP_CHARS = 200
+
+# Conversation history in prompts: the last max_turns turns verbatim, older ones
+# folded into a rolling summary once fold_batch extra turns have built up.
+# Per-project entries override the default.
+HISTORY_POLICY = {
+    "default": {"max_turns": 4, "fold_batch": 4, "summary_max_tokens": 200},
+}
+
+# Session store ("sqlite" persists sessions across restarts and processes, "memory" does not)
+SESSION_STORE_BACKEND = "sqlite"
+SESSION_DB_PATH = os.path.join(STATE_DIRECTORY, "sessions.sqlite")
+SESSION_FLUSH_INTERVAL = 0.5  # Seconds between write-behind flushes
+SESSION_FLUSH_BATCH_SIZE = 256  # Queued writes that trigger an early flush
+# Loaded sessions kept in memory; with the "memory" backend evicted sessions are gone
+SESSION_IDLE_TTL_SECONDS = 24 * 3600
+SESSION_CACHE_MAX_ENTRIES = 1000
+SESSION_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Estimated from message sizes
+SESSION_REAP_INTERVAL = 60  # Seconds
+
+# Query-embedding cache (set the path to None to keep it in memory only)
+QUERY_EMBEDDING_CACHE_SIZE = 2048
+QUERY_EMBEDDING_CACHE_PATH = os.path.join(CACHE_DIRECTORY, "query_embeddings.sqlite")
+
+# Content-addressed cache of chunk embeddings used by seeders and uploads
+CHUNK_EMBEDDING_CACHE_PATH = os.path.join(CACHE_DIRECTORY, "chunk_embeddings.sqlite")
+
+# Semantic answer cache (opt-in)
+ANSWER_CACHE_ENABLED = False
+ANSWER_CACHE_THRESHOLD = 0.95  # Minimum cosine similarity to reuse an answer
+ANSWER_CACHE_MAX_ENTRIES = 256  # Per project
+ANSWER_CACHE_TTL_SECONDS = 3600
+ANSWER_CACHE_STREAM_CHUNK_SIZE = 40  # Characters per streamed chunk on a hit
+
+# Intent detection: weighted keywords and phrases per intent, compiled once into a matcher.
+# Queries whose best score is below INTENT_MIN_SCORE, or tied, get the "general" intent.
+INTENT_KEYWORDS = {
+    "summarization": {
+        "summarize": 4, "summary": 4, "overview": 3, "brief": 3, "give me a": 2, "short": 2, "recap": 2,
+        "status": 2, "progress": 2, "update": 2, "meeting": 1, "project": 1
+    },
+    "explanation": {
+        "explain": 4, "how": 4, "why": 4, "what is": 3, "break down": 3, "describe": 2, "tell me": 2, "clarify": 2,
+        "works": 3, "process": 3, "deploy": 2, "authentication": 2, "jwt": 2, "database": 2, "api": 2,
+        "microservices": 2, "integration": 1, "setup": 1, "function": 1
+    },
+    "list": {
+        "list": 4, "steps": 4, "items": 3, "details": 3, "what are": 3, "show": 2, "all": 2, "outline": 2,
+        "tasks": 3, "action items": 3, "services": 2, "endpoints": 2, "components": 2, "tools": 2,
+        "requirements": 2, "features": 1, "schema": 1, "collections": 1
+    }
+}
+INTENT_MIN_SCORE = 3
+
+# Nearest-centroid intent classifier on the query embedding (opt-in). The query is then
+# embedded before retrieval, which reuses the embedding through the query-embedding cache.
+# Below INTENT_CLASSIFIER_MIN_SIMILARITY the keyword matcher decides.
+INTENT_CLASSIFIER_ENABLED = False
+INTENT_CLASSIFIER_MIN_SIMILARITY = 0.35
+INTENT_EXAMPLES = {
+    "summarization": [
+        "Summarize the last sprint review meeting",
+        "Give me a brief overview of the project status",
+        "What progress was made on the payment feature this week?"
+    ],
+    "explanation": [
+        "Explain how the authentication flow works",
+        "Why do we deploy the API through the staging pipeline?",
+        "How does the notification service talk to the database?"
+    ],
+    "list": [
+        "List the open tasks assigned to the backend team",
+        "What are the steps to set up the development environment?",
+        "Show all endpoints of the orders service"
+    ]
+}
+
+# Upload ingestion queue
+INGESTION_DB_PATH = os.path.join(STATE_DIRECTORY, "ingestion_jobs.sqlite")
+INGESTION_WORKERS = 2
+INGESTION_MAX_QUEUE_DEPTH = 50  # Uploads beyond this are rejected with 429
+INGESTION_POLL_INTERVAL = 1.0  # Seconds
+INGEST_READ_BLOCK_SIZE = 64 * 1024  # Characters read from a transcript at a time
+INGEST_BATCH_SIZE = 64  # Chunks embedded and written per batch
 
 # API settings
 DEBUG = True
 HOST = "0.0.0.0"
 PORT = 5001
+
+# Production server (gunicorn -c gunicorn.conf.py wsgi:app)
+SERVER_WORKERS = 2
+SERVER_THREADS = 8  # Concurrent requests (and answer streams) per worker
+SERVER_TIMEOUT = 300  # Seconds without a worker heartbeat before it is restarted
+SERVER_GRACEFUL_TIMEOUT = 120  # Seconds in-flight streams get to finish on shutdown
+PRELOAD_SHARED_RESOURCES = True  # Load models and BM25 indexes before forking workers
+
+# Start-up warm-up (/readyz reports ready once it has finished)
+WARMUP_ENABLED = True
+WARMUP_PROJECTS = []  # Projects whose shared collections are opened during warm-up
+WARMUP_RETRY_INITIAL_SECONDS = 5  # Delay before retrying failed warm-up steps; doubles per attempt
+WARMUP_RETRY_MAX_SECONDS = 300
@@ -2,7 +2,7 @@
 Core business logic package.
 """
 from core.rag_engine import rag_query
-from core.intent_detection import detect_intent, get_instruction_and_format
+from core.intent_detection import detect_intent, detect_intents, get_instruction_and_format
 from core.session_manager import (
     get_or_create_session,
     list_user_sessions,
@@ -16,6 +16,7 @@ from core.session_manager import (
 __all__ = [
     'rag_query',
     'detect_intent',
+    'detect_intents',
     'get_instruction_and_format',
     'get_or_create_session',
     'list_user_sessions',
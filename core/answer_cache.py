@@ -0,0 +1,146 @@
+"""
+Semantic answer cache for near-duplicate questions.
+
+Answers are stored per project together with the query embedding and the
+detected intent. A new query reuses a cached answer when its embedding is
+within the configured cosine-similarity threshold of a cached one and the
+intents match.
+"""
+import math
+import threading
+import time
+from collections import deque
+
+from utils.text_processing import tokenize
+
+# Words that usually point back into the conversation ("explain it again")
+CONTEXT_REFERENCE_WORDS = {
+    "it", "its", "this", "that", "these", "those", "they", "them", "their",
+    "he", "she", "him", "her", "above", "previous", "earlier", "again",
+    "more", "else", "same", "former", "latter"
+}
+
+
+def cosine_similarity(a, b):
+    """
+    Compute the cosine similarity of two vectors.
+
+    Args:
+        a (list): First vector
+        b (list): Second vector
+
+    Returns:
+        float: Similarity in [-1, 1]
+    """
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = math.sqrt(sum(x * x for x in a))
+    norm_b = math.sqrt(sum(y * y for y in b))
+    if not norm_a or not norm_b:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+def is_context_dependent(query_text, has_history):
+    """
+    Decide whether a query depends on the conversation so far.
+
+    Args:
+        query_text (str): User query
+        has_history (bool): Whether the session already has messages
+
+    Returns:
+        bool: True if the answer may rely on earlier turns
+    """
+    if not has_history:
+        return False
+    words = [word.strip("?.!,;:'\"") for word in tokenize(query_text)]
+    return any(word in CONTEXT_REFERENCE_WORDS for word in words)
+
+
+class AnswerCache:
+    """
+    Per-project cache of generated answers keyed by query embedding.
+    """
+
+    def __init__(self, threshold=0.95, max_entries_per_project=256, ttl_seconds=3600):
+        self.threshold = threshold
+        self.max_entries_per_project = max_entries_per_project
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, project, embedding, intent):
+        """
+        Find a cached answer for a similar query.
+
+        Args:
+            project (str): Project identifier
+            embedding (list): Query embedding
+            intent (str): Detected intent of the query
+
+        Returns:
+            str or None: Cached answer, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entries = self._entries.get(project)
+            best_answer, best_score = None, self.threshold
+            if entries:
+                for entry in entries:
+                    if entry["intent"] != intent or now - entry["created_at"] > self.ttl_seconds:
+                        continue
+                    score = cosine_similarity(embedding, entry["embedding"])
+                    if score >= best_score:
+                        best_answer, best_score = entry["answer"], score
+            if best_answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return best_answer
+
+    def store(self, project, embedding, intent, query_text, answer):
+        """
+        Cache a generated answer.
+
+        Args:
+            project (str): Project identifier
+            embedding (list): Query embedding
+            intent (str): Detected intent of the query
+            query_text (str): User query
+            answer (str): Generated answer
+        """
+        with self._lock:
+            entries = self._entries.setdefault(project, deque(maxlen=self.max_entries_per_project))
+            entries.append({
+                "embedding": list(embedding),
+                "intent": intent,
+                "query": query_text,
+                "answer": answer,
+                "created_at": time.time()
+            })
+
+    def invalidate_project(self, project):
+        """
+        Drop every cached answer of a project.
+
+        Args:
+            project (str): Project identifier
+        """
+        with self._lock:
+            self._entries.pop(project, None)
+
+    def stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Hit/miss counters and number of cached answers
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": sum(len(entries) for entries in self._entries.values())
+            }
@@ -0,0 +1,188 @@
+"""
+Bounded conversation history for prompts.
+
+The last N turns of a session are kept verbatim; older turns are folded into
+a rolling summary by a background worker after an answer has been sent, so
+summarization never adds to a query's latency. The formatted history string
+is maintained incrementally as turns are added and folded.
+
+Between folds the history only grows at the end, so prompts built from it
+keep a byte-identical prefix from one turn to the next (see
+core.prompt_cache).
+
+Folding uses hysteresis: it starts once fold_batch turns beyond max_turns
+have built up and folds all of them in one summarization call.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from utils.text_processing import estimate_tokens
+
+NO_HISTORY = "No previous conversation."
+
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history-summary")
+
+def get_history_policy(project):
+    """
+    Get the history policy of a project.
+
+    Args:
+        project (str): Project identifier
+
+    Returns:
+        dict: max_turns, fold_batch and summary_max_tokens
+    """
+    policy = dict(config.HISTORY_POLICY["default"])
+    policy.update(config.HISTORY_POLICY.get(project, {}))
+    return policy
+
+def format_turn(query, answer):
+    """Format one exchange the way it appears in the prompt."""
+    return f"Human: {query}\nAI: {answer}\n"
+
+class ConversationHistory:
+    """
+    Verbatim recent turns plus a rolling summary of older ones.
+    """
+
+    def __init__(self, max_turns=4, fold_batch=4, summary_max_tokens=200, summarizer=None, on_summary=None):
+        self.max_turns = max_turns
+        self.fold_batch = fold_batch
+        self.summary_max_tokens = summary_max_tokens
+        self.summarizer = summarizer
+        # Called with (summary, summarized_turns) after each fold, e.g. to persist the summary
+        self.on_summary = on_summary
+        self.summary = ""
+        self.summarized_turns = 0
+        self.turns = []
+        self.exchanges = []
+        self._turns_text = ""
+        self._formatted = None
+        self._folding = False
+        self._lock = threading.Lock()
+
+    def add_turn(self, query, answer):
+        """
+        Add an exchange and start folding old turns if enough have built up.
+
+        Args:
+            query (str): User query
+            answer (str): Assistant answer
+        """
+        turn = format_turn(query, answer)
+        with self._lock:
+            self.turns.append(turn)
+            self.exchanges.append((query, answer))
+            self._turns_text += turn
+            self._formatted = None
+            excess = len(self.turns) - self.max_turns
+            if self.summarizer is None:
+                # Without a summarizer old turns are simply dropped
+                if excess > 0:
+                    self._drop_oldest(excess)
+                return
+            if excess >= self.fold_batch and not self._folding:
+                self._folding = True
+                _summary_executor.submit(self._fold, self.turns[:excess], self.summary)
+            elif excess > 2 * self.fold_batch:
+                # Summaries are failing or far behind; keep the prompt bounded regardless
+                self._drop_oldest(excess - 2 * self.fold_batch)
+
+    def _drop_oldest(self, count):
+        dropped = self.turns[:count]
+        self.turns = self.turns[count:]
+        self.exchanges = self.exchanges[count:]
+        self._turns_text = self._turns_text[sum(len(turn) for turn in dropped):]
+        self._formatted = None
+
+    def _fold(self, turns, previous_summary):
+        try:
+            summary = self.summarizer(previous_summary, "".join(turns), self.summary_max_tokens)
+        except Exception as e:
+            print(f"History summarization failed: {e}")
+            with self._lock:
+                self._folding = False
+            return
+        with self._lock:
+            self._folding = False
+            # The history may have been cleared while the summary was being written
+            if self.turns[:len(turns)] != turns:
+                return
+            self.summary = summary.strip()
+            self.summarized_turns += len(turns)
+            self._drop_oldest(len(turns))
+            summarized_turns = self.summarized_turns
+        if self.on_summary is not None:
+            self.on_summary(summary.strip(), summarized_turns)
+
+    def restore(self, summary, summarized_turns, turns):
+        """
+        Restore a saved history without summarizing anything.
+
+        Args:
+            summary (str): Saved rolling summary
+            summarized_turns (int): Number of turns folded into the summary
+            turns (list): All (query, answer) exchanges of the session, oldest first
+        """
+        # Turns that were never folded (e.g. the process stopped first) are dropped past the hard bound
+        exchanges = [tuple(turn) for turn in turns[summarized_turns:]][-(self.max_turns + 2 * self.fold_batch):]
+        recent = [format_turn(query, answer) for query, answer in exchanges]
+        with self._lock:
+            self.summary = summary or ""
+            self.summarized_turns = summarized_turns
+            self.turns = recent
+            self.exchanges = exchanges
+            self._turns_text = "".join(recent)
+            self._formatted = None
+
+    def clear(self):
+        """Forget all turns and the summary."""
+        with self._lock:
+            self.summary = ""
+            self.summarized_turns = 0
+            self.turns = []
+            self.exchanges = []
+            self._turns_text = ""
+            self._formatted = None
+
+    def format(self):
+        """
+        Get the history as it goes into the prompt.
+
+        Returns:
+            str: Summary of older turns followed by the recent turns verbatim
+        """
+        with self._lock:
+            if self._formatted is None:
+                if self.summary:
+                    self._formatted = f"Summary of earlier conversation: {self.summary}\n{self._turns_text}"
+                else:
+                    self._formatted = self._turns_text or NO_HISTORY
+            return self._formatted
+
+    def snapshot(self):
+        """
+        Get the history as separate parts, for prompts that send turns as messages.
+
+        Returns:
+            tuple: (summary of older turns, recent (query, answer) exchanges oldest first)
+        """
+        with self._lock:
+            return self.summary, list(self.exchanges)
+
+    def stats(self):
+        """
+        Get the size of the history.
+
+        Returns:
+            dict: Turn counts and prompt token estimates
+        """
+        formatted = self.format()
+        with self._lock:
+            return {
+                "verbatim_turns": len(self.turns),
+                "summarized_turns": self.summarized_turns,
+                "summary_tokens": estimate_tokens(self.summary, config.CHARS_PER_TOKEN),
+                "prompt_tokens": estimate_tokens(formatted, config.CHARS_PER_TOKEN)
+            }
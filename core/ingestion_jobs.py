@@ -0,0 +1,302 @@
+"""
+Asynchronous ingestion job queue.
+
+Uploaded transcripts are recorded as jobs in a local SQLite database and
+processed by a pool of background worker threads, so the upload request
+returns immediately. Jobs survive restarts: anything left "running" by a
+previous process is put back in the queue on start-up.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+import config
+from utils.transcript_processing import process_transcript
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def job_upload_path(job_id, filename):
+    """
+    Path an upload is saved to for its job.
+
+    The job id prefix keeps pending jobs from sharing (and overwriting) a
+    file when the same name is uploaded twice.
+
+    Args:
+        job_id (str): Job identifier
+        filename (str): Upload file name
+
+    Returns:
+        str: Path in config.UPLOAD_FOLDER
+    """
+    return os.path.join(config.UPLOAD_FOLDER, f"{job_id}_{filename}")
+
+def transcript_source(job):
+    """
+    Stable name of a job's transcript: its upload path without the job id
+    prefix, so re-uploading a transcript replaces the earlier version's chunks.
+    """
+    directory, filename = os.path.split(job["filepath"])
+    prefix = f"{job['id']}_"
+    if filename.startswith(prefix):
+        filename = filename[len(prefix):]
+    return os.path.join(directory, filename)
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue has reached its maximum depth."""
+
+
+class IngestionJobQueue:
+    """
+    SQLite-backed job queue served by background ingestion workers.
+    """
+
+    def __init__(self, db_path, max_depth=50, num_workers=2, poll_interval=1.0):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self.max_depth = max_depth
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._workers = []
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    project TEXT NOT NULL,
+                    filepath TEXT NOT NULL,
+                    meeting_type TEXT,
+                    chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                    chunks_written INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status "
+                "ON ingestion_jobs (status, created_at)"
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def new_job_id():
+        """Generate a job identifier, e.g. to name the job's upload before submitting it."""
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def _depth(conn):
+        return conn.execute(
+            "SELECT COUNT(*) FROM ingestion_jobs WHERE status IN (?, ?)",
+            (STATUS_QUEUED, STATUS_RUNNING)
+        ).fetchone()[0]
+
+    def is_full(self):
+        """
+        Check whether max_depth jobs are already queued or running.
+
+        Returns:
+            bool: True if a submit would currently be rejected
+        """
+        with closing(self._connect()) as conn:
+            return self._depth(conn) >= self.max_depth
+
+    def submit(self, user_id, project, filepath, meeting_type, job_id=None):
+        """
+        Enqueue a transcript for ingestion.
+
+        Args:
+            user_id (str): User identifier
+            project (str): Project identifier
+            filepath (str): Path of the saved transcript
+            meeting_type (str): Type of meeting
+            job_id (str, optional): Job identifier from new_job_id (default: a new one)
+
+        Returns:
+            str: Job identifier
+
+        Raises:
+            QueueFullError: If max_depth jobs are already queued or running
+        """
+        job_id = job_id or self.new_job_id()
+        now = time.time()
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            depth = self._depth(conn)
+            if depth >= self.max_depth:
+                conn.execute("ROLLBACK")
+                raise QueueFullError(f"Ingestion queue is full ({depth} jobs pending)")
+            conn.execute(
+                "INSERT INTO ingestion_jobs (id, status, user_id, project, filepath, meeting_type, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, STATUS_QUEUED, user_id, project, filepath, meeting_type, now, now)
+            )
+            conn.execute("COMMIT")
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """
+        Get the status and progress of a job.
+
+        Args:
+            job_id (str): Job identifier
+
+        Returns:
+            dict or None: Job details, or None if the job does not exist
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "user_id": row["user_id"],
+            "project": row["project"],
+            "meeting_type": row["meeting_type"],
+            "chunks_embedded": row["chunks_embedded"],
+            "chunks_written": row["chunks_written"],
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+
+    def _claim_next(self):
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM ingestion_jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (STATUS_QUEUED,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE ingestion_jobs SET status = ?, updated_at = ? WHERE id = ?",
+                    (STATUS_RUNNING, time.time(), row["id"])
+                )
+            conn.execute("COMMIT")
+        return row
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                f"UPDATE ingestion_jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id)
+            )
+
+    def _run_job(self, job):
+        job_id = job["id"]
+
+        def report_progress(chunks_embedded, chunks_written):
+            self._update(job_id, chunks_embedded=chunks_embedded, chunks_written=chunks_written)
+
+        try:
+            process_transcript(
+                job["user_id"],
+                job["project"],
+                job["filepath"],
+                job["meeting_type"],
+                progress_callback=report_progress,
+                source=transcript_source(job)
+            )
+            self._update(job_id, status=STATUS_DONE)
+            # The transcript is in the collection now; failed jobs keep their file for inspection
+            if os.path.exists(job["filepath"]):
+                os.remove(job["filepath"])
+        except Exception as e:
+            print(f"Ingestion job {job_id} failed: {e}")
+            self._update(job_id, status=STATUS_FAILED, error=str(e))
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            job = self._claim_next()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run_job(job)
+
+    def requeue_interrupted(self):
+        """
+        Put jobs left "running" by a previous shutdown back in the queue.
+
+        Only call this while no worker of any process is running jobs.
+
+        Returns:
+            int: Number of jobs re-queued
+        """
+        with closing(self._connect()) as conn:
+            requeued = conn.execute(
+                "UPDATE ingestion_jobs SET status = ?, updated_at = ? WHERE status = ?",
+                (STATUS_QUEUED, time.time(), STATUS_RUNNING)
+            ).rowcount
+        if requeued:
+            print(f"Re-queued {requeued} interrupted ingestion jobs")
+        return requeued
+
+    def start(self, requeue_interrupted=True):
+        """
+        Start the worker pool.
+
+        Args:
+            requeue_interrupted (bool): Re-queue jobs interrupted by a previous
+                shutdown first; pass False when several processes share the queue
+                and the re-queue has been done once before any of them started
+        """
+        if self._workers:
+            return
+        if requeue_interrupted:
+            self.requeue_interrupted()
+        self._stopping.clear()
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"ingestion-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        print(f"Started {self.num_workers} ingestion workers")
+
+    def stop(self, timeout=None):
+        """
+        Stop the worker pool after the jobs currently running finish.
+
+        Args:
+            timeout (float, optional): Seconds to wait for each worker
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+
+ingestion_queue = IngestionJobQueue(
+    config.INGESTION_DB_PATH,
+    max_depth=config.INGESTION_MAX_QUEUE_DEPTH,
+    num_workers=config.INGESTION_WORKERS,
+    poll_interval=config.INGESTION_POLL_INTERVAL
+)
+
+
+def start_ingestion_workers(requeue_interrupted=True):
+    """Start the background ingestion workers for this process."""
+    ingestion_queue.start(requeue_interrupted=requeue_interrupted)
@@ -1,51 +1,233 @@
 """
 Intent detection module for query classification.
+
+Keyword intents are scored by an IntentMatcher compiled once from a keyword
+table (config.INTENT_KEYWORDS). Keywords and phrases are token sequences in
+an Aho-Corasick automaton, so a query is matched in a single pass over its
+tokens however large the table grows.
+
+The optional nearest-centroid classifier (config.INTENT_CLASSIFIER_ENABLED)
+labels a query from its embedding instead, comparing it with the mean
+embedding of each intent's example queries (config.INTENT_EXAMPLES).
 """
+import math
+import string
+import threading
+from collections import deque
+
+import config
+from utils.text_processing import tokenize
+
+GENERAL_INTENT = "general"
+
+def intent_tokens(text):
+    """
+    Split text into the tokens keywords are matched on.
+
+    Args:
+        text (str): Query or keyword text
+
+    Returns:
+        list: Lowercase tokens without surrounding punctuation
+    """
+    tokens = [token.strip(string.punctuation) for token in tokenize(text)]
+    return [token for token in tokens if token]
+
+class IntentMatcher:
+    """
+    Weighted keyword and phrase matcher over query tokens.
+    """
+
+    def __init__(self, keyword_table, min_score=3):
+        """
+        Compile a keyword table.
+
+        Args:
+            keyword_table (dict): intent -> {keyword or phrase: weight}
+            min_score (int): Lowest winning score; below it the intent is general
+        """
+        self.intents = list(keyword_table)
+        self.min_score = min_score
+        self._weights = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [[]]
+
+        for intent, keywords in keyword_table.items():
+            for keyword, weight in keywords.items():
+                tokens = intent_tokens(keyword)
+                if not tokens:
+                    continue
+                self._add(tokens, len(self._weights))
+                self._weights.append((intent, weight))
+        self._link()
+
+    def _add(self, tokens, keyword_id):
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+                self._goto[state][token] = next_state
+            state = next_state
+        self._outputs[state].append(keyword_id)
+
+    def _link(self):
+        # Breadth-first failure links; each state also reports the keywords of its suffix states
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(token, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def scores(self, query_text):
+        """
+        Score a query against every intent.
+
+        Each keyword counts once, however often it occurs.
+
+        Args:
+            query_text (str): User query
+
+        Returns:
+            dict: intent -> score
+        """
+        matched = set()
+        state = 0
+        for token in intent_tokens(query_text):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            matched.update(self._outputs[state])
+
+        scores = dict.fromkeys(self.intents, 0)
+        for keyword_id in matched:
+            intent, weight = self._weights[keyword_id]
+            scores[intent] += weight
+        return scores
+
+    def detect(self, query_text):
+        """
+        Detect the intent of a query.
 
-def detect_intent(query_text):
-
-    query_lower = " ".join(query_text.lower().split())
-    words = query_lower.split()
-    
-    intent_keywords = {
-        "summarization": {
-            "summarize": 4, "summary": 4, "overview": 3, "brief": 3, "give me a": 2, "short": 2, "recap": 2,
-            "status": 2, "progress": 2, "update": 2, "meeting": 1, "project": 1
-        },
-        "explanation": {
-            "explain": 4, "how": 4, "why": 4, "what is": 3, "break down": 3, "describe": 2, "tell me": 2, "clarify": 2,
-            "works": 3, "process": 3, "deploy": 2, "authentication": 2, "jwt": 2, "database": 2, "api": 2, 
-            "microservices": 2, "integration": 1, "setup": 1, "function": 1
-        },
-        "list": {
-            "list": 4, "steps": 4, "items": 3, "details": 3, "what are": 3, "show": 2, "all": 2, "outline": 2,
-            "tasks": 3, "action items": 3, "services": 2, "endpoints": 2, "components": 2, "tools": 2, 
-            "requirements": 2, "features": 1, "schema": 1, "collections": 1
-        }
-    }
-    
-    scores = {"summarization": 0, "explanation": 0, "list": 0}
-    for intent, keywords in intent_keywords.items():
-        for keyword, weight in keywords.items():
-            if " " in keyword:
-                if keyword in query_lower:
-                    scores[intent] += weight
-            else:
-                if keyword in words:
-                    scores[intent] += weight
-    
-    print("The intent scores", scores)
-    top_intent = max(scores, key=scores.get)
-    max_score = scores[top_intent]
-    
-    if max_score < 3:
-        return "general"
-    
-    sorted_scores = sorted(scores.values(), reverse=True)
-    if len(sorted_scores) > 1 and sorted_scores[0] == sorted_scores[1]:
-        return "general"
-    
-    return top_intent
+        Args:
+            query_text (str): User query
+
+        Returns:
+            str: Best-scoring intent, or general if it is weak or tied
+        """
+        scores = self.scores(query_text)
+        if not scores:
+            return GENERAL_INTENT
+        ranked = sorted(scores.values(), reverse=True)
+        if ranked[0] < self.min_score or (len(ranked) > 1 and ranked[0] == ranked[1]):
+            return GENERAL_INTENT
+        return max(scores, key=scores.get)
+
+def _normalize(vector):
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else list(vector)
+
+class CentroidIntentClassifier:
+    """
+    Nearest-centroid intent classifier on query embeddings.
+
+    Centroids are computed lazily, on first use, from the example queries
+    of each intent.
+    """
+
+    def __init__(self, examples, min_similarity=0.35):
+        self.examples = examples
+        self.min_similarity = min_similarity
+        self._centroids = None
+        self._lock = threading.Lock()
+
+    @property
+    def centroids(self):
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    from utils.embedding_utils import get_embedding_model
+
+                    centroids = {}
+                    for intent, queries in self.examples.items():
+                        if not queries:
+                            continue
+                        vectors = [_normalize(vector) for vector in get_embedding_model().embed_documents(queries)]
+                        centroids[intent] = _normalize([sum(values) / len(vectors) for values in zip(*vectors)])
+                    self._centroids = centroids
+        return self._centroids
+
+    def warm_up(self):
+        """Compute the centroids ahead of the first query."""
+        return len(self.centroids)
+
+    def classify(self, query_embedding):
+        """
+        Find the intent whose centroid is closest to a query embedding.
+
+        Args:
+            query_embedding (list): Query embedding
+
+        Returns:
+            tuple: (intent or None if no centroid is similar enough, cosine similarity)
+        """
+        query = _normalize(query_embedding)
+        best_intent, best_similarity = None, -1.0
+        for intent, centroid in self.centroids.items():
+            similarity = sum(x * y for x, y in zip(query, centroid))
+            if similarity > best_similarity:
+                best_intent, best_similarity = intent, similarity
+        if best_similarity < self.min_similarity:
+            return None, best_similarity
+        return best_intent, best_similarity
+
+intent_matcher = IntentMatcher(config.INTENT_KEYWORDS, min_score=config.INTENT_MIN_SCORE)
+intent_classifier = CentroidIntentClassifier(
+    config.INTENT_EXAMPLES,
+    min_similarity=config.INTENT_CLASSIFIER_MIN_SIMILARITY
+)
+
+def detect_intent(query_text, query_embedding=None):
+    """
+    Detect the intent of a query.
+
+    Args:
+        query_text (str): User query
+        query_embedding (list, optional): Query embedding, used by the
+            centroid classifier when it is enabled
+
+    Returns:
+        str: summarization, explanation, list or general
+    """
+    if query_embedding is not None and config.INTENT_CLASSIFIER_ENABLED:
+        intent, _ = intent_classifier.classify(query_embedding)
+        if intent is not None:
+            return intent
+    return intent_matcher.detect(query_text)
+
+def detect_intents(queries, query_embeddings=None):
+    """
+    Detect the intents of several queries.
+
+    Args:
+        queries (list): User queries
+        query_embeddings (list, optional): Embeddings of the queries, in the same order
+
+    Returns:
+        list: Intents, in the order of the queries
+    """
+    if query_embeddings is None:
+        query_embeddings = [None] * len(queries)
+    return [detect_intent(query, embedding) for query, embedding in zip(queries, query_embeddings)]
 
 def get_instruction_and_format(intent):
     if intent == "summarization":
@@ -57,8 +239,8 @@ def get_instruction_and_format(intent):
     elif intent == "list":
         instruction = "Provide a detailed response."
         format_instruction = "Use bullet points for key items or steps."
-    else: 
+    else:
         instruction = "Answer directly."
         format_instruction = "Use plain text; if the query is unclear, ask for clarification."
-    
+
     return instruction, format_instruction
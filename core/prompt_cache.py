@@ -0,0 +1,139 @@
+"""
+Prompt-prefix tracking and prefill measurement for LLM context reuse.
+
+Ollama keeps the KV cache of the last prompt a model slot evaluated and
+only prefills the part of a new prompt after the longest common prefix.
+Query prompts are therefore laid out with everything that is stable across
+a session's turns first (system text, history summary, earlier turns as
+messages) and the per-query parts last (instructions, retrieved context,
+the question). PrefixTracker remembers the stable prefix last sent for each
+session, so every turn reports how much of its prompt the previous turn
+should have left in the cache.
+
+With config.LLM_PREFILL_METRICS set, PrefillMetricsHandler records what
+the server actually prefilled (prompt_eval_count) and the time to the first
+token of every answer.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import config
+from utils.text_processing import estimate_tokens
+
+class PrefixTracker:
+    """
+    Stable prompt prefix last sent per session, bounded by LRU.
+    """
+
+    def __init__(self, max_sessions=1000, chars_per_token=4):
+        self.max_sessions = max_sessions
+        self.chars_per_token = chars_per_token
+        self._prefixes = OrderedDict()
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.stable_turns = 0
+        self.prefix_tokens = 0
+        self.reusable_tokens = 0
+
+    def observe(self, session_id, messages):
+        """
+        Record the stable prefix of a session's next prompt.
+
+        Args:
+            session_id (str): Session identifier
+            messages (list): (role, content) pairs making up the stable prefix, in prompt order
+
+        Returns:
+            dict: prefix_tokens, reusable_tokens (prefix shared with the previous turn)
+                  and prefix_stable (whether the previous prefix was only extended)
+        """
+        fingerprints = [hash(message) for message in messages]
+        sizes = [estimate_tokens(content, self.chars_per_token) for _, content in messages]
+
+        with self._lock:
+            previous = self._prefixes.pop(session_id, None)
+            self._prefixes[session_id] = fingerprints
+            while len(self._prefixes) > self.max_sessions:
+                self._prefixes.popitem(last=False)
+
+            shared = 0
+            if previous is not None:
+                for old, new in zip(previous, fingerprints):
+                    if old != new:
+                        break
+                    shared += 1
+            stable = previous is not None and shared == len(previous)
+
+            result = {
+                "prefix_tokens": sum(sizes),
+                "reusable_tokens": sum(sizes[:shared]),
+                "prefix_stable": stable
+            }
+            self.turns += 1
+            self.stable_turns += stable
+            self.prefix_tokens += result["prefix_tokens"]
+            self.reusable_tokens += result["reusable_tokens"]
+        return result
+
+    def stats(self):
+        """
+        Get prefix-reuse counters.
+
+        Returns:
+            dict: Tracked sessions, turns, stable turns and token totals
+        """
+        with self._lock:
+            return {
+                "sessions": len(self._prefixes),
+                "turns": self.turns,
+                "stable_turns": self.stable_turns,
+                "prefix_tokens": self.prefix_tokens,
+                "reusable_tokens": self.reusable_tokens
+            }
+
+class PrefillMetricsHandler(BaseCallbackHandler):
+    """
+    Callback handler that measures one LLM call of a query.
+
+    metrics holds prompt_tokens (what the server prefilled, excluding
+    cached tokens), prompt_eval_ms, ttft_ms and the tracker's prefix
+    estimate, and is complete once the LLM call has ended.
+    """
+
+    def __init__(self, session_id, prefix=None):
+        self.session_id = session_id
+        self.metrics = dict(prefix or {})
+        self._started = None
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._started = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._started = time.perf_counter()
+
+    def on_llm_new_token(self, token, **kwargs):
+        if "ttft_ms" not in self.metrics and self._started is not None:
+            self.metrics["ttft_ms"] = round((time.perf_counter() - self._started) * 1000)
+
+    def on_llm_end(self, response, **kwargs):
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        info = {}
+        if generation is not None:
+            info = generation.generation_info or getattr(getattr(generation, "message", None), "response_metadata", {}) or {}
+        # Ollama reports durations in nanoseconds; prompt_eval_count leaves out tokens served from its cache
+        self.metrics["prompt_tokens"] = info.get("prompt_eval_count", 0)
+        self.metrics["prompt_eval_ms"] = round(info.get("prompt_eval_duration", 0) / 1e6)
+        self.metrics["completion_tokens"] = info.get("eval_count", 0)
+        if self._started is not None:
+            self.metrics["total_ms"] = round((time.perf_counter() - self._started) * 1000)
+        print(f"Prefill for session {self.session_id}: {self.metrics.get('prompt_tokens')} tokens prefilled "
+              f"({self.metrics.get('reusable_tokens', 0)} of {self.metrics.get('prefix_tokens', 0)} prefix tokens reusable), "
+              f"prompt eval {self.metrics.get('prompt_eval_ms')} ms, first token {self.metrics.get('ttft_ms')} ms")
+
+prefix_tracker = PrefixTracker(
+    max_sessions=config.SESSION_CACHE_MAX_ENTRIES,
+    chars_per_token=config.CHARS_PER_TOKEN
+)
@@ -0,0 +1,93 @@
+"""
+Query understanding: structured filters extracted from the query text.
+
+Work item ids, work item types and meeting types mentioned in a query are
+turned into filters on the metadata the seeders and uploads store
+(work_item_id and type on Azure DevOps chunks, meeting_type on
+transcripts). Work item ids are answered by an exact lookup instead of a
+vector search; types become Chroma ``where`` filters whose results are
+fused with the unfiltered search, so they boost matching chunks without
+excluding the rest.
+"""
+import re
+
+import config
+from core.retrieval import PERSONAL_SOURCE, SHARED_SOURCE
+
+# Only explicit forms: "work item 48213", "PBI #48213", "#48213" ("action item 2" is not an id)
+_PREFIXED_ID_PATTERN = re.compile(r"(?:\b(?:work\s*items?|pbis?)\s*#?\s*|#)(\d+)\b", re.IGNORECASE)
+_NUMBER_PATTERN = re.compile(r"\b\d+\b")
+
+def _alias_pattern(aliases):
+    # Longest aliases first, so "user story" wins over "story"
+    alternatives = sorted((re.escape(alias) for alias in aliases), key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(alternatives) + r")\b", re.IGNORECASE)
+
+def _compile_aliases(alias_table):
+    return [(value, _alias_pattern(aliases)) for value, aliases in alias_table.items() if aliases]
+
+_work_item_type_patterns = _compile_aliases(config.WORK_ITEM_TYPE_ALIASES)
+_meeting_type_patterns = _compile_aliases(config.MEETING_TYPE_ALIASES)
+
+def extract_work_item_ids(query_text):
+    """
+    Find the work item ids mentioned in a query.
+
+    Numbers count as ids after "work item", "PBI" or "#", or when they have
+    at least config.WORK_ITEM_ID_MIN_DIGITS digits on their own.
+
+    Args:
+        query_text (str): User query
+
+    Returns:
+        list: Work item ids as strings, in order of appearance
+    """
+    found = [(match.start(1), match.group(1)) for match in _PREFIXED_ID_PATTERN.finditer(query_text)]
+    found += [
+        (match.start(), match.group()) for match in _NUMBER_PATTERN.finditer(query_text)
+        if len(match.group()) >= config.WORK_ITEM_ID_MIN_DIGITS
+    ]
+    return list(dict.fromkeys(str(int(work_item_id)) for _, work_item_id in sorted(found)))
+
+def _match_aliases(patterns, query_text):
+    return [value for value, pattern in patterns if pattern.search(query_text)]
+
+def understand_query(query_text):
+    """
+    Extract structured filters from a query.
+
+    Args:
+        query_text (str): User query
+
+    Returns:
+        dict: work_item_ids, work_item_types and meeting_types, each a list
+    """
+    return {
+        "work_item_ids": extract_work_item_ids(query_text),
+        "work_item_types": _match_aliases(_work_item_type_patterns, query_text),
+        "meeting_types": _match_aliases(_meeting_type_patterns, query_text)
+    }
+
+def _in_filter(key, values):
+    return {key: values[0]} if len(values) == 1 else {key: {"$in": values}}
+
+def build_where_filters(query_filters):
+    """
+    Turn extracted filters into Chroma ``where`` filters per retrieval source.
+
+    Work item types filter the shared collection and meeting types the
+    personal (transcript) collection. search_collection fuses each filtered
+    search with the unfiltered one.
+
+    Args:
+        query_filters (dict): Result of understand_query
+
+    Returns:
+        dict: source name -> where filter, only for sources with a filter
+    """
+    where = {}
+    if query_filters["work_item_types"]:
+        where[SHARED_SOURCE] = _in_filter("type", query_filters["work_item_types"])
+    if query_filters["meeting_types"]:
+        where[PERSONAL_SOURCE] = _in_filter("meeting_type", query_filters["meeting_types"])
+    return where
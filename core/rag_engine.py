@@ -1,108 +1,485 @@
+import asyncio
+from functools import partial
+
 from langchain_ollama import ChatOllama
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
 
 import config
 from core.intent_detection import detect_intent, get_instruction_and_format
 from core.session_manager import (
     get_or_create_session,
-    format_chat_history,
+    get_conversation_history,
+    record_exchange,
+    set_history_summarizer,
     increment_message_count,
     clear_session_history
 )
-from utils.embedding_utils import get_vectorstore, format_docs
+from core.answer_cache import AnswerCache, is_context_dependent
+from core.retrieval import retrieve_documents, aretrieve_documents, lookup_work_items, PERSONAL_SOURCE
+from core.query_understanding import understand_query, build_where_filters
+from core.retrieval_policy import get_retrieval_policy, apply_min_score, policy_stats
+from core.reranker import reranker
+from core.prompt_cache import prefix_tracker, PrefillMetricsHandler
+from utils.embedding_utils import get_embedding_model
+from utils.context_packing import pack_context
+from utils.vectorstore_registry import registry
+
+# Callable(num_predict) -> chat model replacing the Ollama client, set by set_llm_factory
+_llm_factory = None
+
+def create_llm(num_predict=None):
+    """
+    Create a client for the answer model.
+    
+    Args:
+        num_predict (int, optional): Most tokens generated per answer
+        
+    Returns:
+        BaseChatModel: LLM client (ChatOllama unless replaced by set_llm_factory)
+    """
+    if _llm_factory is not None:
+        return _llm_factory(num_predict)
+    return ChatOllama(
+        model=config.LLM_MODEL,
+        base_url=config.OLLAMA_BASE_URL,
+        keep_alive=config.LLM_KEEP_ALIVE,
+        num_ctx=config.LLM_NUM_CTX,
+        num_predict=num_predict
+    )
+
+llm = create_llm()
+
+answer_cache = AnswerCache(
+    threshold=config.ANSWER_CACHE_THRESHOLD,
+    max_entries_per_project=config.ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.ANSWER_CACHE_TTL_SECONDS
+)
+
+def _invalidate_answer_cache(project, collection_suffix):
+    # Answers are grounded in the shared collection only
+    if collection_suffix == "shared":
+        answer_cache.invalidate_project(project)
 
-llm = ChatOllama(model=config.LLM_MODEL, base_url=config.OLLAMA_BASE_URL)
+registry.add_invalidation_listener(_invalidate_answer_cache)
 
-prompt_template_str = """You are an assistant for project onboarding, documentation, PBIs, HR, and internal tools.
-{instruction_details}
+# The system text and the history messages form a prefix that stays byte-identical
+# across a session's turns, so Ollama can reuse its cached prefill (see core.prompt_cache).
+# Everything that changes per query goes into the final message.
+system_prompt_str = """You are an assistant for project onboarding, documentation, PBIs, HR, and internal tools.
 Keep responses professional, concise, and relevant. Define technical terms if needed.
+The earlier messages are the conversation so far; consider them for context."""
 
-**Conversation History**:
-{chat_history}
+query_template_str = """{instruction_details}
 
-**Shared Project Data for current query (Context)**:
+**Project Data and Meeting Transcripts for current query (Context)**:
 {context}
 
-**Response**:
+**Query**:
+{input}
 """
 
 prompt = ChatPromptTemplate.from_messages([
-    ("system", prompt_template_str),
-    ("human", "{input}")
+    ("system", system_prompt_str),
+    MessagesPlaceholder("history"),
+    ("human", query_template_str)
 ])
 
-def rag_query(user_id, project, query_text, stream=False, session_id=None, create_new=False):
+summary_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You maintain a running summary of a conversation between a user and a project assistant. "
+               "Merge the new exchanges into the existing summary. Keep names, work item ids, decisions and "
+               "open questions. Reply with the summary only, in at most {max_words} words."),
+    ("human", "Existing summary:\n{summary}\n\nNew exchanges:\n{turns}")
+])
+
+summary_chain = summary_prompt | llm | StrOutputParser()
+
+def summarize_history(previous_summary, turns_text, max_tokens):
     """
-    Perform a RAG query with conversation memory.
+    Fold conversation turns into a session's rolling summary.
     
     Args:
-        user_id (str): User identifier
-        project (str): Project identifier
-        query_text (str): User query
-        stream (bool): Whether to stream the response
-        session_id (str, optional): Specific session ID to use
-        create_new (bool): Whether to create a new session
+        previous_summary (str): Current summary, may be empty
+        turns_text (str): Formatted turns to fold in
+        max_tokens (int): Target summary length in tokens
         
     Returns:
-        dict or generator: Response data or stream
+        str: Updated summary
+    """
+    return summary_chain.invoke({
+        "summary": previous_summary or "(none)",
+        "turns": turns_text,
+        "max_words": max(20, int(max_tokens * 0.75))
+    })
+
+set_history_summarizer(summarize_history)
+
+# Retrieval runs before the chain (see core.retrieval), so one compiled chain serves every
+# collection; there is one per answer-length limit of the retrieval policy
+rag_chain = prompt | llm | StrOutputParser()
+_rag_chains = {None: rag_chain}
+
+def get_rag_chain(num_predict=None):
+    """
+    Get the answer chain for an answer-length limit.
+    
+    Args:
+        num_predict (int, optional): Most tokens generated per answer
+        
+    Returns:
+        Runnable: prompt | llm | parser chain
+    """
+    chain = _rag_chains.get(num_predict)
+    if chain is None:
+        chain = _rag_chains.setdefault(num_predict, prompt | create_llm(num_predict) | StrOutputParser())
+    return chain
+
+def set_llm_factory(factory):
+    """
+    Replace the answer and summary model, e.g. with a local stub for offline benchmarks.
+    
+    Args:
+        factory (callable): Takes num_predict (int or None) and returns a chat model
+    """
+    global _llm_factory, llm, summary_chain, rag_chain
+    _llm_factory = factory
+    llm = create_llm()
+    summary_chain = summary_prompt | llm | StrOutputParser()
+    rag_chain = prompt | llm | StrOutputParser()
+    _rag_chains.clear()
+    _rag_chains[None] = rag_chain
+
+def stream_cached_answer(answer, chunk_size=None):
+    """
+    Stream a cached answer back in chunks, like a live generation.
+    
+    Args:
+        answer (str): Cached answer
+        chunk_size (int, optional): Characters per chunk
+        
+    Yields:
+        str: Answer chunks
+    """
+    chunk_size = chunk_size or config.ANSWER_CACHE_STREAM_CHUNK_SIZE
+    for start in range(0, len(answer), chunk_size):
+        yield answer[start:start + chunk_size]
+
+def history_messages(history):
+    """
+    Turn a session's prompt history into chat messages.
+    
+    Args:
+        history (ConversationHistory): Session history
+        
+    Returns:
+        list: Summary message (if any) followed by the recent exchanges, oldest first
+    """
+    summary, exchanges = history.snapshot()
+    messages = []
+    if summary:
+        messages.append(SystemMessage(content=f"Summary of earlier conversation: {summary}"))
+    for query, answer in exchanges:
+        messages.append(HumanMessage(content=query))
+        messages.append(AIMessage(content=answer))
+    return messages
+
+def _start_query(user_id, project, query_text, session_id=None, create_new=False):
+    """
+    Open the session, understand the query, detect the intent and check the answer cache.
+    
+    Returns:
+        dict: Query state shared by the later steps
     """
     print(f"RAG query for project: {project}, user: {user_id}, seesion id: {session_id}")
 
     memory, active_session_id = get_or_create_session(user_id, project, session_id, create_new)
 
-    vectorstore = get_vectorstore(project)
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 10})
+    query_filters = understand_query(query_text) if config.QUERY_FILTERS_ENABLED else None
+    if query_filters and any(query_filters.values()):
+        print(f"Query filters: {query_filters}")
+    # Queries naming a work item are answered by id lookup and need no embedding for retrieval
+    exact_lookup = bool(query_filters and query_filters["work_item_ids"])
 
-    intent = detect_intent(query_text)
+    # Semantic answer cache (opt-in); skipped when the query leans on the session history,
+    # and for filtered queries: "status of work item 48213" and "... 48214", or "open bugs"
+    # and "open features", embed nearly alike but need different answers
+    use_answer_cache = (
+        config.ANSWER_CACHE_ENABLED
+        and not is_context_dependent(query_text, bool(memory.chat_memory.messages))
+        and not (query_filters and any(query_filters.values()))
+    )
+
+    query_embedding = None
+    if use_answer_cache or (config.INTENT_CLASSIFIER_ENABLED and not exact_lookup):
+        # Retrieval gets this embedding back from the query-embedding cache
+        query_embedding = get_embedding_model().embed_query(query_text)
+
+    intent = detect_intent(query_text, query_embedding)
     print(f"Detected intent: {intent}")
 
-    instruction, format_instruction = get_instruction_and_format(intent)
-    priority_instruction = "Use the shared project data to answer the query."
+    state = {
+        "user_id": user_id,
+        "project": project,
+        "query_text": query_text,
+        "session_id": active_session_id,
+        "intent": intent,
+        "policy": get_retrieval_policy(intent),
+        "query_filters": query_filters,
+        "query_embedding": query_embedding if use_answer_cache else None,
+        "cached_answer": None,
+        "prefix": None
+    }
+
+    if use_answer_cache:
+        cached_answer = answer_cache.lookup(project, state["query_embedding"], intent)
+        if cached_answer is not None:
+            print(f"Answer cache hit for project: {project}")
+            increment_message_count(user_id, project, active_session_id)
+            record_exchange(user_id, project, active_session_id, query_text, cached_answer)
+            state["cached_answer"] = cached_answer
+    return state
+
+def _retrieval_depth(policy):
+    """
+    How many documents to retrieve: the policy's k, or enough candidates
+    for the reranker to choose from when reranking is enabled.
+    """
+    if config.RERANK_ENABLED:
+        return max(policy["k"], config.RERANK_TOP_N)
+    return policy["k"]
+
+def _retrieve(state):
+    """
+    Retrieve the documents of a query: work items named by id are looked up
+    directly, everything else goes through the (filtered) search.
+    
+    Returns:
+        list: Documents, best first
+    """
+    project, query_text, query_filters = state["project"], state["query_text"], state["query_filters"]
+    if query_filters and query_filters["work_item_ids"]:
+        docs = lookup_work_items(project, query_filters["work_item_ids"])
+        if docs:
+            return docs
+    where = build_where_filters(query_filters) if query_filters else None
+    return retrieve_documents(project, state["user_id"], query_text, where=where,
+                              k=_retrieval_depth(state["policy"]))
+
+async def _aretrieve(state):
+    """
+    Async variant of _retrieve for the event loop.
+    """
+    project, query_text, query_filters = state["project"], state["query_text"], state["query_filters"]
+    if query_filters and query_filters["work_item_ids"]:
+        docs = await asyncio.get_running_loop().run_in_executor(
+            None, lookup_work_items, project, query_filters["work_item_ids"]
+        )
+        if docs:
+            return docs
+    where = build_where_filters(query_filters) if query_filters else None
+    return await aretrieve_documents(project, state["user_id"], query_text, where=where,
+                                     k=_retrieval_depth(state["policy"]))
+
+def _prepare_inputs(state, docs):
+    """
+    Build the chain inputs for retrieved documents.
+    
+    Args:
+        state (dict): Query state from _start_query
+        docs (list): Retrieved documents, best first
+        
+    Returns:
+        tuple: (chain inputs, callback that records the finished answer)
+    """
+    user_id, project, query_text = state["user_id"], state["project"], state["query_text"]
+    active_session_id = state["session_id"]
+
+    instruction, format_instruction = get_instruction_and_format(state["intent"])
+    priority_instruction = "Use the project data and meeting transcripts to answer the query."
     
     instruction_details_str = (
         f"**Instructions for the current query**:\n"
         f"- {priority_instruction}\n"
         f"- {instruction}\n"
-        f"- {format_instruction}\n"
-        f"- Consider the conversation history for context"
+        f"- {format_instruction}"
     )
 
-    chat_history = format_chat_history(memory)
+    history = get_conversation_history(user_id, project, active_session_id)
+    chat_history = history_messages(history)
+    history_stats = history.stats()
+    state["prefix"] = prefix_tracker.observe(
+        active_session_id,
+        [("system", system_prompt_str)] + [(message.type, message.content) for message in chat_history]
+    )
+    print(f"History: {history_stats['verbatim_turns']} recent turns, "
+          f"{history_stats['summarized_turns']} summarized, {history_stats['prompt_tokens']} tokens; "
+          f"{state['prefix']['reusable_tokens']} of {state['prefix']['prefix_tokens']} prefix tokens reusable")
 
-    rag_chain = (
-        RunnablePassthrough.assign(
-            context=lambda x: format_docs(retriever.invoke(x["input"])),
-            chat_history=lambda x: x["chat_history"]
-        )
-        | prompt
-        | llm
-        | StrOutputParser()
+    policy = state["policy"]
+    retrieved = len(docs)
+    docs = apply_min_score(docs, policy["min_score"])
+    if config.RERANK_ENABLED:
+        docs = reranker.rerank(query_text, docs, top_m=policy["k"])
+    context, context_stats = pack_context(docs, token_budget=policy["context_tokens"])
+    policy_stats.record(
+        state["intent"], retrieved, len(docs), context_stats["used_chunks"], context_stats["packed_tokens"]
     )
+    print(f"Packed {context_stats['used_chunks']}/{context_stats['chunks']} chunks (of {retrieved} retrieved) "
+          f"into {context_stats['groups']} groups: "
+          f"{context_stats['raw_tokens']} -> {context_stats['packed_tokens']} tokens")
 
     inputs = {
         "input": query_text,
         "instruction_details": instruction_details_str,
-        "chat_history": chat_history
+        "history": chat_history,
+        "context": context
     }
     
     increment_message_count(user_id, project, active_session_id)
+
+    # Answers grounded in a user's personal transcripts are never shared through the cache
+    cacheable = not any(doc.metadata.get("retrieval_source") == PERSONAL_SOURCE for doc in docs)
+    query_embedding = state["query_embedding"]
+
+    def save_answer(answer):
+        record_exchange(user_id, project, active_session_id, query_text, answer)
+        if query_embedding is not None and cacheable:
+            answer_cache.store(project, query_embedding, state["intent"], query_text, answer)
+
+    return inputs, save_answer
+
+def _measurement(state):
+    """
+    Set up prefill measurement for a query's LLM call (config.LLM_PREFILL_METRICS).
+    
+    Returns:
+        tuple: (PrefillMetricsHandler or None, run config for the chain)
+    """
+    if not config.LLM_PREFILL_METRICS:
+        return None, None
+    handler = PrefillMetricsHandler(state["session_id"], state.get("prefix"))
+    return handler, {"callbacks": [handler]}
+
+def rag_query(user_id, project, query_text, stream=False, session_id=None, create_new=False):
+    """
+    Perform a RAG query with conversation memory.
+    
+    Args:
+        user_id (str): User identifier
+        project (str): Project identifier
+        query_text (str): User query
+        stream (bool): Whether to stream the response
+        session_id (str, optional): Specific session ID to use
+        create_new (bool): Whether to create a new session
+        
+    Returns:
+        dict or generator: Response data or stream
+    """
+    state = _start_query(user_id, project, query_text, session_id, create_new)
+    active_session_id = state["session_id"]
+    if state["cached_answer"] is not None:
+        if stream:
+            return _stream_with_session_id(stream_cached_answer(state["cached_answer"]), active_session_id)
+        return {"response": state["cached_answer"], "session_id": active_session_id}
+
+    docs = _retrieve(state)
+    inputs, save_answer = _prepare_inputs(state, docs)
+    measurement, run_config = _measurement(state)
+    chain = get_rag_chain(state["policy"]["num_predict"])
     
     if stream:
-        response_stream = rag_chain.stream(inputs)
-        full_response = ""
-        stream_generator = (chunk for chunk in response_stream)
+        return _stream_response(chain.stream(inputs, config=run_config), save_answer, active_session_id)
+
+    response = chain.invoke(inputs, config=run_config)
+    save_answer(response)
+    result = {"response": response, "session_id": active_session_id}
+    if measurement is not None:
+        result["metrics"] = measurement.metrics
+    return result
+
+async def arag_query(user_id, project, query_text, stream=False, session_id=None, create_new=False):
+    """
+    Perform a RAG query with conversation memory on the running event loop.
+    
+    Generation is awaited token by token through the chain's async API, so a
+    streamed answer holds no thread while it waits on the LLM. Session,
+    cache and prompt-building steps run in the default executor.
+    
+    Args:
+        user_id (str): User identifier
+        project (str): Project identifier
+        query_text (str): User query
+        stream (bool): Whether to stream the response
+        session_id (str, optional): Specific session ID to use
+        create_new (bool): Whether to create a new session
         
-        for chunk in stream_generator:
-            full_response += chunk
-            yield chunk
-            
-        memory.save_context({"input": query_text}, {"answer": full_response})
+    Returns:
+        dict or async generator: Response data or stream
+    """
+    loop = asyncio.get_running_loop()
+    state = await loop.run_in_executor(
+        None, partial(_start_query, user_id, project, query_text, session_id, create_new)
+    )
+    active_session_id = state["session_id"]
+    if state["cached_answer"] is not None:
+        if stream:
+            return _astream_with_session_id(stream_cached_answer(state["cached_answer"]), active_session_id)
+        return {"response": state["cached_answer"], "session_id": active_session_id}
+
+    docs = await _aretrieve(state)
+    inputs, save_answer = await loop.run_in_executor(None, _prepare_inputs, state, docs)
+    measurement, run_config = _measurement(state)
+    chain = get_rag_chain(state["policy"]["num_predict"])
+
+    if stream:
+        return _astream_response(chain.astream(inputs, config=run_config), save_answer, active_session_id)
+
+    response = await chain.ainvoke(inputs, config=run_config)
+    await loop.run_in_executor(None, save_answer, response)
+    result = {"response": response, "session_id": active_session_id}
+    if measurement is not None:
+        result["metrics"] = measurement.metrics
+    return result
+
+def _stream_response(response_stream, on_complete, active_session_id):
+    """
+    Relay a response stream, then hand the full answer to on_complete.
+    """
+    full_response = ""
+    for chunk in response_stream:
+        full_response += chunk
+        yield chunk
         
-        yield f"session_id:{active_session_id}"
+    on_complete(full_response)
+    
+    yield f"session_id:{active_session_id}"
 
-    else:
-        response = rag_chain.invoke(inputs)
-        memory.save_context({"input": query_text}, {"answer": response})
-        return {"response": response, "session_id": active_session_id}
+def _stream_with_session_id(chunks, active_session_id):
+    """
+    Relay pre-computed chunks followed by the session id marker.
+    """
+    for chunk in chunks:
+        yield chunk
+    yield f"session_id:{active_session_id}"
+
+async def _astream_response(response_stream, on_complete, active_session_id):
+    """
+    Relay an async response stream, then hand the full answer to on_complete.
+    """
+    chunks = []
+    async for chunk in response_stream:
+        chunks.append(chunk)
+        yield chunk
+
+    await asyncio.get_running_loop().run_in_executor(None, on_complete, "".join(chunks))
+
+    yield f"session_id:{active_session_id}"
+
+async def _astream_with_session_id(chunks, active_session_id):
+    """
+    Relay pre-computed chunks followed by the session id marker.
+    """
+    for chunk in chunks:
+        yield chunk
+    yield f"session_id:{active_session_id}"
@@ -0,0 +1,129 @@
+"""
+Cross-encoder rerank stage between retrieval and prompt construction.
+
+The top-N retrieved chunks are scored against the query by a small local
+cross-encoder in a single batched forward pass and only the best M are kept.
+The stage has a hard time budget: when scoring does not finish in time the
+documents are returned in their retrieval order instead. A scoring call that
+ran over keeps its worker until it finishes, so while every worker is busy
+new queries skip the rerank rather than queue behind it. The model is loaded
+at start-up (wsgi preload or warm-up); a query that arrives before it is
+loaded keeps the retrieval order and never pays for the load itself.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from sentence_transformers import CrossEncoder
+
+import config
+
+class CrossEncoderReranker:
+    """
+    Batched cross-encoder reranker with a latency budget.
+    """
+
+    def __init__(self, model_path, top_n=20, top_m=4, budget_ms=300, max_workers=2):
+        self.model_path = model_path
+        self.top_n = top_n
+        self.top_m = top_m
+        self.budget_ms = budget_ms
+        self.max_workers = max_workers
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._loading = False
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rerank")
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    print(f"Loading rerank model from {self.model_path}")
+                    self._model = CrossEncoder(self.model_path)
+        return self._model
+
+    def _score(self, query_text, docs):
+        pairs = [(query_text, doc.page_content) for doc in docs]
+        return self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+
+    def _load_in_background(self):
+        with self._load_lock:
+            if self._loading or self._model is not None:
+                return
+            self._loading = True
+
+        def load():
+            try:
+                self.model
+            except Exception as e:
+                print(f"Loading rerank model failed: {e}")
+            finally:
+                self._loading = False
+
+        threading.Thread(target=load, name="rerank-load", daemon=True).start()
+
+    def _release(self, future):
+        with self._in_flight_lock:
+            self._in_flight -= 1
+
+    def rerank(self, query_text, docs, top_m=None):
+        """
+        Rerank documents and keep the best top_m.
+
+        Args:
+            query_text (str): User query
+            docs (list): Retrieved documents, best first
+            top_m (int, optional): Documents kept, at most the reranker's top_m
+
+        Returns:
+            list: At most top_m documents, best first
+        """
+        top_m = min(top_m or self.top_m, self.top_m)
+        candidates = docs[:self.top_n]
+        if len(candidates) <= 1:
+            return candidates[:top_m]
+
+        if self._model is None:
+            self._load_in_background()
+            print("Rerank model not loaded yet; keeping retrieval order")
+            return candidates[:top_m]
+        with self._in_flight_lock:
+            if self._in_flight >= self.max_workers:
+                print(f"All {self.max_workers} rerank workers busy; keeping retrieval order")
+                return candidates[:top_m]
+            self._in_flight += 1
+
+        started = time.perf_counter()
+        future = self._executor.submit(self._score, query_text, candidates)
+        future.add_done_callback(self._release)
+        try:
+            scores = future.result(timeout=self.budget_ms / 1000)
+        except TimeoutError:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            print(f"Rerank exceeded its {self.budget_ms} ms budget ({elapsed_ms:.0f} ms); keeping retrieval order")
+            return candidates[:top_m]
+        except Exception as e:
+            print(f"Rerank failed, keeping retrieval order: {e}")
+            return candidates[:top_m]
+
+        ranked = sorted(zip(candidates, scores), key=lambda item: item[1], reverse=True)[:top_m]
+        for doc, score in ranked:
+            doc.metadata["rerank_score"] = float(score)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"Reranked {len(candidates)} candidates to {len(ranked)} in {elapsed_ms:.0f} ms")
+        return [doc for doc, _ in ranked]
+
+    def warm_up(self):
+        """Load the model ahead of the first query."""
+        return self.model
+
+
+reranker = CrossEncoderReranker(
+    config.RERANK_MODEL_PATH,
+    top_n=config.RERANK_TOP_N,
+    top_m=config.RERANK_TOP_M,
+    budget_ms=config.RERANK_BUDGET_MS
+)
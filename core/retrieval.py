@@ -0,0 +1,324 @@
+"""
+Fan-out retrieval over a project's shared collection and the caller's
+personal (uploaded transcript) collection.
+
+Sources are searched concurrently under a common deadline, so retrieval
+takes as long as the slowest single search. Collections and their BM25
+indexes are opened before the deadline starts: a running search cannot be
+cancelled, so a cold open must not count against it. Each source keeps its
+own ranking (for hybrid retrieval, the RRF order of BM25 and vector hits),
+and the sources are merged with a weighted RRF over those rankings
+(RETRIEVAL_SOURCE_WEIGHTS). Every document keeps the name of the source it
+came from for attribution, with its fused "retrieval_score" and its dense
+"relevance_score" in [0, 1] for display and thresholds.
+
+Work items named by id are fetched directly through an id -> chunk-id
+index (lookup_work_items), without embedding the query.
+"""
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from langchain_core.documents import Document
+
+import config
+from utils.bm25_index import ensure_bm25_index
+from utils.embedding_utils import get_embedding_model
+from utils.hybrid_retrieval import HybridRetriever, reciprocal_rank_fusion
+from utils.vectorstore_registry import collection_exists, get_collection_entry
+
+SHARED_SOURCE = "shared"
+PERSONAL_SOURCE = "personal"
+
+_executor = ThreadPoolExecutor(
+    max_workers=config.RETRIEVAL_MAX_WORKERS,
+    thread_name_prefix="retrieval"
+)
+
+def get_retrieval_sources(project, user_id, k=None):
+    """
+    List the collections a user's query is searched in.
+
+    RETRIEVAL_SOURCE_K sets each source's share of the documents: with a k,
+    the largest source is searched for k documents and the others in
+    proportion, so the policy's k sets the depth even when the user has no
+    personal collection.
+
+    Args:
+        project (str): Project identifier
+        user_id (str): User identifier
+        k (int, optional): Documents wanted (default: RETRIEVAL_SOURCE_K as is)
+
+    Returns:
+        list: (source_name, collection_suffix, k) tuples
+    """
+    source_k = config.RETRIEVAL_SOURCE_K
+    scale = k / max(source_k.values()) if k else 1
+
+    def depth(source):
+        return max(1, math.ceil(source_k[source] * scale))
+
+    sources = [(SHARED_SOURCE, "shared", depth(SHARED_SOURCE))]
+    if user_id and collection_exists(project, user_id):
+        sources.append((PERSONAL_SOURCE, user_id, depth(PERSONAL_SOURCE)))
+    return sources
+
+def _search(entry, query_text, k, where=None):
+    if isinstance(entry.retriever, HybridRetriever):
+        return entry.retriever.search(query_text, k, where=where)
+    return entry.vectorstore.similarity_search_with_relevance_scores(query_text, k=k, filter=where)
+
+def search_collection(project, collection_suffix, query_text, k, where=None):
+    """
+    Search one collection.
+
+    A metadata filter narrows nothing on its own: the filtered and the
+    unfiltered search are fused with RRF, so matching chunks move up while
+    chunks without the filtered metadata (or with the type only mentioned
+    in passing) can still be returned.
+
+    Args:
+        project (str): Project identifier
+        collection_suffix (str): Collection suffix
+        query_text (str): User query
+        k (int): Number of results
+        where (dict, optional): Chroma metadata filter
+
+    Returns:
+        list: (Document, score) tuples, best first
+    """
+    entry = get_collection_entry(project, collection_suffix)
+    results = _search(entry, query_text, k)
+    if not where:
+        return results
+
+    filtered = _search(entry, query_text, k, where)
+    print(f"{len(filtered)} {collection_suffix} results for filter {where}")
+    candidates = {}
+    for doc, score in filtered + results:
+        candidates.setdefault(doc.page_content, (doc, score))
+    fused = reciprocal_rank_fusion([
+        [doc.page_content for doc, _ in filtered],
+        [doc.page_content for doc, _ in results]
+    ])
+    return [candidates[text] for text, _ in fused[:k]]
+
+def _build_work_item_index(entry):
+    collection = entry.vectorstore._collection
+    count = collection.count()
+    chunks = {}
+    result = collection.get(where={"work_item_id": {"$ne": ""}}, include=["metadatas"])
+    for chunk_id, metadata in zip(result["ids"], result["metadatas"]):
+        chunks.setdefault(metadata["work_item_id"], []).append(chunk_id)
+    return {"count": count, "chunks": chunks}
+
+def get_work_item_index(entry):
+    """
+    Get the work item id -> chunk ids index of a collection.
+
+    The index is built on first use and rebuilt when the collection's size
+    has changed since, e.g. after a seeder run in another process.
+
+    Args:
+        entry (CollectionEntry): Registry entry of the collection
+
+    Returns:
+        dict: Work item id -> chunk ids
+    """
+    index = entry.get_or_build("work_item_index", _build_work_item_index)
+    if index["count"] != entry.vectorstore._collection.count():
+        entry.discard("work_item_index")
+        index = entry.get_or_build("work_item_index", _build_work_item_index)
+    return index["chunks"]
+
+def lookup_work_items(project, work_item_ids):
+    """
+    Fetch the chunks of work items by id from the shared collection.
+
+    No embedding or vector search is involved.
+
+    Args:
+        project (str): Project identifier
+        work_item_ids (list): Work item ids as strings
+
+    Returns:
+        list: Documents of the work items found, in the order of the ids
+              and of their chunks, with the usual retrieval metadata
+    """
+    if not work_item_ids or not collection_exists(project, SHARED_SOURCE):
+        return []
+    entry = get_collection_entry(project, SHARED_SOURCE)
+    index = get_work_item_index(entry)
+    chunk_ids = [chunk_id for work_item_id in work_item_ids for chunk_id in index.get(work_item_id, ())]
+    if not chunk_ids:
+        return []
+
+    collection = entry.vectorstore._collection
+    result = collection.get(ids=chunk_ids, include=["documents", "metadatas"])
+    if len(result["ids"]) < len(chunk_ids):
+        # Rewritten since the index was built; the metadata filter is authoritative
+        entry.discard("work_item_index")
+        result = collection.get(where={"work_item_id": {"$in": list(work_item_ids)}}, include=["documents", "metadatas"])
+
+    order = {work_item_id: position for position, work_item_id in enumerate(work_item_ids)}
+    docs = []
+    for chunk_id, document, metadata in zip(result["ids"], result["documents"], result["metadatas"]):
+        docs.append(Document(page_content=document, metadata=dict(
+            metadata or {},
+            chunk_id=chunk_id,
+            retrieval_source=SHARED_SOURCE,
+            retrieval_score=1.0,
+            relevance_score=1.0
+        )))
+    docs.sort(key=lambda doc: (order.get(doc.metadata.get("work_item_id"), len(order)), doc.metadata.get("chunk_index", 0)))
+    print(f"Looked up {len(docs)} chunks of work items {', '.join(work_item_ids)}")
+    return docs
+
+def open_source(project, collection_suffix):
+    """
+    Open a collection and, for hybrid retrieval, its BM25 index.
+
+    Args:
+        project (str): Project identifier
+        collection_suffix (str): Collection suffix
+    """
+    entry = get_collection_entry(project, collection_suffix)
+    if isinstance(entry.retriever, HybridRetriever):
+        ensure_bm25_index(entry.retriever.collection)
+
+def _merge_results(done, sources):
+    """
+    Merge the finished per-source searches into one ranking.
+
+    Each source's ranking is kept as returned and the sources are fused with
+    a weighted RRF, so a chunk that a hybrid search ranked high on its BM25
+    match stays high even when its dense relevance is low.
+
+    Args:
+        done (iterable): Finished futures (concurrent or asyncio)
+        sources (dict): Future -> source name
+
+    Returns:
+        list: Documents, best first
+    """
+    merged = []
+    # In source order, so equal fused scores favour the shared source deterministically
+    for future, source in sources.items():
+        if future not in done:
+            continue
+        try:
+            results = future.result()
+        except Exception as e:
+            print(f"Retrieval from {source} source failed: {e}")
+            continue
+        weight = config.RETRIEVAL_SOURCE_WEIGHTS.get(source, 1.0)
+        for rank, (doc, relevance) in enumerate(results):
+            score = weight / (config.RRF_K + rank + 1)
+            doc.metadata["retrieval_source"] = source
+            doc.metadata["retrieval_score"] = score
+            doc.metadata["relevance_score"] = relevance
+            merged.append((doc, score))
+
+    merged.sort(key=lambda item: item[1], reverse=True)
+    return [doc for doc, _ in merged]
+
+def retrieve_documents(project, user_id, query_text, deadline_seconds=None, k=None, where=None):
+    """
+    Retrieve documents for a query from all of the user's sources concurrently.
+
+    Collections are opened first, outside the deadline; sources whose search
+    then misses the deadline are skipped.
+
+    Args:
+        project (str): Project identifier
+        user_id (str): User identifier
+        query_text (str): User query
+        deadline_seconds (float, optional): Time budget for all searches
+        k (int, optional): Most documents returned; also sets how many each
+            source is searched for (see get_retrieval_sources)
+        where (dict, optional): Source name -> Chroma metadata filter for that source
+
+    Returns:
+        list: Documents, best first, with "retrieval_source",
+              "retrieval_score" and "relevance_score" in their metadata
+    """
+    started = time.perf_counter()
+    deadline_seconds = deadline_seconds or config.RETRIEVAL_DEADLINE_SECONDS
+
+    # Embed once up front; the per-source searches then hit the query-embedding cache
+    get_embedding_model().embed_query(query_text)
+
+    sources = get_retrieval_sources(project, user_id, k)
+    # Opening can take seconds when cold; it is waited for, so it cannot be cut off midway
+    wait([_executor.submit(open_source, project, suffix) for _, suffix, _ in sources])
+    search_started = time.perf_counter()
+
+    futures = {
+        _executor.submit(
+            search_collection, project, suffix, query_text, count, (where or {}).get(source)
+        ): source
+        for source, suffix, count in sources
+    }
+    done, not_done = wait(futures, timeout=deadline_seconds)
+    for future in not_done:
+        future.cancel()
+        print(f"Retrieval from {futures[future]} source missed the {deadline_seconds}s deadline")
+
+    docs = _merge_results(done, futures)[:k]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    search_ms = (time.perf_counter() - search_started) * 1000
+    print(f"Retrieved {len(docs)} documents from {len(done)}/{len(futures)} sources in {elapsed_ms:.0f} ms "
+          f"({search_ms:.0f} ms searching)")
+    return docs
+
+async def aretrieve_documents(project, user_id, query_text, deadline_seconds=None, k=None, where=None):
+    """
+    Async variant of retrieve_documents for the event loop.
+
+    The searches run on the retrieval thread pool; the caller's coroutine
+    is suspended, not blocked, while they run.
+
+    Args:
+        project (str): Project identifier
+        user_id (str): User identifier
+        query_text (str): User query
+        deadline_seconds (float, optional): Time budget for all searches
+        k (int, optional): Most documents returned; also sets how many each
+            source is searched for (see get_retrieval_sources)
+        where (dict, optional): Source name -> Chroma metadata filter for that source
+
+    Returns:
+        list: Documents, best first, with "retrieval_source",
+              "retrieval_score" and "relevance_score" in their metadata
+    """
+    started = time.perf_counter()
+    deadline_seconds = deadline_seconds or config.RETRIEVAL_DEADLINE_SECONDS
+    loop = asyncio.get_running_loop()
+
+    await loop.run_in_executor(_executor, get_embedding_model().embed_query, query_text)
+    sources = await loop.run_in_executor(_executor, get_retrieval_sources, project, user_id, k)
+    # A source that fails to open fails again in its search, where the error is logged
+    await asyncio.gather(*[
+        loop.run_in_executor(_executor, open_source, project, suffix) for _, suffix, _ in sources
+    ], return_exceptions=True)
+    search_started = time.perf_counter()
+
+    futures = {
+        loop.run_in_executor(
+            _executor, search_collection, project, suffix, query_text, count,
+            (where or {}).get(source)
+        ): source
+        for source, suffix, count in sources
+    }
+    done, not_done = await asyncio.wait(futures, timeout=deadline_seconds)
+    for future in not_done:
+        future.cancel()
+        print(f"Retrieval from {futures[future]} source missed the {deadline_seconds}s deadline")
+
+    docs = _merge_results(done, futures)[:k]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    search_ms = (time.perf_counter() - search_started) * 1000
+    print(f"Retrieved {len(docs)} documents from {len(done)}/{len(futures)} sources in {elapsed_ms:.0f} ms "
+          f"({search_ms:.0f} ms searching)")
+    return docs
@@ -0,0 +1,108 @@
+"""
+Intent-adaptive retrieval policy.
+
+The detected intent decides how much a query retrieves and generates: the
+number of chunks (k), the lowest relevance score a chunk needs to be kept,
+the context token budget and the answer length (num_predict). A short
+factual question then costs less retrieval and prefill than a summary.
+
+Per-intent counters record how many chunks were retrieved, kept after the
+score cutoff and actually packed into the prompt, so the policy can be
+tuned against real traffic.
+"""
+import threading
+
+import config
+
+def get_retrieval_policy(intent):
+    """
+    Get the retrieval policy of an intent.
+
+    Args:
+        intent (str): Detected intent
+
+    Returns:
+        dict: k, min_score, context_tokens and num_predict
+    """
+    policy = dict(config.RETRIEVAL_POLICY["default"])
+    policy.update(config.RETRIEVAL_POLICY.get(intent, {}))
+    return policy
+
+def apply_min_score(docs, min_score):
+    """
+    Drop retrieved chunks whose relevance score is below a threshold.
+
+    The relevance score is the dense (vector) relevance to the query, with
+    and without hybrid retrieval; the RRF rank score of hybrid retrieval
+    gives every ranked chunk a high score and cannot be thresholded. Chunks
+    that hybrid retrieval ranked on their BM25 match ("lexical_match"), such
+    as exact identifier hits, are kept whatever their dense relevance. The
+    best chunk is always kept, so a strict threshold never leaves the
+    prompt without context.
+
+    Args:
+        docs (list): Retrieved documents, best first, with "relevance_score"
+            (and, from hybrid retrieval, "lexical_match") in their metadata
+        min_score (float): Lowest relevance score kept, in [0, 1]
+
+    Returns:
+        list: Kept documents, best first
+    """
+    if not min_score:
+        return docs
+    kept = [
+        doc for doc in docs
+        if doc.metadata.get("lexical_match") or doc.metadata.get("relevance_score", 1.0) >= min_score
+    ]
+    return kept or docs[:1]
+
+class RetrievalPolicyStats:
+    """
+    Per-intent counters of retrieved, kept and packed chunks.
+    """
+
+    def __init__(self):
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, intent, retrieved, kept, packed, context_tokens):
+        """
+        Record the chunks of one query.
+
+        Args:
+            intent (str): Detected intent
+            retrieved (int): Chunks returned by retrieval
+            kept (int): Chunks left after the score cutoff (and rerank)
+            packed (int): Chunks that made it into the prompt
+            context_tokens (int): Estimated tokens of the packed context
+        """
+        with self._lock:
+            totals = self._totals.setdefault(
+                intent, {"queries": 0, "retrieved": 0, "kept": 0, "packed": 0, "context_tokens": 0}
+            )
+            totals["queries"] += 1
+            totals["retrieved"] += retrieved
+            totals["kept"] += kept
+            totals["packed"] += packed
+            totals["context_tokens"] += context_tokens
+
+    def stats(self):
+        """
+        Get per-intent averages.
+
+        Returns:
+            dict: intent -> queries and average chunks and context tokens per query
+        """
+        with self._lock:
+            return {
+                intent: {
+                    "queries": totals["queries"],
+                    "avg_retrieved": round(totals["retrieved"] / totals["queries"], 2),
+                    "avg_kept": round(totals["kept"] / totals["queries"], 2),
+                    "avg_packed": round(totals["packed"] / totals["queries"], 2),
+                    "avg_context_tokens": round(totals["context_tokens"] / totals["queries"])
+                }
+                for intent, totals in self._totals.items()
+            }
+
+policy_stats = RetrievalPolicyStats()
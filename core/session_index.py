@@ -0,0 +1,243 @@
+"""
+Memory-bounded in-process index of loaded sessions.
+
+Sessions are kept in two orderings:
+
+- per (user, project), by last access, so the most recent session is found
+  in O(1) without sorting;
+- globally, by last use, so the least recently used sessions are evicted
+  first.
+
+A background reaper evicts sessions that have been idle longer than the TTL
+and then the least recently used ones until the entry and memory caps hold.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionIndex:
+    """
+    LRU index of loaded sessions with TTL and capacity eviction.
+    """
+
+    def __init__(self, ttl_seconds=86400, max_entries=1000, max_bytes=256 * 1024 * 1024,
+                 reap_interval=60, before_evict=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.reap_interval = reap_interval
+        # Called before sessions are evicted, e.g. to write queued changes
+        self.before_evict = before_evict
+        self._by_project = {}
+        self._lru = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self._reaper = None
+        self.evicted_ttl = 0
+        self.evicted_capacity = 0
+
+    def __len__(self):
+        return len(self._lru)
+
+    @staticmethod
+    def _key(session):
+        return (session.user_id, session.project, session.session_id)
+
+    def add(self, session):
+        """
+        Add or replace a session.
+
+        Args:
+            session (Session): Loaded session
+        """
+        key = self._key(session)
+        session.last_used = time.time()
+        with self._lock:
+            previous = self._lru.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous.size_bytes
+            self._lru[key] = session
+            self._total_bytes += session.size_bytes
+            project_sessions = self._by_project.setdefault(session.user_id, {}).setdefault(
+                session.project, OrderedDict()
+            )
+            project_sessions.pop(session.session_id, None)
+            newest = project_sessions[next(reversed(project_sessions))] if project_sessions else None
+            project_sessions[session.session_id] = session
+            if newest is not None and newest.last_accessed > session.last_accessed:
+                # A session loaded from the store can be older than the ones indexed already
+                ordered = sorted(project_sessions.values(), key=lambda other: other.last_accessed)
+                project_sessions.clear()
+                for other in ordered:
+                    project_sessions[other.session_id] = other
+            if self._reaper is None:
+                # Started lazily so the thread belongs to the process that uses the index
+                self._reaper = threading.Thread(target=self._reaper_loop, name="session-reaper", daemon=True)
+                self._reaper.start()
+
+    def get(self, user_id, project, session_id):
+        """
+        Get a session and mark it as used.
+
+        Returns:
+            Session or None: Loaded session
+        """
+        key = (user_id, project, session_id)
+        with self._lock:
+            session = self._lru.get(key)
+            if session is not None:
+                self._lru.move_to_end(key)
+                session.last_used = time.time()
+            return session
+
+    def touch(self, session):
+        """
+        Mark a session as accessed now.
+
+        Args:
+            session (Session): Indexed session
+        """
+        now = time.time()
+        with self._lock:
+            session.last_accessed = now
+            session.last_used = now
+            key = self._key(session)
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self._by_project[session.user_id][session.project].move_to_end(session.session_id)
+
+    def resize(self, session, size_bytes):
+        """
+        Update the memory estimate of a session.
+
+        Args:
+            session (Session): Indexed session
+            size_bytes (int): New estimate
+        """
+        with self._lock:
+            if self._key(session) in self._lru:
+                self._total_bytes += size_bytes - session.size_bytes
+            session.size_bytes = size_bytes
+
+    def remove(self, user_id, project, session_id):
+        """
+        Remove a session.
+
+        Returns:
+            Session or None: Removed session
+        """
+        with self._lock:
+            session = self._lru.pop((user_id, project, session_id), None)
+            if session is None:
+                return None
+            self._total_bytes -= session.size_bytes
+            projects = self._by_project[user_id]
+            del projects[project][session_id]
+            if not projects[project]:
+                del projects[project]
+                if not projects:
+                    del self._by_project[user_id]
+            return session
+
+    def most_recent(self, user_id, project):
+        """
+        Get the most recently accessed session of a user in a project.
+
+        Returns:
+            Session or None: Session
+        """
+        with self._lock:
+            project_sessions = self._by_project.get(user_id, {}).get(project)
+            if not project_sessions:
+                return None
+            return project_sessions[next(reversed(project_sessions))]
+
+    def sessions(self, user_id, project=None):
+        """
+        List the indexed sessions of a user, optionally in one project.
+
+        Returns:
+            list: Sessions
+        """
+        with self._lock:
+            projects = self._by_project.get(user_id, {})
+            if project:
+                return list(projects.get(project, {}).values())
+            return [session for sessions in projects.values() for session in sessions.values()]
+
+    def reap(self, now=None):
+        """
+        Evict idle sessions, then least recently used ones over the caps.
+
+        Args:
+            now (float, optional): Current epoch time
+
+        Returns:
+            int: Number of sessions evicted
+        """
+        now = now or time.time()
+        with self._lock:
+            expired = []
+            for key, session in self._lru.items():
+                if now - session.last_used < self.ttl_seconds:
+                    break
+                expired.append((key, session, session.last_used))
+            overflow = []
+            remaining = len(self._lru) - len(expired)
+            remaining_bytes = self._total_bytes - sum(session.size_bytes for _, session, _ in expired)
+            for key, session in list(self._lru.items())[len(expired):]:
+                if remaining <= self.max_entries and remaining_bytes <= self.max_bytes:
+                    break
+                overflow.append((key, session, session.last_used))
+                remaining -= 1
+                remaining_bytes -= session.size_bytes
+        if not expired and not overflow:
+            return 0
+
+        if self.before_evict is not None:
+            self.before_evict()
+        evicted_ttl = evicted_capacity = 0
+        with self._lock:
+            # Sessions used or replaced while the lock was released stay: their new writes
+            # were not flushed
+            for key, session, last_used in expired:
+                if self._lru.get(key) is session and session.last_used == last_used:
+                    self.remove(*key)
+                    evicted_ttl += 1
+            for key, session, last_used in overflow:
+                if len(self._lru) <= self.max_entries and self._total_bytes <= self.max_bytes:
+                    break
+                if self._lru.get(key) is session and session.last_used == last_used:
+                    self.remove(*key)
+                    evicted_capacity += 1
+            self.evicted_ttl += evicted_ttl
+            self.evicted_capacity += evicted_capacity
+        print(f"Evicted {evicted_ttl} idle and {evicted_capacity} least recently used sessions")
+        return evicted_ttl + evicted_capacity
+
+    def _reaper_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"Session reaper failed: {e}")
+
+    def stats(self):
+        """
+        Get index size and eviction counters.
+
+        Returns:
+            dict: Index statistics
+        """
+        with self._lock:
+            return {
+                "sessions": len(self._lru),
+                "estimated_bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evicted_ttl": self.evicted_ttl,
+                "evicted_capacity": self.evicted_capacity
+            }
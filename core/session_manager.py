@@ -1,14 +1,71 @@
 """
 Session management module for conversation memory.
+
+Sessions are kept in a pluggable store (see core.session_store), selected by
+config.SESSION_STORE_BACKEND.
 """
-from langchain.memory import ConversationBufferMemory
 from langchain_core.messages import HumanMessage, AIMessage
+import atexit
 import uuid
 import time
-from datetime import datetime
 
-# Dictionary to store user sessions
-user_sessions = {}
+import config
+from core.conversation_history import ConversationHistory, get_history_policy, NO_HISTORY
+from core.session_index import SessionIndex
+from core.session_store import InMemorySessionStore, SQLiteSessionStore
+
+# Callable(previous_summary, turns_text, max_tokens) -> summary, set by the RAG engine
+_history_summarizer = None
+
+def set_history_summarizer(summarizer):
+    """
+    Set the function used to fold old turns into a session's rolling summary.
+    
+    Args:
+        summarizer (callable): Takes (previous_summary, turns_text, max_tokens) and returns the new summary
+    """
+    global _history_summarizer
+    _history_summarizer = summarizer
+
+def create_conversation_history(project, on_summary=None):
+    """Create an empty prompt history with the project's history policy."""
+    return ConversationHistory(
+        summarizer=_history_summarizer,
+        on_summary=on_summary,
+        **get_history_policy(project)
+    )
+
+def create_session_store(backend=None):
+    """
+    Create the session store for a backend.
+    
+    Args:
+        backend (str, optional): "sqlite" or "memory" (default: config.SESSION_STORE_BACKEND)
+        
+    Returns:
+        SessionStore: Session store
+    """
+    backend = backend or config.SESSION_STORE_BACKEND
+    index = SessionIndex(
+        ttl_seconds=config.SESSION_IDLE_TTL_SECONDS,
+        max_entries=config.SESSION_CACHE_MAX_ENTRIES,
+        max_bytes=config.SESSION_CACHE_MAX_BYTES,
+        reap_interval=config.SESSION_REAP_INTERVAL
+    )
+    if backend == "sqlite":
+        return SQLiteSessionStore(
+            config.SESSION_DB_PATH,
+            create_conversation_history,
+            index,
+            flush_interval=config.SESSION_FLUSH_INTERVAL,
+            flush_batch_size=config.SESSION_FLUSH_BATCH_SIZE
+        )
+    if backend == "memory":
+        return InMemorySessionStore(create_conversation_history, index)
+    raise ValueError(f"Unknown session store backend: {backend}")
+
+session_store = create_session_store()
+atexit.register(session_store.close)
 
 def generate_session_id():
     """Generate a unique session ID based on timestamp and random string"""
@@ -29,47 +86,21 @@ def get_or_create_session(user_id, project, session_id=None, create_new=False):
     Returns:
         tuple: (ConversationBufferMemory, session_id)
     """
-    # Initialize user's session container if not exists
-    if user_id not in user_sessions:
-        user_sessions[user_id] = {}
-    
-    if project not in user_sessions[user_id]:
-        user_sessions[user_id][project] = {}
-    
-    # Create new session if requested or none exists
-    if create_new or not user_sessions[user_id][project]:
-        new_session_id = session_id or generate_session_id()
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        user_sessions[user_id][project][new_session_id] = {
-            "memory": ConversationBufferMemory(
-                memory_key="chat_history",
-                return_messages=True,
-                output_key="answer"
-            ),
-            "created_at": timestamp,
-            "last_accessed": timestamp,
-            "message_count": 0,
-            "name": f"Session {timestamp}"  # Default name based on timestamp
-        }
-        print(f"Created new session {new_session_id} for user {user_id}, project {project}")
-        return user_sessions[user_id][project][new_session_id]["memory"], new_session_id
-    
-    # Retrieve specific session if requested
-    if session_id and session_id in user_sessions[user_id][project]:
-        session = user_sessions[user_id][project][session_id]
-        session["last_accessed"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        return session["memory"], session_id
-    
-    # Get the most recently accessed session if no specific one requested
-    most_recent = sorted(
-        user_sessions[user_id][project].items(),
-        key=lambda x: x[1]["last_accessed"],
-        reverse=True
-    )[0][0]
-    
-    user_sessions[user_id][project][most_recent]["last_accessed"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    return user_sessions[user_id][project][most_recent]["memory"], most_recent
+    if not create_new:
+        # Retrieve specific session if requested, else the most recently accessed one
+        session = None
+        if session_id:
+            session = session_store.get_session(user_id, project, session_id)
+        if session is None:
+            session = session_store.get_most_recent_session(user_id, project)
+        if session is not None:
+            session_store.touch(session)
+            return session.memory, session.session_id
+
+    new_session_id = session_id or generate_session_id()
+    session = session_store.create_session(user_id, project, new_session_id)
+    print(f"Created new session {new_session_id} for user {user_id}, project {project}")
+    return session.memory, new_session_id
 
 def list_user_sessions(user_id, project=None):
     """
@@ -82,35 +113,14 @@ def list_user_sessions(user_id, project=None):
     Returns:
         dict: Dictionary of sessions with metadata
     """
-    if user_id not in user_sessions:
-        return {}
-    
+    sessions = session_store.list_sessions(user_id, project)
     if project:
-        if project not in user_sessions[user_id]:
-            return {}
-        
-        # Return sessions for specific project with metadata
-        result = {}
-        for session_id, session_data in user_sessions[user_id][project].items():
-            result[session_id] = {
-                "created_at": session_data["created_at"],
-                "last_accessed": session_data["last_accessed"],
-                "message_count": session_data["message_count"],
-                "name": session_data.get("name", f"Session {session_data['created_at']}")
-            }
-        return result
-    
+        return {session.session_id: session.to_dict() for session in sessions}
+
     # Return sessions across all projects
     result = {}
-    for proj, sessions in user_sessions[user_id].items():
-        result[proj] = {}
-        for session_id, session_data in sessions.items():
-            result[proj][session_id] = {
-                "created_at": session_data["created_at"],
-                "last_accessed": session_data["last_accessed"],
-                "message_count": session_data["message_count"],
-                "name": session_data.get("name", f"Session {session_data['created_at']}")
-            }
+    for session in sessions:
+        result.setdefault(session.project, {})[session.session_id] = session.to_dict()
     return result
 
 def rename_session(user_id, project, session_id, new_name):
@@ -126,13 +136,7 @@ def rename_session(user_id, project, session_id, new_name):
     Returns:
         bool: Success status
     """
-    if (user_id in user_sessions and 
-        project in user_sessions[user_id] and 
-        session_id in user_sessions[user_id][project]):
-        
-        user_sessions[user_id][project][session_id]["name"] = new_name
-        return True
-    return False
+    return session_store.rename_session(user_id, project, session_id, new_name)
 
 def delete_session(user_id, project, session_id):
     """
@@ -146,13 +150,7 @@ def delete_session(user_id, project, session_id):
     Returns:
         bool: Success status
     """
-    if (user_id in user_sessions and 
-        project in user_sessions[user_id] and 
-        session_id in user_sessions[user_id][project]):
-        
-        del user_sessions[user_id][project][session_id]
-        return True
-    return False
+    return session_store.delete_session(user_id, project, session_id)
 
 def clear_session_history(user_id, project, session_id):
     """
@@ -166,20 +164,7 @@ def clear_session_history(user_id, project, session_id):
     Returns:
         bool: Success status
     """
-    if (user_id in user_sessions and 
-        project in user_sessions[user_id] and 
-        session_id in user_sessions[user_id][project]):
-        
-        # Reset the memory while preserving metadata
-        session_data = user_sessions[user_id][project][session_id]
-        session_data["memory"] = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            output_key="answer"
-        )
-        session_data["message_count"] = 0
-        return True
-    return False
+    return session_store.clear_session(user_id, project, session_id)
 
 def increment_message_count(user_id, project, session_id):
     """
@@ -193,14 +178,46 @@ def increment_message_count(user_id, project, session_id):
     Returns:
         bool: Success status
     """
-    if (user_id in user_sessions and 
-        project in user_sessions[user_id] and 
-        session_id in user_sessions[user_id][project]):
+    return session_store.increment_message_count(user_id, project, session_id)
+
+def get_conversation_history(user_id, project, session_id):
+    """
+    Get the bounded prompt history of a session.
+    
+    Args:
+        user_id (str): User identifier
+        project (str): Project identifier
+        session_id (str): Session identifier
         
-        user_sessions[user_id][project][session_id]["message_count"] += 1
-        user_sessions[user_id][project][session_id]["last_accessed"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        return True
-    return False
+    Returns:
+        ConversationHistory: Prompt history, or None if the session does not exist
+    """
+    session = session_store.get_session(user_id, project, session_id)
+    return session.history if session else None
+
+def record_exchange(user_id, project, session_id, query, answer):
+    """
+    Record a completed exchange in the session's memory and prompt history.
+    
+    Args:
+        user_id (str): User identifier
+        project (str): Project identifier
+        session_id (str): Session identifier
+        query (str): User query
+        answer (str): Assistant answer
+    """
+    session = session_store.get_session(user_id, project, session_id)
+    if session is not None:
+        session_store.append_exchange(session, query, answer)
+
+def get_session_index_stats():
+    """
+    Get the size and eviction counters of the in-process session index.
+    
+    Returns:
+        dict: Index statistics
+    """
+    return session_store.index.stats()
 
 def format_chat_history(memory):
     """
@@ -212,11 +229,10 @@ def format_chat_history(memory):
     Returns:
         str: Formatted chat history
     """
-    messages = memory.chat_memory.messages
-    formatted_history = ""
-    for message in messages:
+    lines = []
+    for message in memory.chat_memory.messages:
         if isinstance(message, HumanMessage):
-            formatted_history += f"Human: {message.content}\n"
+            lines.append(f"Human: {message.content}\n")
         elif isinstance(message, AIMessage):
-            formatted_history += f"AI: {message.content}\n"
-    return formatted_history if formatted_history else "No previous conversation."
+            lines.append(f"AI: {message.content}\n")
+    return "".join(lines) if lines else NO_HISTORY
@@ -0,0 +1,564 @@
+"""
+Pluggable storage for conversation sessions.
+
+core.session_manager keeps its public functions and delegates to a
+SessionStore. Two implementations are provided:
+
+- InMemorySessionStore: the original process-local behaviour.
+- SQLiteSessionStore: sessions and messages in a local SQLite database (WAL
+  mode), so conversations survive restarts and can be shared by several
+  server processes. Session metadata changes are written immediately; the
+  hot-path writes of every query (message rows, access times, counters,
+  summaries) are queued and written behind in batches. A session's messages
+  are only loaded when the session is actually used.
+
+Both keep loaded sessions in a core.session_index.SessionIndex, which bounds
+their memory: the in-memory store loses evicted sessions, the SQLite store
+simply reloads them on their next use.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime
+
+from langchain.memory import ConversationBufferMemory
+
+ROLE_HUMAN = "human"
+ROLE_AI = "ai"
+
+# Rough memory accounting for the session index
+SESSION_OVERHEAD_BYTES = 2048
+MESSAGE_OVERHEAD_BYTES = 256
+
+
+def format_timestamp(timestamp):
+    """Format an epoch timestamp the way the session API reports it."""
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def create_memory():
+    """Create an empty LangChain memory for a session."""
+    return ConversationBufferMemory(
+        memory_key="chat_history",
+        return_messages=True,
+        output_key="answer"
+    )
+
+
+class Session:
+    """
+    A conversation session: metadata plus, once loaded, its memory and prompt history.
+    Timestamps are epoch seconds.
+    """
+
+    __slots__ = (
+        "session_id", "user_id", "project", "name", "created_at", "last_accessed", "last_used",
+        "message_count", "store_id", "message_rows", "generation", "size_bytes", "memory", "history"
+    )
+
+    def __init__(self, session_id, user_id, project, name, created_at, last_accessed,
+                 message_count=0, store_id=None):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.project = project
+        self.name = name
+        self.created_at = created_at
+        self.last_accessed = last_accessed
+        self.last_used = last_accessed
+        self.message_count = message_count
+        self.store_id = store_id
+        self.message_rows = 0
+        self.generation = 0
+        self.size_bytes = SESSION_OVERHEAD_BYTES
+        self.memory = None
+        self.history = None
+
+    def to_dict(self):
+        """
+        Get the session metadata as reported by the session API.
+
+        Returns:
+            dict: created_at, last_accessed, message_count and name
+        """
+        return {
+            "created_at": format_timestamp(self.created_at),
+            "last_accessed": format_timestamp(self.last_accessed),
+            "message_count": self.message_count,
+            "name": self.name or f"Session {format_timestamp(self.created_at)}"
+        }
+
+
+class SessionStore:
+    """
+    Interface of session stores.
+
+    history_factory(project, on_summary) creates the prompt history of a
+    session; on_summary is None when the store does not persist summaries.
+    Loaded sessions are kept in index.
+    """
+
+    def __init__(self, history_factory, index):
+        self.history_factory = history_factory
+        self.index = index
+
+    def create_session(self, user_id, project, session_id, name=None):
+        """Create a session and return it loaded."""
+        raise NotImplementedError
+
+    def get_session(self, user_id, project, session_id):
+        """Get a loaded session, or None if it does not exist."""
+        raise NotImplementedError
+
+    def get_most_recent_session(self, user_id, project):
+        """Get the most recently accessed session of a user in a project, loaded, or None."""
+        raise NotImplementedError
+
+    def touch(self, session):
+        """Mark a session as accessed now."""
+        raise NotImplementedError
+
+    def list_sessions(self, user_id, project=None):
+        """List session metadata as Session objects, without loading messages."""
+        raise NotImplementedError
+
+    def rename_session(self, user_id, project, session_id, name):
+        """Rename a session. Returns False if it does not exist."""
+        raise NotImplementedError
+
+    def delete_session(self, user_id, project, session_id):
+        """Delete a session and its messages. Returns False if it does not exist."""
+        raise NotImplementedError
+
+    def clear_session(self, user_id, project, session_id):
+        """Delete a session's messages and reset its counters. Returns False if it does not exist."""
+        raise NotImplementedError
+
+    def increment_message_count(self, user_id, project, session_id):
+        """Count a query against a session. Returns False if it does not exist."""
+        raise NotImplementedError
+
+    def append_exchange(self, session, query, answer):
+        """
+        Record a completed exchange in a loaded session.
+
+        Args:
+            session (Session): Loaded session
+            query (str): User query
+            answer (str): Assistant answer
+        """
+        session.memory.save_context({"input": query}, {"answer": answer})
+        session.history.add_turn(query, answer)
+        self.index.resize(
+            session,
+            session.size_bytes + 2 * MESSAGE_OVERHEAD_BYTES + len(query) + len(answer)
+        )
+
+    def flush(self):
+        """Write any queued changes."""
+
+    def close(self):
+        """Write any queued changes and release resources."""
+        self.flush()
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local session store. Sessions are lost on restart or eviction.
+    """
+
+    def create_session(self, user_id, project, session_id, name=None):
+        now = time.time()
+        session = Session(session_id, user_id, project, name or f"Session {format_timestamp(now)}", now, now)
+        session.memory = create_memory()
+        session.history = self.history_factory(project, None)
+        self.index.add(session)
+        return session
+
+    def get_session(self, user_id, project, session_id):
+        return self.index.get(user_id, project, session_id)
+
+    def get_most_recent_session(self, user_id, project):
+        return self.index.most_recent(user_id, project)
+
+    def touch(self, session):
+        self.index.touch(session)
+
+    def list_sessions(self, user_id, project=None):
+        return self.index.sessions(user_id, project)
+
+    def rename_session(self, user_id, project, session_id, name):
+        session = self.get_session(user_id, project, session_id)
+        if session is None:
+            return False
+        session.name = name
+        return True
+
+    def delete_session(self, user_id, project, session_id):
+        return self.index.remove(user_id, project, session_id) is not None
+
+    def clear_session(self, user_id, project, session_id):
+        session = self.get_session(user_id, project, session_id)
+        if session is None:
+            return False
+        session.memory = create_memory()
+        session.history.clear()
+        session.message_count = 0
+        self.index.resize(session, SESSION_OVERHEAD_BYTES)
+        return True
+
+    def increment_message_count(self, user_id, project, session_id):
+        session = self.get_session(user_id, project, session_id)
+        if session is None:
+            return False
+        session.message_count += 1
+        self.index.touch(session)
+        return True
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite-backed session store with write-behind for per-query writes.
+    """
+
+    def __init__(self, db_path, history_factory, index, flush_interval=0.5, flush_batch_size=256):
+        super().__init__(history_factory, index)
+        # Queued writes must reach the database before a session can be reloaded
+        index.before_evict = self.flush
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._writer = None
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    project TEXT NOT NULL,
+                    name TEXT,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL,
+                    message_count INTEGER NOT NULL DEFAULT 0,
+                    message_rows INTEGER NOT NULL DEFAULT 0,
+                    summary TEXT NOT NULL DEFAULT '',
+                    summarized_turns INTEGER NOT NULL DEFAULT 0,
+                    generation INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE (user_id, project, session_id)
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sessions_recent "
+                "ON sessions (user_id, project, last_accessed)"
+            )
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_ref INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_messages_session "
+                "ON messages (session_ref, id)"
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _session_from_row(self, row):
+        session = Session(
+            row["session_id"], row["user_id"], row["project"], row["name"],
+            row["created_at"], row["last_accessed"], row["message_count"], row["id"]
+        )
+        session.message_rows = row["message_rows"]
+        session.generation = row["generation"]
+        return session
+
+    def _get_row(self, user_id, project, session_id):
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT * FROM sessions WHERE user_id = ? AND project = ? AND session_id = ?",
+                (user_id, project, session_id)
+            ).fetchone()
+
+    def _load(self, row):
+        """Build a loaded session from its row and message rows."""
+        session = self._session_from_row(row)
+        with closing(self._connect()) as conn:
+            messages = conn.execute(
+                "SELECT role, content FROM messages WHERE session_ref = ? ORDER BY id",
+                (row["id"],)
+            ).fetchall()
+        session.memory = create_memory()
+        turns = []
+        query = None
+        for message in messages:
+            if message["role"] == ROLE_HUMAN:
+                session.memory.chat_memory.add_user_message(message["content"])
+                query = message["content"]
+            else:
+                session.memory.chat_memory.add_ai_message(message["content"])
+                if query is not None:
+                    turns.append((query, message["content"]))
+                    query = None
+        session.history = self._create_history(session)
+        session.history.restore(row["summary"], row["summarized_turns"], turns)
+        session.message_rows = len(messages)
+        session.size_bytes = (
+            SESSION_OVERHEAD_BYTES
+            + sum(MESSAGE_OVERHEAD_BYTES + len(message["content"]) for message in messages)
+        )
+        return session
+
+    def _create_history(self, session):
+        store_id = session.store_id
+
+        def on_summary(summary, summarized_turns):
+            self._enqueue(("summary", store_id, summary, summarized_turns))
+
+        return self.history_factory(session.project, on_summary)
+
+    def _resolve(self, row):
+        """Get the loaded session for a row, reloading it if another process added or cleared messages."""
+        session = self.index.get(row["user_id"], row["project"], row["session_id"])
+        if (session is not None and session.store_id == row["id"]
+                and session.generation == row["generation"]
+                and session.message_rows >= row["message_rows"]):
+            session.name = row["name"]
+            session.last_accessed = max(session.last_accessed, row["last_accessed"])
+            session.message_count = max(session.message_count, row["message_count"])
+            return session
+        session = self._load(row)
+        self.index.add(session)
+        return session
+
+    def create_session(self, user_id, project, session_id, name=None):
+        now = time.time()
+        name = name or f"Session {format_timestamp(now)}"
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "INSERT INTO sessions (session_id, user_id, project, name, created_at, last_accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, user_id, project, name, now, now)
+            )
+            store_id = cursor.lastrowid
+        session = Session(session_id, user_id, project, name, now, now, store_id=store_id)
+        session.memory = create_memory()
+        session.history = self._create_history(session)
+        self.index.add(session)
+        return session
+
+    def get_session(self, user_id, project, session_id):
+        row = self._get_row(user_id, project, session_id)
+        if row is None:
+            self.index.remove(user_id, project, session_id)
+            return None
+        return self._resolve(row)
+
+    def get_most_recent_session(self, user_id, project):
+        # This process's sessions are indexed by last access; the store is only
+        # asked on a miss. No flush is needed then: evicted sessions had their
+        # queued access times written before eviction.
+        session = self.index.most_recent(user_id, project)
+        if session is not None:
+            return session
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM sessions WHERE user_id = ? AND project = ? "
+                "ORDER BY last_accessed DESC LIMIT 1",
+                (user_id, project)
+            ).fetchone()
+        return self._resolve(row) if row is not None else None
+
+    def touch(self, session):
+        self.index.touch(session)
+        self._enqueue(("touch", session.store_id, session.last_accessed))
+
+    def list_sessions(self, user_id, project=None):
+        self.flush()
+        with closing(self._connect()) as conn:
+            if project:
+                rows = conn.execute(
+                    "SELECT * FROM sessions WHERE user_id = ? AND project = ? ORDER BY last_accessed DESC",
+                    (user_id, project)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT * FROM sessions WHERE user_id = ? ORDER BY project, last_accessed DESC",
+                    (user_id,)
+                ).fetchall()
+        return [self._session_from_row(row) for row in rows]
+
+    def rename_session(self, user_id, project, session_id, name):
+        with closing(self._connect()) as conn:
+            updated = conn.execute(
+                "UPDATE sessions SET name = ? WHERE user_id = ? AND project = ? AND session_id = ?",
+                (name, user_id, project, session_id)
+            ).rowcount
+        session = self.index.get(user_id, project, session_id)
+        if session is not None:
+            session.name = name
+        return updated > 0
+
+    def delete_session(self, user_id, project, session_id):
+        # Write queued rows first so none of them outlive the session
+        self.flush()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM sessions WHERE user_id = ? AND project = ? AND session_id = ?",
+                (user_id, project, session_id)
+            ).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM messages WHERE session_ref = ?", (row["id"],))
+                conn.execute("DELETE FROM sessions WHERE id = ?", (row["id"],))
+            conn.execute("COMMIT")
+        self.index.remove(user_id, project, session_id)
+        return row is not None
+
+    def clear_session(self, user_id, project, session_id):
+        self.flush()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM sessions WHERE user_id = ? AND project = ? AND session_id = ?",
+                (user_id, project, session_id)
+            ).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM messages WHERE session_ref = ?", (row["id"],))
+                conn.execute(
+                    "UPDATE sessions SET message_count = 0, message_rows = 0, summary = '', "
+                    "summarized_turns = 0, generation = generation + 1 WHERE id = ?",
+                    (row["id"],)
+                )
+            conn.execute("COMMIT")
+        session = self.index.get(user_id, project, session_id)
+        if session is not None:
+            session.memory = create_memory()
+            session.history.clear()
+            session.message_count = 0
+            session.message_rows = 0
+            session.generation += 1
+            self.index.resize(session, SESSION_OVERHEAD_BYTES)
+        return row is not None
+
+    def increment_message_count(self, user_id, project, session_id):
+        session = self.index.get(user_id, project, session_id)
+        if session is None:
+            row = self._get_row(user_id, project, session_id)
+            if row is None:
+                return False
+            store_id = row["id"]
+        else:
+            session.message_count += 1
+            self.index.touch(session)
+            store_id = session.store_id
+        self._enqueue(("count", store_id, time.time()))
+        return True
+
+    def append_exchange(self, session, query, answer):
+        super().append_exchange(session, query, answer)
+        now = time.time()
+        session.message_rows += 2
+        self._enqueue(("message", session.store_id, ROLE_HUMAN, query, now))
+        self._enqueue(("message", session.store_id, ROLE_AI, answer, now))
+
+    def _enqueue(self, operation):
+        with self._pending_lock:
+            self._pending.append(operation)
+            pending = len(self._pending)
+            if self._writer is None:
+                # Started lazily so the thread belongs to the process that uses the store
+                self._writer = threading.Thread(target=self._writer_loop, name="session-writer", daemon=True)
+                self._writer.start()
+        if pending >= self.flush_batch_size:
+            self._wakeup.set()
+
+    def _writer_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Session store write-behind failed: {e}")
+
+    def flush(self):
+        """
+        Write queued changes in one transaction.
+
+        If the transaction fails, it is rolled back and the changes stay
+        queued, so the writer thread retries them on its next tick.
+        """
+        with self._flush_lock:
+            with self._pending_lock:
+                operations, self._pending = self._pending, []
+            if not operations:
+                return
+
+            messages = []
+            message_rows = {}
+            touches = {}
+            counts = {}
+            summaries = {}
+            for operation in operations:
+                kind, store_id = operation[0], operation[1]
+                if kind == "message":
+                    messages.append((store_id, operation[2], operation[3], operation[4]))
+                    message_rows[store_id] = message_rows.get(store_id, 0) + 1
+                elif kind == "touch":
+                    touches[store_id] = max(touches.get(store_id, 0), operation[2])
+                elif kind == "count":
+                    counts[store_id] = counts.get(store_id, 0) + 1
+                    touches[store_id] = max(touches.get(store_id, 0), operation[2])
+                elif kind == "summary":
+                    summaries[store_id] = (operation[2], operation[3])
+
+            try:
+                with closing(self._connect()) as conn:
+                    try:
+                        conn.execute("BEGIN IMMEDIATE")
+                        conn.executemany(
+                            "INSERT INTO messages (session_ref, role, content, created_at) VALUES (?, ?, ?, ?)",
+                            messages
+                        )
+                        conn.executemany(
+                            "UPDATE sessions SET message_rows = message_rows + ? WHERE id = ?",
+                            [(rows, store_id) for store_id, rows in message_rows.items()]
+                        )
+                        conn.executemany(
+                            "UPDATE sessions SET message_count = message_count + ? WHERE id = ?",
+                            [(count, store_id) for store_id, count in counts.items()]
+                        )
+                        conn.executemany(
+                            "UPDATE sessions SET last_accessed = MAX(last_accessed, ?) WHERE id = ?",
+                            [(timestamp, store_id) for store_id, timestamp in touches.items()]
+                        )
+                        conn.executemany(
+                            "UPDATE sessions SET summary = ?, summarized_turns = ? WHERE id = ?",
+                            [(summary, turns, store_id) for store_id, (summary, turns) in summaries.items()]
+                        )
+                        conn.execute("COMMIT")
+                    except Exception:
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                        raise
+            except Exception:
+                # Keep the batch, ahead of anything queued since, for the next flush
+                with self._pending_lock:
+                    self._pending[:0] = operations
+                raise
@@ -0,0 +1,167 @@
+"""
+Start-up warm-up and readiness state.
+
+The first query after a deploy otherwise pays for opening Chroma, loading
+the embedding model, reading BM25 indexes and Ollama loading the LLM into
+memory. The warm-up runs those steps in a background thread; the /readyz
+endpoint reports ready only after it has finished, so a load balancer
+routes traffic to warm instances only. Steps that fail (Ollama still
+starting, say) are retried with exponential backoff until they succeed,
+so a transient error does not keep the instance out of rotation.
+"""
+import threading
+import time
+
+from langchain_ollama import ChatOllama
+
+import config
+
+WARMUP_PENDING = "pending"
+WARMUP_RUNNING = "running"
+WARMUP_READY = "ready"
+WARMUP_FAILED = "failed"
+
+_status = {
+    "state": WARMUP_PENDING, "steps": {}, "attempts": 0, "next_retry_at": None,
+    "started_at": None, "finished_at": None
+}
+_status_lock = threading.Lock()
+_thread = None
+
+def _run_step(name, step):
+    started = time.perf_counter()
+    try:
+        step()
+    except Exception as e:
+        print(f"Warm-up step '{name}' failed: {e}")
+        with _status_lock:
+            _status["steps"][name] = {"ok": False, "error": str(e)}
+        return False
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"Warm-up step '{name}' took {elapsed_ms:.0f} ms")
+    with _status_lock:
+        _status["steps"][name] = {"ok": True, "ms": round(elapsed_ms)}
+    return True
+
+def _open_collections():
+    from core.retrieval import search_collection
+    from utils.bm25_index import ensure_bm25_index
+    from utils.vectorstore_registry import collection_exists, get_collection_entry
+
+    for project in config.WARMUP_PROJECTS:
+        if not collection_exists(project, "shared"):
+            print(f"Warm-up: no shared collection for project {project}")
+            continue
+        entry = get_collection_entry(project, "shared")
+        ensure_bm25_index(entry.vectorstore._collection)
+        # One search pulls the collection's vector index into memory
+        search_collection(project, "shared", "warm-up", 1)
+
+def _embed():
+    from utils.embedding_utils import get_embedding_model
+    get_embedding_model().embed_query("warm-up")
+
+def _generate():
+    # A one-token generation makes Ollama load the model; keep_alive keeps it loaded
+    ChatOllama(
+        model=config.LLM_MODEL,
+        base_url=config.OLLAMA_BASE_URL,
+        num_predict=1,
+        keep_alive=config.LLM_KEEP_ALIVE,
+        num_ctx=config.LLM_NUM_CTX
+    ).invoke("Hi")
+
+def _prime_caches():
+    from core.intent_detection import intent_classifier
+    from core.reranker import reranker
+
+    if config.INTENT_CLASSIFIER_ENABLED:
+        intent_classifier.warm_up()
+    if config.RERANK_ENABLED:
+        reranker.warm_up()
+
+def run_warmup(max_attempts=None):
+    """
+    Run all warm-up steps and record the outcome.
+
+    Failed steps are retried after WARMUP_RETRY_INITIAL_SECONDS, doubling up
+    to WARMUP_RETRY_MAX_SECONDS between attempts; steps that succeeded are
+    not run again.
+
+    Args:
+        max_attempts (int, optional): Give up after this many attempts
+            (default: retry until every step succeeds)
+
+    Returns:
+        bool: Whether every step succeeded
+    """
+    with _status_lock:
+        _status.update(
+            state=WARMUP_RUNNING, steps={}, attempts=0, next_retry_at=None,
+            started_at=time.time(), finished_at=None
+        )
+
+    pending = [
+        ("embedding_model", _embed),
+        ("collections", _open_collections),
+        ("llm", _generate),
+        ("caches", _prime_caches)
+    ]
+    delay = config.WARMUP_RETRY_INITIAL_SECONDS
+    attempts = 0
+    while True:
+        attempts += 1
+        with _status_lock:
+            _status.update(state=WARMUP_RUNNING, attempts=attempts, next_retry_at=None)
+        pending = [(name, step) for name, step in pending if not _run_step(name, step)]
+        ok = not pending
+        if ok or (max_attempts and attempts >= max_attempts):
+            break
+        with _status_lock:
+            _status.update(state=WARMUP_FAILED, next_retry_at=time.time() + delay)
+        print(f"Warm-up attempt {attempts} failed; retrying {', '.join(name for name, _ in pending)} in {delay}s")
+        time.sleep(delay)
+        delay = min(delay * 2, config.WARMUP_RETRY_MAX_SECONDS)
+
+    with _status_lock:
+        _status["state"] = WARMUP_READY if ok else WARMUP_FAILED
+        _status["finished_at"] = time.time()
+    print(f"Warm-up {'finished' if ok else 'failed'} after {attempts} attempt(s)")
+    return ok
+
+def start_warmup():
+    """
+    Start the warm-up in a background thread, or mark the process ready
+    right away when warm-up is disabled.
+    """
+    global _thread
+    if not config.WARMUP_ENABLED:
+        with _status_lock:
+            _status["state"] = WARMUP_READY
+        return
+    if _thread is not None:
+        return
+    _thread = threading.Thread(target=run_warmup, name="warmup", daemon=True)
+    _thread.start()
+
+def is_ready():
+    """Whether the warm-up has finished successfully."""
+    with _status_lock:
+        return _status["state"] == WARMUP_READY
+
+def get_warmup_status():
+    """
+    Get the warm-up state and per-step timings.
+
+    Returns:
+        dict: Warm-up status
+    """
+    with _status_lock:
+        return {
+            "state": _status["state"],
+            "steps": dict(_status["steps"]),
+            "attempts": _status["attempts"],
+            "next_retry_at": _status["next_retry_at"],
+            "started_at": _status["started_at"],
+            "finished_at": _status["finished_at"]
+        }
@@ -0,0 +1,39 @@
+"""
+Gunicorn settings for production serving (see wsgi.py).
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Workers are threaded (gthread): each in-flight request, including a
+streamed answer, holds one thread, so a process serves up to
+SERVER_THREADS concurrent streams. On SIGTERM or SIGHUP a worker stops
+accepting connections and lets in-flight streams finish for up to
+SERVER_GRACEFUL_TIMEOUT seconds before exiting.
+"""
+import config
+
+bind = f"{config.HOST}:{config.PORT}"
+workers = config.SERVER_WORKERS
+threads = config.SERVER_THREADS
+worker_class = "gthread"
+timeout = config.SERVER_TIMEOUT
+graceful_timeout = config.SERVER_GRACEFUL_TIMEOUT
+keepalive = 5
+preload_app = True
+
+def when_ready(server):
+    # Runs once in the master: put back jobs interrupted by the previous shutdown
+    # before any worker starts claiming jobs
+    from core.ingestion_jobs import ingestion_queue
+    ingestion_queue.requeue_interrupted()
+
+def post_fork(server, worker):
+    from core.ingestion_jobs import start_ingestion_workers
+    from core.warmup import start_warmup
+    start_ingestion_workers(requeue_interrupted=False)
+    start_warmup()
+
+def worker_exit(server, worker):
+    from core.ingestion_jobs import ingestion_queue
+    from core.session_manager import session_store
+    ingestion_queue.stop(timeout=config.SERVER_GRACEFUL_TIMEOUT)
+    session_store.close()
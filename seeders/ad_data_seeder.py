@@ -1,12 +1,23 @@
-import chromadb
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 from azure.devops.connection import Connection
 from msrest.authentication import BasicAuthentication
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+import argparse
+import json
 import os
+import queue
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
 from typing import List, Dict, Tuple
+import config
+from utils.bm25_index import ensure_bm25_index
+from utils.embedding_provider import record_collection_embedding
+from utils.embedding_utils import get_document_embedder
+from utils.text_processing import content_hash
+from utils.vectorstore_registry import get_chroma_client, invalidate_collection
 
 load_dotenv()
 
@@ -14,31 +25,60 @@ load_dotenv()
 AZURE_DEVOPS_ORG_URL = os.environ.get("AZURE_DEVOPS_ORG_URL")
 PERSONAL_ACCESS_TOKEN = os.environ.get("AZURE_DEVOPS_PAT")
 PROJECTS = ["EGPP"]
-PERSIST_DIRECTORY = "chroma_db"
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "models", "all-mpnet-base-v2")
+CLOSED_STATES = ["Closed", "Removed"]
+SYNC_STATE_PATH = os.path.join(config.STATE_DIRECTORY, "ado_sync_state.json")
+WORK_ITEM_FIELDS = [
+    "System.Id", 
+    "System.Title", 
+    "System.Description", 
+    "System.WorkItemType", 
+    "System.TeamProject",
+    "System.State",
+    "System.ChangedDate"
+]
 
-# Initialize Azure DevOps connection
-if not PERSONAL_ACCESS_TOKEN:
-    print("Error: Azure DevOps PAT not found. Ensure AZURE_DEVOPS_PAT is set in your .env file or environment variables.")
-    exit(1)
-if not AZURE_DEVOPS_ORG_URL:
-    print("Error: Azure DevOps Org URL not found. Ensure AZURE_DEVOPS_ORG_URL is set in your .env file or environment variables.")
-    exit(1)
+# Pipeline settings
+FETCH_CONCURRENCY = 4        # Concurrent work item detail requests per project
+FETCH_MAX_RETRIES = 3        # Retries per detail batch before giving up
+FETCH_BACKOFF_SECONDS = 1.0  # Initial retry delay, doubled on every retry
+PIPELINE_QUEUE_SIZE = 8      # Batches buffered between pipeline stages
+PROJECT_CONCURRENCY = 2      # Projects seeded in parallel
 
-credentials = BasicAuthentication("", PERSONAL_ACCESS_TOKEN)
-connection = Connection(base_url=AZURE_DEVOPS_ORG_URL, creds=credentials)
-work_item_client = connection.clients.get_work_item_tracking_client()
+# Azure DevOps work item client, created on first use (see get_work_item_client)
+work_item_client = None
+
+class AzureDevOpsConfigError(RuntimeError):
+    """Raised when the Azure DevOps connection settings are missing."""
+
+def get_work_item_client():
+    """
+    Get the Azure DevOps work item tracking client, connecting on first use.
+
+    Raises:
+        AzureDevOpsConfigError: If the PAT or organization URL is not set
+    """
+    global work_item_client
+    if work_item_client is None:
+        # Raised, not exit(): this runs in project and fetch worker threads
+        if not PERSONAL_ACCESS_TOKEN:
+            raise AzureDevOpsConfigError(
+                "Azure DevOps PAT not found. Ensure AZURE_DEVOPS_PAT is set in your .env file or environment variables."
+            )
+        if not AZURE_DEVOPS_ORG_URL:
+            raise AzureDevOpsConfigError(
+                "Azure DevOps Org URL not found. Ensure AZURE_DEVOPS_ORG_URL is set in your .env file or environment variables."
+            )
+
+        credentials = BasicAuthentication("", PERSONAL_ACCESS_TOKEN)
+        connection = Connection(base_url=AZURE_DEVOPS_ORG_URL, creds=credentials)
+        work_item_client = connection.clients.get_work_item_tracking_client()
+    return work_item_client
 
 # Initialize ChromaDB client
-client = chromadb.PersistentClient(path=PERSIST_DIRECTORY)
+client = get_chroma_client()
 
-# Initialize embedding model and improved text splitter
-try:
-    model = SentenceTransformer(MODEL_PATH)
-except Exception as e:
-    print(f"Error loading SentenceTransformer model from {MODEL_PATH}: {e}")
-    print("Ensure the model is downloaded and the MODEL_PATH is correct.")
-    exit(1)
+# Shared embedder with a content-addressed chunk cache (the model is loaded on first use)
+embedder = get_document_embedder()
 
 # Improved text splitter with better separators for work items
 text_splitter = RecursiveCharacterTextSplitter(
@@ -159,40 +199,41 @@ def create_enhanced_metadata(work_item: Dict, chunk_info: Dict, chunk_index: int
     
     return base_metadata
 
-def fetch_work_items(project_name, custom_wiql_filter_clause=None, wiql_query_batch_limit=19000, details_batch_size=100):
+def query_work_item_ids(project_name, extra_filters=None, custom_wiql_filter_clause=None,
+                        wiql_query_batch_limit=19000, wi_client=None, time_precision=False):
     """
-    Fetch work items from Azure DevOps for a given project in batches,
-    paginating the WIQL query itself to avoid the 20k limit.
-    Yields batches of work item details.
+    Collect the ids of all non-Task work items of a project matching the filters,
+    paginating the WIQL query by id to stay under the 20k result limit.
     """
-    base_query_select = "Select [System.Id], [System.Title], [System.Description], [System.WorkItemType], [System.TeamProject] From WorkItems"
-    base_project_filter = f"[System.TeamProject] = '{project_name}'"
-    exclude_tasks_filter = "[System.WorkItemType] <> 'Task'"
+    wi_client = wi_client or get_work_item_client()
+    base_query_select = "Select [System.Id] From WorkItems"
+    base_filters = [
+        f"[System.TeamProject] = '{project_name}'",
+        "[System.WorkItemType] <> 'Task'"
+    ] + list(extra_filters or [])
+    if custom_wiql_filter_clause:
+        base_filters.append(custom_wiql_filter_clause)
 
     current_max_id = 0
     all_work_item_ids_fetched = []
-    i = 0
-    while i < 3:
-        id_filter = f"[System.Id] > {current_max_id}"
-
-        combined_base_filters = f"({base_project_filter}) AND ({id_filter}) AND ({exclude_tasks_filter})"
-
-        if custom_wiql_filter_clause:
-            query_where_clause = f"Where {combined_base_filters} AND ({custom_wiql_filter_clause})"
-        else:
-            query_where_clause = f"Where {combined_base_filters}"
-            
+    while True:
+        filters = base_filters + [f"[System.Id] > {current_max_id}"]
+        query_where_clause = "Where " + " AND ".join(f"({f})" for f in filters)
         query = f"{base_query_select} {query_where_clause} Order By [System.Id]"
         wiql_object = {"query": query} 
         
         print(f"Executing paginated WIQL query for project '{project_name}' (ID > {current_max_id}, TOP {wiql_query_batch_limit}): {query[:250]}...")
         
         try:
-            query_result = work_item_client.query_by_wiql(wiql_object, top=wiql_query_batch_limit)
+            query_result = wi_client.query_by_wiql(
+                wiql_object,
+                time_precision=time_precision or None,
+                top=wiql_query_batch_limit
+            )
             query_result_refs = query_result.work_items
         except Exception as e:
             print(f"Error executing paginated WIQL query for project {project_name}: {e}")
-            break 
+            raise
 
         if not query_result_refs:
             print(f"No more work item references found for project {project_name} (ID > {current_max_id}).")
@@ -200,166 +241,465 @@ def fetch_work_items(project_name, custom_wiql_filter_clause=None, wiql_query_ba
 
         batch_ids = [ref.id for ref in query_result_refs]
         all_work_item_ids_fetched.extend(batch_ids)
-        
-        if not batch_ids: 
-            break
-
         current_max_id = max(batch_ids) 
         
         if len(batch_ids) < wiql_query_batch_limit:
             print(f"Fetched the last batch of {len(batch_ids)} work item references.")
             break
-        else:
-            print(f"Fetched a batch of {len(batch_ids)} work item references. Max ID in batch: {current_max_id}.")
-        i+=1
+        print(f"Fetched a batch of {len(batch_ids)} work item references. Max ID in batch: {current_max_id}.")
 
-    if not all_work_item_ids_fetched:
-        print(f"No work items found for project {project_name} with the given criteria.")
-        yield []
-        return
+    return all_work_item_ids_fetched
 
-    print(f"Total {len(all_work_item_ids_fetched)} work item references collected for project '{project_name}'. Fetching details in batches of {details_batch_size}...")
-    
-    fields_to_retrieve = [
-        "System.Id", 
-        "System.Title", 
-        "System.Description", 
-        "System.WorkItemType", 
-        "System.TeamProject"
-    ]
-
-    for i in range(0, len(all_work_item_ids_fetched), details_batch_size):
-        batch_ids_for_details = all_work_item_ids_fetched[i:i + details_batch_size]
-        if not batch_ids_for_details:
-            continue
-        
+def to_work_item_record(work_item_detail, project_name):
+    """Convert a work item returned by the API into the dict used for chunking."""
+    fields = work_item_detail.fields
+    return {
+        "id": work_item_detail.id,
+        "title": fields.get("System.Title", ""),
+        "description": fields.get("System.Description", ""),
+        "type": fields.get("System.WorkItemType", ""),
+        "project": fields.get("System.TeamProject", project_name),
+        "state": fields.get("System.State", ""),
+        "changed_date": fields.get("System.ChangedDate", "")
+    }
+
+def parse_changed_date(value):
+    """
+    Parse a System.ChangedDate as an aware UTC datetime, or None if empty.
+
+    Azure DevOps returns a variable number of fractional-second digits
+    ("...:05Z", "...:05.1234567Z"), so the raw strings do not sort as times.
+    Fractions are cut to microseconds, which can only make a watermark
+    earlier, never skip a change.
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = str(value).strip()
+        if text.endswith(("Z", "z")):
+            text = text[:-1] + "+00:00"
+        # datetime.fromisoformat before Python 3.11 only accepts 3 or 6 fractional digits
+        text = re.sub(r"\.(\d+)", lambda match: "." + (match.group(1) + "000000")[:6], text, count=1)
+        parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+def format_watermark(changed_date):
+    """Format a parsed ChangedDate in the one canonical form stored as a watermark."""
+    return changed_date.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+def get_work_item_batch(project_name, batch_ids, wi_client=None,
+                        max_retries=FETCH_MAX_RETRIES, backoff_seconds=FETCH_BACKOFF_SECONDS):
+    """
+    Fetch the details of one batch of work items, retrying with exponential backoff.
+    Returns a list of work item dicts; raises after the last failed attempt.
+    """
+    wi_client = wi_client or get_work_item_client()
+    for attempt in range(max_retries + 1):
         try:
-            batch_work_items_details = work_item_client.get_work_items(
-                ids=batch_ids_for_details, 
-                fields=fields_to_retrieve,
+            batch_work_items_details = wi_client.get_work_items(
+                ids=batch_ids, 
+                fields=WORK_ITEM_FIELDS,
                 error_policy='omit'
             )
-            
-            processed_batch = []
-            for work_item_detail in batch_work_items_details:
-                description = work_item_detail.fields.get("System.Description", "")
-                
-                processed_batch.append({
-                    "id": work_item_detail.id,
-                    "title": work_item_detail.fields.get("System.Title", ""),
-                    "description": description,
-                    "type": work_item_detail.fields.get("System.WorkItemType", ""),
-                    "project": work_item_detail.fields.get("System.TeamProject", project_name) 
-                })
-            if processed_batch:
-                yield processed_batch
+            return [
+                to_work_item_record(work_item_detail, project_name)
+                for work_item_detail in batch_work_items_details
+                if work_item_detail is not None
+            ]
         except Exception as e:
-            print(f"Error fetching details for work item batch in project {project_name} (IDs: {batch_ids_for_details[:5]}...): {e}")
+            if attempt == max_retries:
+                raise
+            delay = backoff_seconds * (2 ** attempt)
+            print(f"Retrying work item batch in project {project_name} in {delay:.1f}s (attempt {attempt + 1}/{max_retries}): {e}")
+            time.sleep(delay)
+
+def build_work_item_chunks(work_item: Dict) -> List[Tuple[str, str, Dict]]:
+    """
+    Build the (chunk_id, content, metadata) records of a work item.
+    Chunk ids are content-addressed, so unchanged chunks become no-op upserts.
+    """
+    records = []
+    seen_ids = set()
+    for chunk_index, chunk_info in enumerate(create_structured_chunks(work_item)):
+        chunk_content = chunk_info['content']
+        
+        # Skip empty chunks
+        if not chunk_content.strip():
+            continue
+        
+        chunk_id = f"shared_chunk_{work_item['project']}_wi_{work_item['id']}_{content_hash(chunk_content)}"
+        if chunk_id in seen_ids:
             continue
+        seen_ids.add(chunk_id)
+        records.append((chunk_id, chunk_content, create_enhanced_metadata(work_item, chunk_info, chunk_index)))
+    return records
+
+def delete_work_item_chunks(collection, work_item_ids, keep_ids=None):
+    """
+    Delete the chunks of the given work items, except the ids in keep_ids.
+    Returns the number of chunks deleted.
+    """
+    keep_ids = keep_ids or set()
+    deleted = 0
+    work_item_ids = [str(work_item_id) for work_item_id in work_item_ids]
+    for i in range(0, len(work_item_ids), 500):
+        batch = work_item_ids[i:i + 500]
+        existing_ids = collection.get(where={"work_item_id": {"$in": batch}}, include=[])["ids"]
+        stale_ids = [chunk_id for chunk_id in existing_ids if chunk_id not in keep_ids]
+        if stale_ids:
+            collection.delete(ids=stale_ids)
+            ensure_bm25_index(collection).remove_documents(stale_ids)
+            deleted += len(stale_ids)
+    return deleted
+
+_PIPELINE_DONE = object()
+
+def run_seed_pipeline(project_name, collection, work_item_ids, prepare_batch=None,
+                      details_batch_size=100, processing_batch_size=200,
+                      fetch_concurrency=FETCH_CONCURRENCY, queue_size=PIPELINE_QUEUE_SIZE,
+                      wi_client=None, failed_ids=None) -> Dict:
+    """
+    Fetch, embed and write work items as a three-stage pipeline.
+
+    - Fetch: up to fetch_concurrency detail batches are requested concurrently
+      (with retry/backoff); each fetched batch is turned into chunk records by
+      prepare_batch (default: build_work_item_chunks for every item).
+    - Encode: a single thread embeds records in full batches of processing_batch_size.
+    - Write: a single thread upserts the embedded batches into the collection.
+
+    Stages are connected by bounded queues, so a slow stage applies
+    backpressure to the ones before it. The collection's BM25 index is
+    updated in memory by the writer; callers save it when done. Returns the
+    pipeline stats; raises AzureDevOpsConfigError, failing the project, when
+    there is no client to fetch with.
+    """
+    # Resolved here, not in the fetch threads, so a missing configuration fails the project
+    wi_client = wi_client or get_work_item_client()
+    if prepare_batch is None:
+        def prepare_batch(work_item_batch):
+            records = []
+            for work_item in work_item_batch:
+                records.extend(build_work_item_chunks(work_item))
+            return records
+
+    bm25_index = ensure_bm25_index(collection)
+    records_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    stats = {"work_items": 0, "chunks_embedded": 0, "chunks_written": 0, "errors": 0}
+    stats_lock = threading.Lock()
+
+    def record_error(message):
+        print(message)
+        with stats_lock:
+            stats["errors"] += 1
+
+    def encode_batch(batch):
+        try:
+            embeddings = embedder.embed_documents([record[1] for record in batch])
+        except Exception as e:
+            record_error(f"Error generating embeddings for {len(batch)} chunks in project {project_name}: {e}")
+            return
+        with stats_lock:
+            stats["chunks_embedded"] += len(batch)
+        write_queue.put((batch, embeddings))
+
+    def encode_stage():
+        pending = []
+        while True:
+            records = records_queue.get()
+            if records is _PIPELINE_DONE:
+                break
+            pending.extend(records)
+            while len(pending) >= processing_batch_size:
+                batch, pending = pending[:processing_batch_size], pending[processing_batch_size:]
+                encode_batch(batch)
+        if pending:
+            encode_batch(pending)
+        write_queue.put(_PIPELINE_DONE)
+
+    def write_stage():
+        while True:
+            item = write_queue.get()
+            if item is _PIPELINE_DONE:
+                break
+            batch, embeddings = item
+            ids = [record[0] for record in batch]
+            documents = [record[1] for record in batch]
+            try:
+                collection.upsert(
+                    documents=documents,
+                    embeddings=embeddings,
+                    metadatas=[record[2] for record in batch],
+                    ids=ids
+                )
+                bm25_index.add_documents(ids, documents)
+                with stats_lock:
+                    stats["chunks_written"] += len(batch)
+                print(f"Added {len(batch)} chunks to collection '{collection.name}'.")
+            except Exception as e:
+                record_error(f"Error adding a batch to ChromaDB for project {project_name}: {e}")
+
+    encoder = threading.Thread(target=encode_stage, name=f"seed-encode-{project_name}", daemon=True)
+    writer = threading.Thread(target=write_stage, name=f"seed-write-{project_name}", daemon=True)
+    encoder.start()
+    writer.start()
+
+    id_batches = iter([
+        work_item_ids[i:i + details_batch_size]
+        for i in range(0, len(work_item_ids), details_batch_size)
+    ])
+    try:
+        with ThreadPoolExecutor(max_workers=fetch_concurrency, thread_name_prefix=f"seed-fetch-{project_name}") as pool:
+            in_flight = {}
+
+            def submit_next():
+                batch_ids = next(id_batches, None)
+                if batch_ids is not None:
+                    in_flight[pool.submit(get_work_item_batch, project_name, batch_ids, wi_client)] = batch_ids
+
+            for _ in range(fetch_concurrency):
+                submit_next()
+            while in_flight:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch_ids = in_flight.pop(future)
+                    submit_next()
+                    try:
+                        work_item_batch = future.result()
+                    except Exception as e:
+                        record_error(f"Error fetching details for work item batch in project {project_name} (IDs: {batch_ids[:5]}...): {e}")
+                        if failed_ids is not None:
+                            failed_ids.extend(batch_ids)
+                        continue
+                    stats["work_items"] += len(work_item_batch)
+                    records = prepare_batch(work_item_batch)
+                    if records:
+                        # Blocks while the encoder is behind (backpressure)
+                        records_queue.put(records)
+    finally:
+        records_queue.put(_PIPELINE_DONE)
+        encoder.join()
+        writer.join()
+
+    return stats
 
 def seed_project_collection(project_name, custom_wiql_filter_clause=None, 
                             wiql_query_batch_limit=19000, 
                             work_item_details_fetch_batch_size=100, 
-                            processing_batch_size=200):
+                            processing_batch_size=200,
+                            wi_client=None):
     """
     Seed ChromaDB collection for a specific project with Azure DevOps data,
-    using improved chunking and embedding strategies.
+    using improved chunking and embedding strategies. Fetching, embedding and
+    writing run concurrently (see run_seed_pipeline).
     """
     print(f"Starting to seed collection for project: {project_name}")
     
     collection_name = f"{project_name}_shared"
     collection = client.get_or_create_collection(collection_name)
+    record_collection_embedding(collection, embedder)
     
-    total_chunks_added_for_project = 0
-    
-    for work_item_detail_batch in fetch_work_items(project_name, 
-                                                   custom_wiql_filter_clause, 
-                                                   wiql_query_batch_limit=wiql_query_batch_limit,
-                                                   details_batch_size=work_item_details_fetch_batch_size):
-        if not work_item_detail_batch:
-            print(f"Skipping an empty or failed batch for project {project_name}.")
-            continue
+    try:
+        work_item_ids = query_work_item_ids(
+            project_name,
+            custom_wiql_filter_clause=custom_wiql_filter_clause,
+            wiql_query_batch_limit=wiql_query_batch_limit,
+            wi_client=wi_client
+        )
+    except AzureDevOpsConfigError:
+        raise
+    except Exception:
+        work_item_ids = []
+    if not work_item_ids:
+        print(f"No work items found for project {project_name} with the given criteria.")
 
-        print(f"Processing a batch of {len(work_item_detail_batch)} work item details for project {project_name}...")
-        
-        current_processing_batch_chunks = []
-        current_processing_batch_metadatas = []
-        current_processing_batch_ids = []
+    chunks_deleted = 0
 
-        for work_item in work_item_detail_batch:
-            # Create structured chunks using the improved strategy
-            structured_chunks = create_structured_chunks(work_item)
-            
-            for chunk_index, chunk_info in enumerate(structured_chunks):
-                chunk_content = chunk_info['content']
-                
-                # Skip empty chunks
-                if not chunk_content.strip():
-                    continue
-                
-                current_processing_batch_chunks.append(chunk_content)
-                
-                # Create enhanced metadata
-                metadata = create_enhanced_metadata(work_item, chunk_info, chunk_index)
-                current_processing_batch_metadatas.append(metadata)
-                
-                # Create stable, unique IDs
-                chunk_id = f"shared_chunk_{project_name}_wi_{work_item['id']}_{chunk_info['type']}_{chunk_index}"
-                current_processing_batch_ids.append(chunk_id)
-
-                # Process in batches
-                if len(current_processing_batch_chunks) >= processing_batch_size:
-                    try:
-                        print(f"Generating embeddings for {len(current_processing_batch_chunks)} chunks...")
-                        embeddings = model.encode(
-                            current_processing_batch_chunks, 
-                            show_progress_bar=False,
-                            normalize_embeddings=True  # Normalize for better similarity computation
-                        ).tolist()
-                        
-                        collection.add(
-                            documents=current_processing_batch_chunks,
-                            embeddings=embeddings,
-                            metadatas=current_processing_batch_metadatas,
-                            ids=current_processing_batch_ids
-                        )
-                        total_chunks_added_for_project += len(current_processing_batch_chunks)
-                        print(f"Added {len(current_processing_batch_chunks)} chunks to collection '{collection_name}'.")
-                    except Exception as e:
-                        print(f"Error processing or adding a sub-batch to ChromaDB for project {project_name}: {e}")
-                    finally:
-                        current_processing_batch_chunks = []
-                        current_processing_batch_metadatas = []
-                        current_processing_batch_ids = []
-        
-        # Add any remaining chunks
-        if current_processing_batch_chunks:
-            try:
-                print(f"Generating embeddings for remaining {len(current_processing_batch_chunks)} chunks...")
-                embeddings = model.encode(
-                    current_processing_batch_chunks, 
-                    show_progress_bar=False,
-                    normalize_embeddings=True
-                ).tolist()
-                
-                collection.add(
-                    documents=current_processing_batch_chunks,
-                    embeddings=embeddings,
-                    metadatas=current_processing_batch_metadatas,
-                    ids=current_processing_batch_ids
-                )
-                total_chunks_added_for_project += len(current_processing_batch_chunks)
-                print(f"Added remaining {len(current_processing_batch_chunks)} chunks to collection '{collection_name}'.")
-            except Exception as e:
-                print(f"Error processing or adding the final sub-batch to ChromaDB for project {project_name}: {e}")
+    def prepare_seed_batch(work_item_batch):
+        nonlocal chunks_deleted
+        records = []
+        for work_item in work_item_batch:
+            records.extend(build_work_item_chunks(work_item))
+        # Chunk ids are content hashes: drop the chunks of edited text, as a sync does
+        chunks_deleted += delete_work_item_chunks(
+            collection, [wi["id"] for wi in work_item_batch], {record[0] for record in records}
+        )
+        return records
+
+    stats = run_seed_pipeline(
+        project_name,
+        collection,
+        work_item_ids,
+        prepare_batch=prepare_seed_batch,
+        details_batch_size=work_item_details_fetch_batch_size,
+        processing_batch_size=processing_batch_size,
+        wi_client=wi_client
+    )
+    total_chunks_added_for_project = stats["chunks_written"]
+    ensure_bm25_index(collection).save()
+    if chunks_deleted:
+        print(f"Deleted {chunks_deleted} outdated chunks from collection '{collection_name}'.")
             
-    if total_chunks_added_for_project > 0:
+    if total_chunks_added_for_project > 0 or chunks_deleted:
+        invalidate_collection(project_name)
         print(f"Successfully seeded/updated collection '{collection_name}' for project '{project_name}' with a total of {total_chunks_added_for_project} chunks.")
     else:
         print(f"No new chunks were added to collection '{collection_name}' for project '{project_name}'. This might be normal if data hasn't changed or no items matched the query.")
 
+_sync_state_lock = threading.Lock()
+
+def load_sync_state(state_path=SYNC_STATE_PATH) -> Dict:
+    """Load the per-project sync watermarks and stats."""
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def save_sync_state(state: Dict, state_path=SYNC_STATE_PATH):
+    """Persist the per-project sync watermarks and stats atomically."""
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(state, file, indent=2)
+    os.replace(tmp_path, state_path)
+
+def sync_project_collection(project_name, custom_wiql_filter_clause=None,
+                            wiql_query_batch_limit=19000,
+                            work_item_details_fetch_batch_size=100,
+                            processing_batch_size=200,
+                            detect_deleted=True,
+                            wi_client=None,
+                            state_path=SYNC_STATE_PATH) -> Dict:
+    """
+    Incrementally sync a project's shared collection with Azure DevOps.
+
+    Only work items whose System.ChangedDate is newer than the project's
+    watermark are fetched and re-embedded; their chunks are replaced by
+    work_item_id. Chunks of closed/removed items, and (with detect_deleted)
+    of items that no longer exist, are deleted. The first sync of a project
+    without a watermark processes every work item. Returns the sync stats,
+    which are also recorded next to the watermark.
+    """
+    started = time.time()
+    watermark = load_sync_state(state_path).get(project_name, {}).get("watermark")
+    print(f"Syncing collection for project: {project_name} (changed since: {watermark or 'beginning'})")
+
+    collection_name = f"{project_name}_shared"
+    collection = client.get_or_create_collection(collection_name)
+    record_collection_embedding(collection, embedder)
+
+    stats = {
+        "changed_items": 0,
+        "upserted_items": 0,
+        "closed_items": 0,
+        "deleted_items": 0,
+        "chunks_written": 0,
+        "chunks_deleted": 0,
+        "failed_items": 0
+    }
+
+    changed_filters = [f"[System.ChangedDate] > '{watermark}'"] if watermark else []
+    changed_ids = query_work_item_ids(
+        project_name,
+        extra_filters=changed_filters,
+        custom_wiql_filter_clause=custom_wiql_filter_clause,
+        wiql_query_batch_limit=wiql_query_batch_limit,
+        wi_client=wi_client,
+        time_precision=True
+    )
+    stats["changed_items"] = len(changed_ids)
+
+    new_watermark = parse_changed_date(watermark)
+    failed_ids = []
+
+    def prepare_changed_batch(work_item_batch):
+        nonlocal new_watermark
+        closed_ids = [wi["id"] for wi in work_item_batch if wi["state"] in CLOSED_STATES]
+        open_items = [wi for wi in work_item_batch if wi["state"] not in CLOSED_STATES]
+
+        records = []
+        for work_item in open_items:
+            records.extend(build_work_item_chunks(work_item))
+        keep_ids = {record[0] for record in records}
+
+        # Replace the chunks of every changed item by work_item_id
+        stats["chunks_deleted"] += delete_work_item_chunks(
+            collection, [wi["id"] for wi in work_item_batch], keep_ids
+        )
+        stats["upserted_items"] += len(open_items)
+        stats["closed_items"] += len(closed_ids)
+
+        for work_item in work_item_batch:
+            changed_date = parse_changed_date(work_item["changed_date"])
+            if changed_date and (new_watermark is None or changed_date > new_watermark):
+                new_watermark = changed_date
+        return records
+
+    pipeline_stats = run_seed_pipeline(
+        project_name,
+        collection,
+        changed_ids,
+        prepare_batch=prepare_changed_batch,
+        details_batch_size=work_item_details_fetch_batch_size,
+        processing_batch_size=processing_batch_size,
+        wi_client=wi_client,
+        failed_ids=failed_ids
+    )
+    stats["chunks_written"] = pipeline_stats["chunks_written"]
+    stats["failed_items"] = len(failed_ids)
+
+    if detect_deleted:
+        closed_states = ", ".join(f"'{state_name}'" for state_name in CLOSED_STATES)
+        live_ids = {str(work_item_id) for work_item_id in query_work_item_ids(
+            project_name,
+            extra_filters=[f"[System.State] NOT IN ({closed_states})"],
+            custom_wiql_filter_clause=custom_wiql_filter_clause,
+            wiql_query_batch_limit=wiql_query_batch_limit,
+            wi_client=wi_client
+        )}
+        indexed_ids = {
+            metadata.get("work_item_id")
+            for metadata in collection.get(include=["metadatas"])["metadatas"]
+            if metadata and metadata.get("work_item_id")
+        }
+        gone_ids = sorted(indexed_ids - live_ids)
+        stats["deleted_items"] = len(gone_ids)
+        stats["chunks_deleted"] += delete_work_item_chunks(collection, gone_ids)
+
+    if stats["chunks_written"] or stats["chunks_deleted"]:
+        ensure_bm25_index(collection).save()
+        invalidate_collection(project_name)
+
+    # Failed batches are retried next time by not moving the watermark
+    if failed_ids or pipeline_stats["errors"] or new_watermark is None:
+        new_watermark = watermark
+    else:
+        new_watermark = format_watermark(new_watermark)
+    stats["duration_seconds"] = round(time.time() - started, 2)
+    # Projects sync in parallel; re-read the state so other projects' updates are kept
+    with _sync_state_lock:
+        state = load_sync_state(state_path)
+        state[project_name] = {
+            "watermark": new_watermark,
+            "last_sync": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started)),
+            "stats": stats
+        }
+        save_sync_state(state, state_path)
+
+    print(f"Synced collection '{collection_name}' for project '{project_name}': {stats}")
+    return stats
+
 def main():
     """Main function to seed ChromaDB with Azure DevOps data using improved chunking."""
+    parser = argparse.ArgumentParser(description="Seed shared collections from Azure DevOps work items.")
+    parser.add_argument("--sync", action="store_true",
+                        help="Incrementally sync items changed since the last run instead of a full seed")
+    args = parser.parse_args()
+
     custom_project_filters = {}
 
     # Optimized batch sizes for better quality
@@ -367,10 +707,18 @@ def main():
     work_item_details_api_batch_size = 50
     db_processing_batch_size = 100
 
-    try:
-        for project in PROJECTS:
-            print(f"Processing project: {project}")
-            project_specific_filter = custom_project_filters.get(project)
+    def process_project(project):
+        print(f"Processing project: {project}")
+        project_specific_filter = custom_project_filters.get(project)
+        if args.sync:
+            sync_project_collection(
+                project,
+                custom_wiql_filter_clause=project_specific_filter,
+                wiql_query_batch_limit=wiql_query_page_limit,
+                work_item_details_fetch_batch_size=work_item_details_api_batch_size,
+                processing_batch_size=db_processing_batch_size
+            )
+        else:
             seed_project_collection(
                 project, 
                 custom_wiql_filter_clause=project_specific_filter,
@@ -378,9 +726,25 @@ def main():
                 work_item_details_fetch_batch_size=work_item_details_api_batch_size,
                 processing_batch_size=db_processing_batch_size
             )
+
+    failed_projects = []
+    try:
+        # Seed several projects in parallel; each one runs its own pipeline
+        with ThreadPoolExecutor(max_workers=PROJECT_CONCURRENCY, thread_name_prefix="seed-project") as pool:
+            futures = {pool.submit(process_project, project): project for project in PROJECTS}
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    failed_projects.append(futures[future])
+                    print(f"An unexpected error occurred while seeding project {futures[future]}: {str(e)}")
         print("Shared ChromaDB collections seeding process completed.")
     except Exception as e:
         print(f"An unexpected error occurred in the main seeding process: {str(e)}")
+        exit(1)
+    if failed_projects:
+        print(f"Seeding failed for projects: {', '.join(failed_projects)}")
+        exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,27 +1,29 @@
 """
 ChromaDB initialization and seeding.
 """
-import chromadb
-from sentence_transformers import SentenceTransformer
 import os
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import config
+from utils.bm25_index import ensure_bm25_index
+from utils.embedding_provider import record_collection_embedding
+from utils.embedding_utils import get_document_embedder
+from utils.text_processing import content_hash
+from utils.vectorstore_registry import get_chroma_client, invalidate_collection
 
 def init_chromadb():
     """
     Initialize and seed ChromaDB with project data.
     """
-    # Set up persistent ChromaDB client
-    client = chromadb.PersistentClient(path=config.PERSIST_DIRECTORY)
+    # Use the process-wide persistent ChromaDB client
+    client = get_chroma_client()
 
     # Define projects and their shared data files
     projects = {
         "SonarQube": os.path.join(config.DATA_FOLDER, "sonarqube1.txt")
     }
     
-    # Load embedding model
-    model_path = os.path.join(config.MODELS_DIRECTORY, "all-mpnet-base-v2")
-    model = SentenceTransformer(model_path)
+    # Shared embedder with a content-addressed chunk cache
+    embedder = get_document_embedder()
     
     # Configure text splitter
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
@@ -35,24 +37,40 @@ def init_chromadb():
         with open(file_path, 'r', encoding='utf-8') as file:
             data = file.read()
             
-        chunks = text_splitter.split_text(data)
-        embeddings = model.encode(chunks, show_progress_bar=True).tolist()
+        # Content-addressed ids: identical chunks collapse into one row
+        unique_chunks = {}
+        for chunk in text_splitter.split_text(data):
+            unique_chunks.setdefault(f"shared_chunk_{project}_{content_hash(chunk)}", chunk)
+        ids = list(unique_chunks)
+        chunks = list(unique_chunks.values())
+        embeddings = embedder.embed_documents(chunks)
         
         # Create or get the shared collection
         collection_name = f"{project}_shared"
         collection = client.get_or_create_collection(collection_name)
+        record_collection_embedding(collection, embedder)
+        bm25_index = ensure_bm25_index(collection)
         
         # Prepare data for insertion
-        ids = [f"shared_chunk_{project}_{i}" for i in range(len(chunks))]
         metadatas = [{"source": file_path} for _ in range(len(chunks))]
         
-        # Add data to collection
-        collection.add(
+        # Upsert data; re-seeding unchanged chunks is a no-op
+        collection.upsert(
             documents=chunks,
             embeddings=embeddings,
             metadatas=metadatas,
             ids=ids
         )
+        bm25_index.add_documents(ids, chunks)
+        
+        # Remove chunks that are no longer part of the source file
+        existing_ids = collection.get(where={"source": file_path}, include=[])["ids"]
+        stale_ids = [chunk_id for chunk_id in existing_ids if chunk_id not in unique_chunks]
+        if stale_ids:
+            collection.delete(ids=stale_ids)
+            bm25_index.remove_documents(stale_ids)
+        bm25_index.save()
+        invalidate_collection(project)
         
         print(f"Seeded {len(chunks)} chunks for project: {project}")
     
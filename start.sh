@@ -13,9 +13,15 @@ else
     source venv/bin/activate
 fi
 
-# Start the Flask server in the background
-echo "Starting Flask server on port 5001..."
-python3 run.py &
+# Start the API server in the background
+if [ "$1" == "--dev" ]; then
+    # Flask development server (single process, auto-reload)
+    echo "Starting Flask development server on port 5001..."
+    python3 run.py &
+else
+    echo "Starting API server (gunicorn) on port 5001..."
+    gunicorn -c gunicorn.conf.py wsgi:app &
+fi
 SERVER_PID=$!
 
 # Wait a moment for the server to start
@@ -0,0 +1,55 @@
+import math
+import uuid
+
+import chromadb
+
+import config
+from core.retrieval_policy import apply_min_score, get_retrieval_policy
+from utils.hybrid_retrieval import HybridRetriever
+
+QUERY = "ERR-4821 login failure"
+QUERY_EMBEDDING = [1.0, 0.0, 0.0]
+
+class FixedEmbeddings:
+    def embed_query(self, text):
+        return QUERY_EMBEDDING
+
+class FakeVectorstore:
+    """The parts of a LangChain Chroma vectorstore HybridRetriever uses."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self._embedding_function = FixedEmbeddings()
+
+    def _select_relevance_score_fn(self):
+        return lambda distance: 1.0 - distance / math.sqrt(2)
+
+def make_retriever(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "BM25_INDEX_DIRECTORY", str(tmp_path))
+    collection = chromadb.EphemeralClient().create_collection(f"test_{uuid.uuid4().hex}")
+    collection.add(
+        ids=["paraphrase-1", "paraphrase-2", "identifier"],
+        documents=[
+            "Users see a login failure when the session expires",
+            "The login page fails after the password reset",
+            "ERR-4821 is raised by the payment worker on retries"
+        ],
+        embeddings=[[0.95, 0.31, 0.0], [0.9, 0.0, 0.44], [0.0, 0.0, 1.0]]
+    )
+    return HybridRetriever(FakeVectorstore(collection), k=3, fetch_k=20)
+
+def test_bm25_only_hit_survives_the_policy(tmp_path, monkeypatch):
+    results = make_retriever(tmp_path, monkeypatch).search(QUERY)
+    docs = []
+    for doc, relevance in results:
+        doc.metadata["relevance_score"] = relevance
+        docs.append(doc)
+    identifier = next(doc for doc in docs if doc.metadata["chunk_id"] == "identifier")
+
+    assert identifier.metadata["lexical_match"]
+    assert identifier.metadata["relevance_score"] < get_retrieval_policy("general")["min_score"]
+    # Not first, so it is not kept merely as the best chunk
+    assert docs[0] is not identifier
+
+    kept = apply_min_score(docs, get_retrieval_policy("general")["min_score"])
+    assert identifier in kept
@@ -0,0 +1,21 @@
+from langchain_core.documents import Document
+
+from core.retrieval_policy import apply_min_score, get_retrieval_policy
+
+def make_doc(name, relevance, lexical_match=False):
+    return Document(page_content=name, metadata={"relevance_score": relevance, "lexical_match": lexical_match})
+
+def test_min_score_drops_weak_dense_hits():
+    docs = [make_doc("strong", 0.8), make_doc("weak", 0.2)]
+    assert [doc.page_content for doc in apply_min_score(docs, 0.35)] == ["strong"]
+
+def test_bm25_only_hit_survives_the_policy():
+    # An exact identifier that only BM25 found, with weak dense similarity and not ranked first
+    docs = [make_doc("paraphrase", 0.7), make_doc("ERR-4821 stack trace", 0.12, lexical_match=True)]
+    policy = get_retrieval_policy("general")
+    kept = apply_min_score(docs, policy["min_score"])
+    assert [doc.page_content for doc in kept] == ["paraphrase", "ERR-4821 stack trace"]
+
+def test_best_chunk_is_kept_when_nothing_passes():
+    docs = [make_doc("first", 0.1), make_doc("second", 0.05)]
+    assert [doc.page_content for doc in apply_min_score(docs, 0.45)] == ["first"]
@@ -3,12 +3,36 @@ Utility functions package.
 """
 from utils.embedding_utils import (
     get_embedding_model,
-    get_vectorstore,
+    get_document_embedder,
+    get_query_embedding_cache_stats,
     format_docs
 )
+from utils.vectorstore_registry import (
+    get_vectorstore,
+    get_collection_entry,
+    collection_exists,
+    invalidate_collection
+)
 from utils.text_processing import (
     clean_text,
-    tokenize
+    tokenize,
+    estimate_tokens,
+    content_hash,
+    iter_file_blocks,
+    iter_split_chunks,
+    iter_batches
+)
+from utils.bm25_index import (
+    BM25Index,
+    get_bm25_index,
+    ensure_bm25_index
+)
+from utils.hybrid_retrieval import (
+    HybridRetriever,
+    reciprocal_rank_fusion
+)
+from utils.context_packing import (
+    pack_context
 )
 from utils.transcript_processing import (
     process_transcript
@@ -16,9 +40,25 @@ from utils.transcript_processing import (
 
 __all__ = [
     'get_embedding_model',
+    'get_document_embedder',
+    'get_query_embedding_cache_stats',
     'get_vectorstore',
+    'get_collection_entry',
+    'collection_exists',
+    'invalidate_collection',
     'format_docs',
     'clean_text',
     'tokenize',
+    'estimate_tokens',
+    'content_hash',
+    'iter_file_blocks',
+    'iter_split_chunks',
+    'iter_batches',
+    'BM25Index',
+    'get_bm25_index',
+    'ensure_bm25_index',
+    'HybridRetriever',
+    'reciprocal_rank_fusion',
+    'pack_context',
     'process_transcript'
 ]
@@ -0,0 +1,335 @@
+"""
+BM25 inverted index per collection.
+
+Each Chroma collection gets a lexical index over the same chunk ids. Writers
+(seeders and uploads) update it incrementally alongside their Chroma writes;
+save() stores the changed documents in a SQLite file next to
+PERSIST_DIRECTORY, together with a change log. Queries search an in-memory
+copy that replays the change log to pick up what other processes saved, so
+concurrent writers never overwrite each other's documents.
+"""
+import json
+import math
+import os
+import sqlite3
+import string
+import threading
+from collections import Counter
+from contextlib import closing
+
+import config
+from utils.text_processing import tokenize
+
+# Change log entries kept for incremental refreshes; a process further behind reloads the whole index
+CHANGE_LOG_LIMIT = 100000
+
+_PUNCTUATION = string.punctuation.replace("/", "").replace("_", "").replace("-", "")
+
+
+def bm25_terms(text):
+    """
+    Turn text into BM25 terms.
+
+    Terms are the tokens of utils.text_processing.tokenize with surrounding
+    punctuation removed, so "JWT," and "jwt" match; path-like tokens such as
+    "/api/query" are kept intact.
+
+    Args:
+        text (str): Input text
+
+    Returns:
+        list: Terms
+    """
+    terms = []
+    for token in tokenize(text):
+        term = token.strip(_PUNCTUATION)
+        if term:
+            terms.append(term)
+    return terms
+
+
+class BM25Index:
+    """
+    Incrementally maintained BM25 index over chunk ids.
+    """
+
+    def __init__(self, path=None, k1=1.5, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = {}
+        self.doc_terms = {}
+        self.postings = {}
+        self.total_length = 0
+        # Last change log entry applied to the in-memory index
+        self.seq = 0
+        # Unsaved changes: chunk id -> (length, term frequencies), or None for a removal
+        self._pending = {}
+        self._lock = threading.RLock()
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with closing(self._connect()) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS documents "
+                    "(doc_id TEXT PRIMARY KEY, length INTEGER NOT NULL, terms TEXT NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS changes "
+                    "(seq INTEGER PRIMARY KEY AUTOINCREMENT, doc_id TEXT NOT NULL)"
+                )
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    @property
+    def dirty(self):
+        """Whether there are changes that have not been saved."""
+        return bool(self._pending)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _put(self, doc_id, length, frequencies):
+        self._remove([doc_id])
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+        self.doc_terms[doc_id] = list(frequencies)
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+    def add_documents(self, ids, texts):
+        """
+        Add or replace documents.
+
+        Args:
+            ids (list): Chunk ids
+            texts (list): Chunk texts
+        """
+        with self._lock:
+            for doc_id, text in zip(ids, texts):
+                terms = bm25_terms(text)
+                frequencies = dict(Counter(terms))
+                self._put(doc_id, len(terms), frequencies)
+                self._pending[doc_id] = (len(terms), frequencies)
+
+    def remove_documents(self, ids):
+        """
+        Remove documents.
+
+        Args:
+            ids (list): Chunk ids
+        """
+        with self._lock:
+            self._remove(ids)
+            # Recorded even if not loaded here: another process may have saved them
+            for doc_id in ids:
+                self._pending[doc_id] = None
+
+    def _remove(self, ids):
+        removed = False
+        for doc_id in ids:
+            if doc_id not in self.doc_lengths:
+                continue
+            self.total_length -= self.doc_lengths.pop(doc_id)
+            for term in self.doc_terms.pop(doc_id):
+                posting = self.postings[term]
+                del posting[doc_id]
+                if not posting:
+                    del self.postings[term]
+            removed = True
+        return removed
+
+    def search(self, query, k=10):
+        """
+        Score documents against a query.
+
+        Args:
+            query (str): Query text
+            k (int): Number of results
+
+        Returns:
+            list: (chunk_id, score) tuples, best first
+        """
+        with self._lock:
+            doc_count = len(self.doc_lengths)
+            if not doc_count:
+                return []
+            avg_length = self.total_length / doc_count
+            scores = {}
+            for term in set(bm25_terms(query)):
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, frequency in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    @staticmethod
+    def _latest_seq(conn):
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def save(self):
+        """
+        Write the unsaved changes.
+
+        Only the changed documents are written, in one transaction that also
+        appends them to the change log, so other processes' saves are kept.
+        """
+        with self._lock:
+            if not self.path or not self._pending:
+                return
+            with closing(self._connect()) as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                before = self._latest_seq(conn)
+                conn.executemany(
+                    "DELETE FROM documents WHERE doc_id = ?",
+                    [(doc_id,) for doc_id, entry in self._pending.items() if entry is None]
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO documents (doc_id, length, terms) VALUES (?, ?, ?)",
+                    [
+                        (doc_id, entry[0], json.dumps(entry[1]))
+                        for doc_id, entry in self._pending.items() if entry is not None
+                    ]
+                )
+                conn.executemany("INSERT INTO changes (doc_id) VALUES (?)", [(doc_id,) for doc_id in self._pending])
+                after = self._latest_seq(conn)
+                conn.execute("DELETE FROM changes WHERE seq <= ?", (after - CHANGE_LOG_LIMIT,))
+                conn.execute("COMMIT")
+            # If another process saved in between, the next refresh applies its changes (and re-reads ours)
+            if before == self.seq:
+                self.seq = after
+            self._pending.clear()
+
+    def refresh(self):
+        """
+        Apply the changes other processes have saved since the last refresh.
+
+        Unsaved local changes take precedence over the saved versions.
+        """
+        with self._lock:
+            if not self.path:
+                return
+            with closing(self._connect()) as conn:
+                # One read transaction, so the documents match the change log position
+                conn.execute("BEGIN")
+                latest = self._latest_seq(conn)
+                if latest == self.seq:
+                    conn.execute("COMMIT")
+                    return
+                oldest = conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+                if self.seq == 0 or oldest is None or oldest > self.seq + 1:
+                    self._load_all(conn)
+                else:
+                    changed = [
+                        row[0] for row in conn.execute(
+                            "SELECT DISTINCT doc_id FROM changes WHERE seq > ?", (self.seq,)
+                        )
+                    ]
+                    self._load_documents(conn, [doc_id for doc_id in changed if doc_id not in self._pending])
+                conn.execute("COMMIT")
+            self.seq = latest
+
+    def _load_documents(self, conn, doc_ids, batch_size=500):
+        for start in range(0, len(doc_ids), batch_size):
+            batch = doc_ids[start:start + batch_size]
+            rows = conn.execute(
+                f"SELECT doc_id, length, terms FROM documents WHERE doc_id IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            found = {doc_id: (length, json.loads(terms)) for doc_id, length, terms in rows}
+            for doc_id in batch:
+                if doc_id in found:
+                    self._put(doc_id, *found[doc_id])
+                else:
+                    self._remove([doc_id])
+
+    def _load_all(self, conn):
+        self.doc_lengths = {}
+        self.doc_terms = {}
+        self.postings = {}
+        self.total_length = 0
+        for doc_id, length, terms in conn.execute("SELECT doc_id, length, terms FROM documents"):
+            self._put(doc_id, length, json.loads(terms))
+        for doc_id, entry in self._pending.items():
+            if entry is None:
+                self._remove([doc_id])
+            else:
+                self._put(doc_id, *entry)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_bm25_index_path(collection_name):
+    """
+    Get the file the BM25 index of a collection is saved to.
+
+    Args:
+        collection_name (str): Chroma collection name
+
+    Returns:
+        str: Index path
+    """
+    return os.path.join(config.BM25_INDEX_DIRECTORY, f"{collection_name}.sqlite")
+
+
+def get_bm25_index(collection_name):
+    """
+    Get the process-wide BM25 index of a collection, with the changes
+    other processes have saved applied.
+
+    Args:
+        collection_name (str): Chroma collection name
+
+    Returns:
+        BM25Index: Index for the collection
+    """
+    with _indexes_lock:
+        index = _indexes.get(collection_name)
+        if index is None:
+            index = BM25Index(get_bm25_index_path(collection_name), k1=config.BM25_K1, b=config.BM25_B)
+            _indexes[collection_name] = index
+    index.refresh()
+    return index
+
+
+def rebuild_bm25_index(collection, index, batch_size=1000):
+    """
+    Rebuild a BM25 index from the documents stored in a collection.
+
+    Args:
+        collection: ChromaDB collection
+        index (BM25Index): Index to fill
+        batch_size (int): Documents read per request
+    """
+    offset = 0
+    while True:
+        result = collection.get(include=["documents"], limit=batch_size, offset=offset)
+        if not result["ids"]:
+            break
+        index.add_documents(result["ids"], result["documents"])
+        offset += len(result["ids"])
+    index.save()
+    print(f"Rebuilt BM25 index for collection '{collection.name}' with {len(index)} chunks")
+
+
+def ensure_bm25_index(collection):
+    """
+    Get the BM25 index of a collection, building it from the collection's
+    documents if the collection predates its index.
+
+    Args:
+        collection: ChromaDB collection
+
+    Returns:
+        BM25Index: Index for the collection
+    """
+    index = get_bm25_index(collection.name)
+    if not len(index) and collection.count():
+        rebuild_bm25_index(collection, index)
+    return index
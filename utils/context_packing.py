@@ -0,0 +1,204 @@
+"""
+Token-budgeted packing of retrieved chunks into the prompt context.
+
+Retrieved chunks repeat a lot of text: splitter overlap between neighbouring
+chunks, the "Work Item: ... / Title: ..." header the Azure DevOps seeder puts
+on every chunk of a work item, and the separate title and metadata chunks of
+the same item. The packer groups chunks by work item (or source), writes each
+group's header once, stitches overlapping chunks back together, and adds the
+groups in relevance order until the token budget is spent.
+"""
+import re
+
+import config
+from utils.text_processing import estimate_tokens
+
+HEADER_LINE = re.compile(r"^(Work Item|Title|Type|Project): ")
+DESCRIPTION_PREFIX = re.compile(r"^Description Part \d+: ")
+SUMMARY_PREFIX = "Summary: "
+
+
+def group_key(doc, position):
+    """
+    Get the group a chunk belongs to: its work item, else its source.
+
+    Args:
+        doc: Retrieved document
+        position (int): Rank of the document, used for ungrouped chunks
+
+    Returns:
+        tuple: Group key
+    """
+    metadata = doc.metadata or {}
+    if metadata.get("work_item_id"):
+        return ("work_item", metadata.get("project"), str(metadata["work_item_id"]))
+    if metadata.get("source"):
+        return ("source", metadata["source"])
+    return ("chunk", position)
+
+
+def find_overlap(left, right, min_overlap=20, max_overlap=200):
+    """
+    Find the longest suffix of left that is also a prefix of right.
+
+    Args:
+        left (str): Text that comes first
+        right (str): Text that comes second
+        min_overlap (int): Shortest overlap that counts
+        max_overlap (int): Longest overlap checked
+
+    Returns:
+        int: Overlap length in characters, 0 if none
+    """
+    for size in range(min(len(left), len(right), max_overlap), min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def split_chunk(text):
+    """
+    Split a chunk into its header lines, summary lines and body.
+
+    Returns:
+        tuple: (header_lines, summary_lines, body)
+    """
+    header_lines, summary_lines, body_lines = [], [], []
+    for line in text.split("\n"):
+        if HEADER_LINE.match(line):
+            header_lines.append(line)
+        elif line.startswith(SUMMARY_PREFIX):
+            summary_lines.append(line)
+        else:
+            body_lines.append(DESCRIPTION_PREFIX.sub("", line))
+    return header_lines, summary_lines, "\n".join(body_lines).strip()
+
+
+def merge_segments(bodies, min_overlap=20, max_overlap=200):
+    """
+    Stitch chunk bodies back together where they overlap.
+
+    Args:
+        bodies (list): Chunk bodies in reading order where known
+        min_overlap (int): Shortest overlap that counts
+        max_overlap (int): Longest overlap checked
+
+    Returns:
+        list: Merged, non-redundant segments
+    """
+    segments = []
+    for body in bodies:
+        if not body or any(body in segment for segment in segments):
+            continue
+        for i, segment in enumerate(segments):
+            overlap = find_overlap(segment, body, min_overlap, max_overlap)
+            if overlap:
+                segments[i] = segment + body[overlap:]
+                break
+            overlap = find_overlap(body, segment, min_overlap, max_overlap)
+            if overlap:
+                segments[i] = body + segment[overlap:]
+                break
+        else:
+            segments.append(body)
+    # Drop segments swallowed by a later merge
+    return [s for i, s in enumerate(segments) if not any(i != j and s in other for j, other in enumerate(segments))]
+
+
+def build_group(docs, min_overlap=20, max_overlap=200):
+    """
+    Build the header and deduplicated segments of one group of chunks.
+
+    Args:
+        docs (list): Chunks of the group, best first
+
+    Returns:
+        tuple: (header, segments)
+    """
+    # Read the chunks of a work item in their original order so adjacent parts meet
+    if all("chunk_index" in (doc.metadata or {}) for doc in docs):
+        docs = sorted(docs, key=lambda doc: doc.metadata["chunk_index"])
+
+    header_lines, summary_lines, bodies = [], [], []
+    for doc in docs:
+        headers, summaries, body = split_chunk(doc.page_content)
+        for line in headers:
+            if line not in header_lines:
+                header_lines.append(line)
+        summary_lines.extend(line for line in summaries if line not in summary_lines)
+        bodies.append(body)
+
+    # "Work Item: 42 (Bug) in Alpha" already names the type and project
+    if any(line.startswith("Work Item: ") for line in header_lines):
+        header_lines = [line for line in header_lines if not line.startswith(("Type: ", "Project: "))]
+
+    segments = merge_segments(bodies, min_overlap, max_overlap)
+    # A summary is the start of the description; drop it when the description itself is included
+    for line in summary_lines:
+        summary = line[len(SUMMARY_PREFIX):].rstrip(".").strip()
+        if not any(summary in segment for segment in segments):
+            segments.insert(0, line)
+    return "\n".join(header_lines), segments
+
+
+def pack_context(docs, token_budget=None, chars_per_token=None):
+    """
+    Pack retrieved documents into a context string within a token budget.
+
+    Groups are added in the order of their best-ranked chunk. A group whose
+    remaining segments no longer fit is cut short, and packing continues with
+    the next group in case a smaller one still fits.
+
+    Args:
+        docs (list): Retrieved documents, best first
+        token_budget (int, optional): Maximum context tokens
+        chars_per_token (float, optional): Characters per token for estimates
+
+    Returns:
+        tuple: (context string, stats dict)
+    """
+    token_budget = token_budget or config.CONTEXT_TOKEN_BUDGET
+    chars_per_token = chars_per_token or config.CHARS_PER_TOKEN
+
+    groups = {}
+    for position, doc in enumerate(docs):
+        groups.setdefault(group_key(doc, position), []).append(doc)
+
+    parts = []
+    used_tokens = 0
+    used_chunks = 0
+    for group_docs in groups.values():
+        header, segments = build_group(
+            group_docs,
+            config.CONTEXT_MIN_OVERLAP_CHARS,
+            config.CONTEXT_MAX_OVERLAP_CHARS
+        )
+        lines = []
+        group_tokens = estimate_tokens(f"- {header}\n" if header else "- ", chars_per_token)
+        for segment in segments:
+            segment_tokens = estimate_tokens(segment, chars_per_token) + 1
+            if used_tokens + group_tokens + segment_tokens > token_budget:
+                if parts or lines:
+                    continue
+                # Never send an empty context: truncate the best segment to the budget
+                segment = segment[:int((token_budget - group_tokens - 1) * chars_per_token)]
+                if not segment:
+                    continue
+                segment_tokens = estimate_tokens(segment, chars_per_token) + 1
+            lines.append(segment)
+            group_tokens += segment_tokens
+        if not lines:
+            continue
+        parts.append("- " + "\n".join(([header] if header else []) + lines))
+        used_tokens += group_tokens
+        used_chunks += len(group_docs)
+
+    context = "\n".join(parts)
+    stats = {
+        "chunks": len(docs),
+        "used_chunks": used_chunks,
+        "groups": len(parts),
+        "raw_tokens": sum(estimate_tokens(doc.page_content, chars_per_token) for doc in docs),
+        "packed_tokens": estimate_tokens(context, chars_per_token)
+    }
+    return context, stats
@@ -0,0 +1,243 @@
+"""
+Embedding caches.
+
+Query embeddings are cached in an in-memory LRU tier backed by an optional
+SQLite tier on disk, so repeated questions skip the embedding model entirely
+and the cache survives restarts. Chunk embeddings written by the seeders and
+uploads are cached on disk by a hash of (model name, chunk text).
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+from utils.text_processing import clean_text
+
+
+def make_cache_key(model_name, text):
+    """
+    Build a cache key for a piece of text embedded by a given model.
+
+    Args:
+        model_name (str): Embedding model name
+        text (str): Text to embed
+
+    Returns:
+        str: Hex digest identifying (model, text)
+    """
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Persistent key -> vector store backed by SQLite.
+    """
+
+    def __init__(self, path, table="embeddings"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Look up a vector.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            list or None: Stored vector, or None when missing
+        """
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """
+        Look up several vectors at once.
+
+        Args:
+            keys (list): Cache keys
+
+        Returns:
+            dict: key -> vector for every key found
+        """
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM {self.table} WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put(self, key, vector):
+        """
+        Store a vector.
+
+        Args:
+            key (str): Cache key
+            vector (list): Embedding vector
+        """
+        self.put_many({key: vector})
+
+    def put_many(self, items):
+        """
+        Store several vectors in one transaction.
+
+        Args:
+            items (dict): key -> vector
+        """
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, vector) VALUES (?, ?)",
+                [(key, array("f", vector).tobytes()) for key, vector in items.items()]
+            )
+            self._conn.commit()
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that caches query embeddings.
+
+    Keys are the normalized query text (see utils.text_processing.clean_text)
+    plus the embedding model name. Document embeddings are passed straight
+    through to the wrapped model.
+    """
+
+    def __init__(self, embeddings, model_name, max_entries=2048, disk_path=None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.disk_store = EmbeddingStore(disk_path, table="query_embeddings") if disk_path else None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        key = make_cache_key(self.model_name, clean_text(text))
+
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return list(vector)
+
+        vector = self.disk_store.get(key) if self.disk_store else None
+        if vector is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._remember(key, vector)
+            return list(vector)
+
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self.misses += 1
+        self._remember(key, vector)
+        if self.disk_store:
+            self.disk_store.put(key, vector)
+        return list(vector)
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self._memory[key] = tuple(vector)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Hit/miss counters and current in-memory size
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "model": self.model_name,
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+
+class CachedDocumentEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with a persistent, content-addressed cache for chunks.
+
+    Every ingestion path embeds through this wrapper, so unchanged chunks are
+    never re-encoded and identical texts within a batch are encoded once.
+    """
+
+    def __init__(self, provider, disk_path):
+        self.provider = provider
+        self.model_name = provider.model_name
+        self.store = EmbeddingStore(disk_path, table="chunk_embeddings")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def dimension(self):
+        return self.provider.dimension
+
+    def embed_documents(self, texts):
+        keys = [make_cache_key(self.model_name, text) for text in texts]
+        found = self.store.get_many(set(keys))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.provider.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.store.put_many(computed)
+            found.update(computed)
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return [list(found[key]) for key in keys]
+
+    def embed_query(self, text):
+        return self.provider.embed_query(text)
+
+    def stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Number of chunks served from the cache and encoded
+        """
+        with self._lock:
+            return {"model": self.model_name, "hits": self.hits, "misses": self.misses}
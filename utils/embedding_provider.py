@@ -0,0 +1,182 @@
+"""
+Embedding provider shared by seeders, uploads and queries.
+
+Every code path that writes to or reads from a collection embeds text through
+the same provider, so the vectors in the index and the query vectors always
+come from the same model. The provider records its model name and dimension
+in the collection metadata on write and refuses to query a collection that
+was built with a different model.
+"""
+import threading
+
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+from sentence_transformers import SentenceTransformer
+
+import config
+from utils.embedding_service import SidecarEmbeddingProvider
+
+EMBEDDING_MODEL_KEY = "embedding_model"
+EMBEDDING_DIMENSION_KEY = "embedding_dimension"
+
+
+class EmbeddingMismatchError(Exception):
+    """Raised when a collection was built with a different embedding model."""
+
+
+class SentenceTransformerProvider(Embeddings):
+    """
+    In-process SentenceTransformer embedder, loaded lazily once per process.
+    """
+
+    def __init__(self, model_name, model_path, batch_size=64, normalize=True):
+        self.model_name = model_name
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self._model = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    print(f"Loading embedding model '{self.model_name}' from {self.model_path}")
+                    self._model = SentenceTransformer(self.model_path)
+        return self._model
+
+    @property
+    def dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        return self.model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+            normalize_embeddings=self.normalize
+        ).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class OllamaProvider(Embeddings):
+    """
+    Embedder backed by an Ollama server.
+    """
+
+    def __init__(self, model_name, base_url):
+        self.model_name = model_name
+        self.embeddings = OllamaEmbeddings(model=model_name, base_url=base_url)
+        self._dimension = None
+
+    @property
+    def dimension(self):
+        if self._dimension is None:
+            self._dimension = len(self.embed_query("dimension probe"))
+        return self._dimension
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(list(texts))
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_embedding_provider():
+    """
+    Get the process-wide embedding provider selected by config.EMBEDDING_BACKEND.
+
+    Returns:
+        Embeddings: Provider exposing model_name, dimension, embed_documents and embed_query
+    """
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                if config.EMBEDDING_BACKEND == "ollama":
+                    _provider = OllamaProvider(config.EMBEDDING_MODEL, config.OLLAMA_BASE_URL)
+                elif config.EMBEDDING_BACKEND == "sidecar":
+                    _provider = SidecarEmbeddingProvider(
+                        config.LOCAL_EMBEDDING_MODEL,
+                        config.EMBEDDING_SERVICE_HOST,
+                        config.EMBEDDING_SERVICE_PORT,
+                        timeout=config.EMBEDDING_SERVICE_TIMEOUT
+                    )
+                else:
+                    _provider = SentenceTransformerProvider(
+                        config.LOCAL_EMBEDDING_MODEL,
+                        config.LOCAL_EMBEDDING_MODEL_PATH,
+                        batch_size=config.EMBEDDING_BATCH_SIZE,
+                        normalize=config.EMBEDDING_NORMALIZE
+                    )
+    return _provider
+
+
+def _user_metadata(collection):
+    # hnsw:* keys are fixed at creation time and must not be passed to modify()
+    return {
+        key: value for key, value in (collection.metadata or {}).items()
+        if not key.startswith("hnsw:")
+    }
+
+
+def record_collection_embedding(collection, provider=None):
+    """
+    Record the provider's model and dimension on a collection before writing to it.
+
+    Args:
+        collection: ChromaDB collection
+        provider (Embeddings, optional): Provider used for the write
+
+    Raises:
+        EmbeddingMismatchError: If the collection was built with another model
+    """
+    provider = provider or get_embedding_provider()
+    metadata = _user_metadata(collection)
+    if EMBEDDING_MODEL_KEY in metadata:
+        check_collection_embedding(collection, provider)
+        return
+    metadata[EMBEDDING_MODEL_KEY] = provider.model_name
+    metadata[EMBEDDING_DIMENSION_KEY] = provider.dimension
+    collection.modify(metadata=metadata)
+
+
+def check_collection_embedding(collection, provider=None):
+    """
+    Verify that a collection was built with the provider's model and dimension.
+
+    Collections created before the model was recorded are accepted with a warning.
+
+    Args:
+        collection: ChromaDB collection
+        provider (Embeddings, optional): Provider used for queries
+
+    Raises:
+        EmbeddingMismatchError: If the recorded model or dimension differs
+    """
+    provider = provider or get_embedding_provider()
+    metadata = collection.metadata or {}
+    recorded_model = metadata.get(EMBEDDING_MODEL_KEY)
+    if recorded_model is None:
+        print(f"Warning: collection '{collection.name}' has no recorded embedding model")
+        return
+    if recorded_model != provider.model_name:
+        raise EmbeddingMismatchError(
+            f"Collection '{collection.name}' was built with '{recorded_model}', "
+            f"but the active embedding model is '{provider.model_name}'"
+        )
+    recorded_dimension = metadata.get(EMBEDDING_DIMENSION_KEY)
+    if recorded_dimension is not None and int(recorded_dimension) != provider.dimension:
+        raise EmbeddingMismatchError(
+            f"Collection '{collection.name}' stores {recorded_dimension}-d vectors, "
+            f"but '{provider.model_name}' produces {provider.dimension}-d vectors"
+        )
@@ -0,0 +1,247 @@
+"""
+Local embedding sidecar.
+
+A small HTTP service on localhost that loads the SentenceTransformer model
+once and serves embeddings to every API worker and ingestion job on the
+host. Concurrent requests are coalesced into micro-batches: the batcher
+takes the first waiting request, then keeps adding requests until the batch
+holds max_batch_size texts or max_wait_ms has passed, and encodes the batch
+in one forward pass.
+
+Run it with:
+
+    python -m utils.embedding_service
+
+and set EMBEDDING_BACKEND = "sidecar" so get_embedding_model() and
+get_document_embedder() embed through it.
+"""
+import http.client
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.embeddings import Embeddings
+
+import config
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent embedding requests into batched model calls.
+    """
+
+    def __init__(self, embed_fn, max_batch_size=64, max_wait_ms=5):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._requests = queue.Queue()
+        self.batches = 0
+        self.texts = 0
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, texts):
+        """
+        Queue texts for embedding.
+
+        Args:
+            texts (list): Texts to embed
+
+        Returns:
+            Future: Resolves to the list of embeddings
+        """
+        future = Future()
+        self._requests.put((list(texts), future))
+        return future
+
+    def _collect(self):
+        batch = [self._requests.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                texts, future = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append((texts, future))
+            size += len(texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                embeddings = self.embed_fn(texts) if texts else []
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            offset = 0
+            for request_texts, future in batch:
+                future.set_result(embeddings[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+    def stats(self):
+        """
+        Get batching counters.
+
+        Returns:
+            dict: Batches run, texts embedded and average batch size
+        """
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "queued_requests": self._requests.qsize()
+        }
+
+
+def make_handler(provider, batcher):
+    """Build the request handler class serving one provider."""
+
+    class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/info":
+                self._send_json(200, {
+                    "model_name": provider.model_name,
+                    "dimension": provider.dimension,
+                    "batching": batcher.stats()
+                })
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if self.path != "/embed":
+                self._send_json(404, {"error": "Not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                texts = json.loads(self.rfile.read(length))["texts"]
+                embeddings = batcher.submit(texts).result()
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            self._send_json(200, {"embeddings": embeddings})
+
+        def log_message(self, format, *args):
+            # Per-request access logs would dominate the output
+            pass
+
+    return EmbeddingRequestHandler
+
+
+def serve(host=None, port=None):
+    """
+    Load the local embedding model and serve it until interrupted.
+
+    Args:
+        host (str, optional): Bind address (default: config.EMBEDDING_SERVICE_HOST)
+        port (int, optional): Port (default: config.EMBEDDING_SERVICE_PORT)
+    """
+    from utils.embedding_provider import SentenceTransformerProvider
+
+    host = host or config.EMBEDDING_SERVICE_HOST
+    port = port or config.EMBEDDING_SERVICE_PORT
+    provider = SentenceTransformerProvider(
+        config.LOCAL_EMBEDDING_MODEL,
+        config.LOCAL_EMBEDDING_MODEL_PATH,
+        batch_size=config.EMBEDDING_BATCH_SIZE,
+        normalize=config.EMBEDDING_NORMALIZE
+    )
+    provider.model
+    batcher = MicroBatcher(
+        provider.embed_documents,
+        max_batch_size=config.EMBEDDING_SERVICE_MAX_BATCH_SIZE,
+        max_wait_ms=config.EMBEDDING_SERVICE_MAX_WAIT_MS
+    )
+    server = ThreadingHTTPServer((host, port), make_handler(provider, batcher))
+    server.daemon_threads = True
+    print(f"Embedding service for '{provider.model_name}' listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class SidecarEmbeddingProvider(Embeddings):
+    """
+    Client of the embedding sidecar, usable wherever a local provider is.
+
+    Each thread keeps its own persistent connection to the service.
+    """
+
+    def __init__(self, model_name, host, port, timeout=30):
+        self.model_name = model_name
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._dimension = None
+        self._local = threading.local()
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                self._local.conn = conn
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = json.loads(response.read())
+            except (http.client.HTTPException, ConnectionError, OSError):
+                # Stale keep-alive connection or restarted service: reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+                continue
+            if response.status != 200:
+                raise RuntimeError(f"Embedding service error ({response.status}): {data.get('error')}")
+            return data
+
+    @property
+    def dimension(self):
+        if self._dimension is None:
+            info = self._request("GET", "/info")
+            if info["model_name"] != self.model_name:
+                from utils.embedding_provider import EmbeddingMismatchError
+                raise EmbeddingMismatchError(
+                    f"Embedding service serves '{info['model_name']}', expected '{self.model_name}'"
+                )
+            self._dimension = info["dimension"]
+        return self._dimension
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        return self._request("POST", "/embed", {"texts": list(texts)})["embeddings"]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+if __name__ == "__main__":
+    serve()
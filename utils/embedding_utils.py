@@ -1,41 +1,67 @@
 """
 Embedding utilities for vector operations.
 """
-from langchain_community.vectorstores import Chroma
-from langchain_ollama import OllamaEmbeddings
+import threading
+
 import config
+from utils.embedding_cache import CachedQueryEmbeddings, CachedDocumentEmbeddings
+from utils.embedding_provider import get_embedding_provider
+
+_embedding_model = None
+_document_embedder = None
+_embedding_model_lock = threading.Lock()
 
 def get_embedding_model():
     """
-    Get the embedding model instance.
+    Get the process-wide embedding model instance.
+    
+    Query embeddings are served through an LRU cache (with an optional
+    on-disk tier) in front of the shared embedding provider.
     
     Returns:
-        OllamaEmbeddings: Configured embedding model
+        CachedQueryEmbeddings: Configured embedding model
     """
-    return OllamaEmbeddings(
-        model=config.EMBEDDING_MODEL, 
-        base_url=config.OLLAMA_BASE_URL
-    )
+    global _embedding_model
+    if _embedding_model is None:
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                provider = get_embedding_provider()
+                _embedding_model = CachedQueryEmbeddings(
+                    provider,
+                    model_name=provider.model_name,
+                    max_entries=config.QUERY_EMBEDDING_CACHE_SIZE,
+                    disk_path=config.QUERY_EMBEDDING_CACHE_PATH
+                )
+    return _embedding_model
 
-def get_vectorstore(project, collection_suffix="shared"):
+def get_document_embedder():
     """
-    Get a vector store for a specific project.
+    Get the process-wide embedder used by ingestion paths.
+    
+    Chunk embeddings are looked up in a persistent content-addressed cache
+    before the shared embedding provider is called.
     
-    Args:
-        project (str): Project identifier
-        collection_suffix (str): Collection suffix (default: "shared")
-        
     Returns:
-        Chroma: Configured vector store
+        CachedDocumentEmbeddings: Configured document embedder
+    """
+    global _document_embedder
+    if _document_embedder is None:
+        with _embedding_model_lock:
+            if _document_embedder is None:
+                _document_embedder = CachedDocumentEmbeddings(
+                    get_embedding_provider(),
+                    disk_path=config.CHUNK_EMBEDDING_CACHE_PATH
+                )
+    return _document_embedder
+
+def get_query_embedding_cache_stats():
     """
-    embedding_model = get_embedding_model()
-    collection_name = f"{project}_{collection_suffix}"
+    Get hit/miss counters of the query-embedding cache.
     
-    return Chroma(
-        collection_name=collection_name,
-        persist_directory=config.PERSIST_DIRECTORY,
-        embedding_function=embedding_model
-    )
+    Returns:
+        dict: Cache statistics
+    """
+    return get_embedding_model().stats()
 
 def format_docs(docs):
     """
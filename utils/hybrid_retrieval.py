@@ -0,0 +1,173 @@
+"""
+Hybrid retrieval: BM25 lexical search fused with dense vector search.
+
+Dense search handles paraphrases well but misses exact identifiers (work
+item numbers, service names, endpoint paths); BM25 is the opposite. Both
+rankings are combined with reciprocal-rank fusion (RRF), which picks and
+orders the documents. Each document is scored with its dense relevance to
+the query, like a plain vector search, so score thresholds and merges with
+other collections mean the same with and without hybrid retrieval.
+"""
+import math
+
+from langchain_core.documents import Document
+
+from utils.bm25_index import ensure_bm25_index
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=60):
+    """
+    Fuse several rankings of ids with reciprocal-rank fusion.
+
+    Args:
+        rankings (list): Lists of ids, each ordered best first
+        rrf_k (int): RRF damping constant
+
+    Returns:
+        list: (id, fused_score) tuples, best first
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def vector_distance(a, b, space="l2"):
+    """
+    Distance between two vectors as Chroma reports it for a collection space.
+
+    Args:
+        a (list): Vector
+        b (list): Vector
+        space (str): "l2" (squared Euclidean), "cosine" or "ip"
+
+    Returns:
+        float: Distance
+    """
+    if space == "l2":
+        return sum((x - y) ** 2 for x, y in zip(a, b))
+    dot = sum(x * y for x, y in zip(a, b))
+    if space == "cosine":
+        norms = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return 1.0 - dot / norms if norms else 1.0
+    return 1.0 - dot
+
+
+class HybridRetriever:
+    """
+    Retriever over one collection that fuses dense and BM25 rankings.
+    """
+
+    def __init__(self, vectorstore, k=5, fetch_k=20, rrf_k=60):
+        self.vectorstore = vectorstore
+        self.collection = vectorstore._collection
+        self.embedding_function = vectorstore._embedding_function
+        self.k = k
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+
+    def _relevance(self, distance):
+        return self.vectorstore._select_relevance_score_fn()(distance)
+
+    def dense_search(self, query_embedding, k, where=None):
+        """
+        Run the vector search.
+
+        Returns:
+            tuple: (ids ordered best first, {id: (document, metadata, relevance)})
+        """
+        if not self.collection.count():
+            return [], {}
+        result = self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=k,
+            where=where,
+            include=["documents", "metadatas", "distances"]
+        )
+        ids = result["ids"][0]
+        found = {
+            doc_id: (document, metadata, self._relevance(distance))
+            for doc_id, document, metadata, distance
+            in zip(ids, result["documents"][0], result["metadatas"][0], result["distances"][0])
+        }
+        return ids, found
+
+    def _get_scored(self, ids, query_embedding, where=None):
+        """
+        Fetch documents by id with their dense relevance to the query.
+
+        Returns:
+            dict: {id: (document, metadata, relevance)} for the ids that exist (and pass the filter)
+        """
+        if not ids:
+            return {}
+        result = self.collection.get(ids=ids, where=where, include=["documents", "metadatas", "embeddings"])
+        space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+        return {
+            doc_id: (document, metadata, self._relevance(vector_distance(query_embedding, embedding, space)))
+            for doc_id, document, metadata, embedding
+            in zip(result["ids"], result["documents"], result["metadatas"], result["embeddings"])
+        }
+
+    def search(self, query, k=None, where=None):
+        """
+        Retrieve the top documents with their dense relevance scores.
+
+        Args:
+            query (str): Query text
+            k (int, optional): Number of documents (default: self.k)
+            where (dict, optional): Chroma metadata filter applied to both searches
+
+        Returns:
+            list: (Document, relevance) tuples in fused RRF order. Relevance
+                  is the dense relevance score in [0, 1], also for documents
+                  only BM25 found; "lexical_match" in the metadata marks
+                  documents BM25 ranked higher than the vector search did
+        """
+        k = k or self.k
+        query_embedding = self.embedding_function.embed_query(query)
+        dense_ids, found = self.dense_search(query_embedding, self.fetch_k, where)
+        sparse_ids = [doc_id for doc_id, _ in ensure_bm25_index(self.collection).search(query, self.fetch_k)]
+        if where and sparse_ids:
+            # The BM25 index has no metadata; keep the lexical hits that pass the filter
+            passed = self._get_scored([doc_id for doc_id in sparse_ids if doc_id not in found], query_embedding, where)
+            found.update(passed)
+            sparse_ids = [doc_id for doc_id in sparse_ids if doc_id in found]
+
+        fused = reciprocal_rank_fusion([dense_ids, sparse_ids], self.rrf_k)[:k]
+
+        missing = [doc_id for doc_id, _ in fused if doc_id not in found]
+        if missing:
+            found.update(self._get_scored(missing, query_embedding))
+
+        dense_ranks = {doc_id: rank for rank, doc_id in enumerate(dense_ids)}
+        sparse_ranks = {doc_id: rank for rank, doc_id in enumerate(sparse_ids)}
+        results = []
+        for doc_id, _ in fused:
+            if doc_id not in found:
+                # Deleted from the collection but still in a stale BM25 index
+                continue
+            document, metadata, relevance = found[doc_id]
+            # BM25 ranked it above the vector search: its dense relevance undersells it
+            lexical_match = sparse_ranks.get(doc_id, len(sparse_ids)) < dense_ranks.get(doc_id, len(dense_ids))
+            results.append((
+                Document(
+                    page_content=document,
+                    metadata=dict(metadata or {}, chunk_id=doc_id, lexical_match=lexical_match)
+                ),
+                relevance
+            ))
+        return results
+
+    def invoke(self, query):
+        """
+        Retrieve the top documents.
+
+        Args:
+            query (str): Query text
+
+        Returns:
+            list: Documents, best first
+        """
+        return [document for document, _ in self.search(query)]
@@ -1,6 +1,7 @@
 """
 Text processing utilities.
 """
+import hashlib
 
 def clean_text(text):
     """
@@ -25,3 +26,102 @@ def tokenize(text):
         list: List of words
     """
     return clean_text(text).split()
+
+def estimate_tokens(text, chars_per_token=4):
+    """
+    Estimate the number of LLM tokens in a text.
+    
+    Args:
+        text (str): Input text
+        chars_per_token (float): Average characters per token
+        
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    return max(1, round(len(text) / chars_per_token))
+
+def content_hash(text, length=16):
+    """
+    Hash text content for content-addressed chunk ids.
+    
+    Args:
+        text (str): Input text
+        length (int): Number of hex characters to keep
+        
+    Returns:
+        str: Hex digest prefix
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:length]
+
+def iter_file_blocks(path, block_size=64 * 1024, encoding='utf-8'):
+    """
+    Read a text file incrementally.
+    
+    Args:
+        path (str): Path to the file
+        block_size (int): Characters per block
+        encoding (str): File encoding
+        
+    Yields:
+        str: Consecutive blocks of the file
+    """
+    with open(path, 'r', encoding=encoding) as file:
+        while True:
+            block = file.read(block_size)
+            if not block:
+                break
+            yield block
+
+def iter_split_chunks(blocks, text_splitter):
+    """
+    Split a stream of text blocks into chunks without holding the whole text.
+    
+    Every chunk except the last one of the current buffer is emitted; the last
+    one is carried over and re-split together with the next block, so no text
+    is lost at block boundaries and no chunk exceeds the splitter's size.
+    Boundaries near a block boundary can differ from splitting the whole text
+    at once: recursive splitters pick their separators from the text they are
+    given, and here they only see the carried-over chunk plus the next block.
+    
+    Args:
+        blocks (iterable): Text blocks, e.g. from iter_file_blocks
+        text_splitter: LangChain text splitter
+        
+    Yields:
+        str: Text chunks
+    """
+    buffer = ""
+    for block in blocks:
+        buffer += block
+        chunks = text_splitter.split_text(buffer)
+        if len(chunks) < 2:
+            continue
+        for chunk in chunks[:-1]:
+            yield chunk
+        tail = chunks[-1]
+        tail_start = buffer.rfind(tail)
+        buffer = buffer[tail_start:] if tail_start >= 0 else tail
+    if buffer.strip():
+        yield from text_splitter.split_text(buffer)
+
+def iter_batches(items, batch_size):
+    """
+    Group an iterable into lists of at most batch_size items.
+    
+    Args:
+        items (iterable): Items to group
+        batch_size (int): Maximum batch size
+        
+    Yields:
+        list: Batches of items
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -1,60 +1,113 @@
 """
 Transcript processing utilities.
 """
-import chromadb
-from sentence_transformers import SentenceTransformer
 import os
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import config
+from utils.bm25_index import ensure_bm25_index
+from utils.embedding_provider import record_collection_embedding
+from utils.embedding_utils import get_document_embedder
+from utils.text_processing import content_hash, iter_file_blocks, iter_split_chunks, iter_batches
+from utils.vectorstore_registry import get_chroma_client, invalidate_collection
 
-def process_transcript(user_id, project, transcript_path, meeting_type):
+def iter_transcript_chunks(transcript_path, text_splitter, block_size=None):
+    """
+    Stream the chunks of a transcript file.
+    
+    Args:
+        transcript_path (str): Path to the transcript file
+        text_splitter: LangChain text splitter
+        block_size (int, optional): Characters read from the file at a time
+        
+    Yields:
+        str: Transcript chunks
+    """
+    blocks = iter_file_blocks(transcript_path, block_size or config.INGEST_READ_BLOCK_SIZE)
+    yield from iter_split_chunks(blocks, text_splitter)
+
+def process_transcript(user_id, project, transcript_path, meeting_type, progress_callback=None, source=None):
     """
     Process a transcript file and add it to the vector database.
     
+    The file is read, split, embedded and written in fixed-size batches, so
+    memory use does not grow with the size of the transcript. Chunk ids are
+    derived from the chunk content, so re-uploading an edited transcript only
+    embeds the chunks that changed and drops the ones that disappeared.
+    
     Args:
         user_id (str): User identifier
         project (str): Project identifier
         transcript_path (str): Path to the transcript file
         meeting_type (str): Type of meeting (e.g., "standup", "refinement")
+        progress_callback (callable, optional): Called with (chunks_embedded, chunks_written)
+        source (str, optional): Stable name of the transcript, used for chunk ids and to
+            replace an earlier version (default: transcript_path)
+        
+    Returns:
+        int: Number of chunks written
     """
-    # Set up persistent ChromaDB client
-    client = chromadb.PersistentClient(path=config.PERSIST_DIRECTORY)
+    # Use the process-wide persistent ChromaDB client
+    client = get_chroma_client()
 
     # Create or get user-specific collection
     collection_name = f"{project}_{user_id}"
     collection = client.get_or_create_collection(collection_name)
 
-    # Load embedding model
-    model_path = os.path.join(config.MODELS_DIRECTORY, "all-mpnet-base-v2")
-    model = SentenceTransformer(model_path)
+    # Shared embedder with a content-addressed chunk cache
+    embedder = get_document_embedder()
+    record_collection_embedding(collection, embedder)
+    bm25_index = ensure_bm25_index(collection)
 
     # Initialize text splitter
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
 
-    # Read and process transcript
-    with open(transcript_path, 'r', encoding='utf-8') as file:
-        transcript = file.read()
-
-    # Split the transcript into chunks
-    chunks = text_splitter.split_text(transcript)
-    embeddings = model.encode(chunks, show_progress_bar=True).tolist()
-
-    # Generate metadata and IDs
-    transcript_id = os.path.basename(transcript_path).split('.')[0]
-    metadatas = [{
-        "source": transcript_path,
+    source = source or transcript_path
+    transcript_id = os.path.basename(source).split('.')[0]
+    metadata = {
+        "source": source,
         "meeting_type": meeting_type,
         "user_id": user_id
-    } for _ in range(len(chunks))]
-    ids = [f"{transcript_id}_{i}" for i in range(len(chunks))]
-
-    # Add chunks to the collection
-    collection.add(
-        documents=chunks,
-        embeddings=embeddings,
-        metadatas=metadatas,
-        ids=ids
-    )
+    }
+
+    chunks_embedded = 0
+    chunks_written = 0
+    written_ids = set()
+    chunks = iter_transcript_chunks(transcript_path, text_splitter)
+    for batch in iter_batches(chunks, config.INGEST_BATCH_SIZE):
+        # Identical chunks share an id; keep one of each per upsert call
+        batch_chunks = {}
+        for chunk in batch:
+            batch_chunks.setdefault(f"{transcript_id}_{content_hash(chunk)}", chunk)
+        ids = list(batch_chunks)
+        documents = list(batch_chunks.values())
+
+        embeddings = embedder.embed_documents(documents)
+        chunks_embedded += len(documents)
+        if progress_callback:
+            progress_callback(chunks_embedded, chunks_written)
+
+        # Upsert the batch; unchanged chunks are no-op rewrites
+        collection.upsert(
+            documents=documents,
+            embeddings=embeddings,
+            metadatas=[dict(metadata) for _ in documents],
+            ids=ids
+        )
+        bm25_index.add_documents(ids, documents)
+        written_ids.update(ids)
+        chunks_written += len(documents)
+        if progress_callback:
+            progress_callback(chunks_embedded, chunks_written)
+
+    # Remove chunks left over from a previous version of this transcript
+    existing_ids = collection.get(where={"source": source}, include=[])["ids"]
+    stale_ids = [chunk_id for chunk_id in existing_ids if chunk_id not in written_ids]
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+        bm25_index.remove_documents(stale_ids)
+    bm25_index.save()
+
+    invalidate_collection(project, user_id)
     
-    print(f"Processed transcript with {len(chunks)} chunks for user {user_id}, project {project}")
-    return len(chunks)
+    print(f"Processed transcript with {chunks_written} chunks for user {user_id}, project {project}")
+    return chunks_written
@@ -0,0 +1,299 @@
+"""
+Process-wide registry of warm vector stores.
+
+Opening a Chroma collection, wrapping it in a LangChain vector store and
+compiling the chains built on top of it is far more expensive than running a
+query against it, so these objects are kept per collection and reused across
+requests. The registry is bounded: once more than
+``config.VECTORSTORE_CACHE_SIZE`` collections are open, the least recently
+used one is dropped. A collection is opened outside the registry lock, under
+a lock of its own, so a cold open never blocks lookups of other collections
+and concurrent requests for the same collection open it only once.
+"""
+import threading
+from collections import OrderedDict
+
+import chromadb
+from langchain_community.vectorstores import Chroma
+
+import config
+from utils.embedding_provider import check_collection_embedding
+from utils.embedding_utils import get_embedding_model
+from utils.hybrid_retrieval import HybridRetriever
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_chroma_client():
+    """
+    Get the process-wide persistent ChromaDB client.
+
+    Returns:
+        chromadb.PersistentClient: Shared client for config.PERSIST_DIRECTORY
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = chromadb.PersistentClient(path=config.PERSIST_DIRECTORY)
+    return _client
+
+
+def get_collection_name(project, collection_suffix="shared"):
+    """
+    Build the Chroma collection name for a project.
+
+    Args:
+        project (str): Project identifier
+        collection_suffix (str): Collection suffix (default: "shared")
+
+    Returns:
+        str: Collection name
+    """
+    return f"{project}_{collection_suffix}"
+
+
+class CollectionEntry:
+    """
+    Warm objects kept for a single collection: the vector store, its default
+    retriever (hybrid BM25 + vector when HYBRID_RETRIEVAL_ENABLED) and any
+    derived objects (e.g. compiled chains) built on demand.
+    """
+
+    def __init__(self, collection_name, vectorstore):
+        self.collection_name = collection_name
+        self.vectorstore = vectorstore
+        if config.HYBRID_RETRIEVAL_ENABLED:
+            self.retriever = HybridRetriever(
+                vectorstore,
+                k=config.HYBRID_K,
+                fetch_k=config.HYBRID_FETCH_K,
+                rrf_k=config.RRF_K
+            )
+        else:
+            self.retriever = vectorstore.as_retriever(search_kwargs={"k": config.RETRIEVER_K})
+        self._built = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, builder):
+        """
+        Return the object cached under ``key``, building it on first use.
+
+        Args:
+            key (str): Name of the derived object
+            builder (callable): Called with this entry to build the object
+
+        Returns:
+            object: The cached or freshly built object
+        """
+        with self._lock:
+            if key not in self._built:
+                self._built[key] = builder(self)
+            return self._built[key]
+
+    def discard(self, key):
+        """
+        Drop the object cached under ``key`` so the next get_or_build rebuilds it.
+
+        Args:
+            key (str): Name of the derived object
+        """
+        with self._lock:
+            self._built.pop(key, None)
+
+
+class VectorstoreRegistry:
+    """
+    LRU registry of CollectionEntry objects keyed by collection name.
+    """
+
+    def __init__(self, max_collections):
+        self.max_collections = max_collections
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._opening = {}
+        self._generations = {}
+        self._listeners = []
+
+    def _lookup(self, collection_name):
+        entry = self._entries.get(collection_name)
+        if entry is not None:
+            self._entries.move_to_end(collection_name)
+        return entry
+
+    def get(self, project, collection_suffix="shared"):
+        """
+        Get the warm entry for a collection, opening it if necessary.
+
+        Args:
+            project (str): Project identifier
+            collection_suffix (str): Collection suffix (default: "shared")
+
+        Returns:
+            CollectionEntry: Entry for the collection
+        """
+        collection_name = get_collection_name(project, collection_suffix)
+        with self._lock:
+            entry = self._lookup(collection_name)
+            if entry is not None:
+                return entry
+            opening_lock = self._opening.setdefault(collection_name, threading.Lock())
+
+        with opening_lock:
+            with self._lock:
+                # Opened by the request this one waited for
+                entry = self._lookup(collection_name)
+                if entry is not None:
+                    return entry
+                generation = self._generations.get(collection_name, 0)
+            try:
+                entry = CollectionEntry(collection_name, build_vectorstore(collection_name))
+            finally:
+                with self._lock:
+                    self._opening.pop(collection_name, None)
+            with self._lock:
+                if self._generations.get(collection_name, 0) != generation:
+                    # Invalidated while opening: serve this request, but do not keep the entry
+                    return entry
+                self._entries[collection_name] = entry
+                while len(self._entries) > self.max_collections:
+                    evicted_name, _ = self._entries.popitem(last=False)
+                    print(f"Evicted vectorstore for collection '{evicted_name}' from registry")
+            return entry
+
+    def invalidate(self, project, collection_suffix="shared"):
+        """
+        Drop the warm entry for a collection after its contents changed.
+
+        Args:
+            project (str): Project identifier
+            collection_suffix (str): Collection suffix (default: "shared")
+
+        Returns:
+            bool: True if an entry was open and has been dropped
+        """
+        collection_name = get_collection_name(project, collection_suffix)
+        with self._lock:
+            removed = self._entries.pop(collection_name, None) is not None
+            self._generations[collection_name] = self._generations.get(collection_name, 0) + 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(project, collection_suffix)
+        return removed
+
+    def clear(self):
+        """Drop every warm entry."""
+        with self._lock:
+            self._entries.clear()
+            # Entries being opened right now must not be kept either
+            for collection_name in set(self._generations) | set(self._opening):
+                self._generations[collection_name] = self._generations.get(collection_name, 0) + 1
+
+    def add_invalidation_listener(self, listener):
+        """
+        Register a callback run whenever a collection is invalidated.
+
+        Args:
+            listener (callable): Called with (project, collection_suffix)
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def collection_names(self):
+        """
+        List the collections currently held open, least recently used first.
+
+        Returns:
+            list: Collection names
+        """
+        with self._lock:
+            return list(self._entries)
+
+
+registry = VectorstoreRegistry(config.VECTORSTORE_CACHE_SIZE)
+
+
+def build_vectorstore(collection_name):
+    """
+    Build a new (uncached) vector store wrapper for a collection.
+
+    Args:
+        collection_name (str): Chroma collection name
+
+    Returns:
+        Chroma: Configured vector store
+
+    Raises:
+        EmbeddingMismatchError: If the collection was built with another embedding model
+    """
+    vectorstore = Chroma(
+        client=get_chroma_client(),
+        collection_name=collection_name,
+        embedding_function=get_embedding_model()
+    )
+    check_collection_embedding(vectorstore._collection)
+    return vectorstore
+
+
+def get_collection_entry(project, collection_suffix="shared"):
+    """
+    Get the warm registry entry for a project collection.
+
+    Args:
+        project (str): Project identifier
+        collection_suffix (str): Collection suffix (default: "shared")
+
+    Returns:
+        CollectionEntry: Entry holding the vector store and retriever
+    """
+    return registry.get(project, collection_suffix)
+
+
+def collection_exists(project, collection_suffix="shared"):
+    """
+    Check whether a project collection exists without creating it.
+
+    Args:
+        project (str): Project identifier
+        collection_suffix (str): Collection suffix (default: "shared")
+
+    Returns:
+        bool: True if the collection exists
+    """
+    collection_name = get_collection_name(project, collection_suffix)
+    if collection_name in registry.collection_names():
+        return True
+    try:
+        get_chroma_client().get_collection(collection_name)
+        return True
+    except ValueError:
+        return False
+
+
+def get_vectorstore(project, collection_suffix="shared"):
+    """
+    Get a vector store for a specific project.
+
+    Args:
+        project (str): Project identifier
+        collection_suffix (str): Collection suffix (default: "shared")
+
+    Returns:
+        Chroma: Configured vector store
+    """
+    return registry.get(project, collection_suffix).vectorstore
+
+
+def invalidate_collection(project, collection_suffix="shared"):
+    """
+    Invalidate cached objects for a collection after it has been written to.
+
+    Args:
+        project (str): Project identifier
+        collection_suffix (str): Collection suffix (default: "shared")
+
+    Returns:
+        bool: True if an open entry was dropped
+    """
+    return registry.invalidate(project, collection_suffix)
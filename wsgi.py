@@ -0,0 +1,49 @@
+"""
+WSGI entry point for production serving.
+
+Run with gunicorn (settings in gunicorn.conf.py):
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app enabled this module is imported once in the gunicorn
+master, so model weights and BM25 indexes are loaded before the workers are
+forked and shared copy-on-write between them. Anything holding SQLite
+connections or threads (Chroma clients, embedding caches, background
+workers) is only created in the workers, after the fork.
+"""
+import os
+import time
+
+import config
+from app import create_app
+from core.reranker import reranker
+from utils.bm25_index import get_bm25_index
+from utils.embedding_provider import SentenceTransformerProvider, get_embedding_provider
+
+def preload_shared_resources():
+    """
+    Load models and lexical indexes that are safe to share across forked workers.
+    """
+    started = time.perf_counter()
+
+    provider = get_embedding_provider()
+    if isinstance(provider, SentenceTransformerProvider):
+        provider.model
+    if config.RERANK_ENABLED:
+        reranker.warm_up()
+
+    indexes = 0
+    if os.path.isdir(config.BM25_INDEX_DIRECTORY):
+        for filename in os.listdir(config.BM25_INDEX_DIRECTORY):
+            if filename.endswith(".sqlite"):
+                get_bm25_index(filename[:-len(".sqlite")])
+                indexes += 1
+
+    elapsed = time.perf_counter() - started
+    print(f"Preloaded models and {indexes} BM25 indexes in {elapsed:.1f}s")
+
+if config.PRELOAD_SHARED_RESOURCES:
+    preload_shared_resources()
+
+# Background workers are started per worker process by gunicorn's post_fork hook
+app = create_app(start_background_workers=False)